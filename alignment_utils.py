@@ -0,0 +1,117 @@
+"""
+日付整列ユーティリティ
+複数銘柄のデータから共通カレンダーと銘柄ごとの整数位置を一度だけ作成し、
+期間・範囲の検索を searchsorted（二分探索）で行う
+
+日付範囲の切り出し（価格ストア・月次データキャッシュ・シグナル履歴・画面の保有期間）は
+すべて locate_range / slice_range を使う（ブールマスクによる O(n) の絞り込みを行わない）。
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _to_ns(dates):
+    """日付（単体・配列）を int64 ナノ秒に変換"""
+    return pd.DatetimeIndex(np.atleast_1d(pd.to_datetime(dates))).as_unit('ns').asi8
+
+
+def _index_ns(index):
+    """昇順の日付インデックス（datetime64 配列・int64 配列可）を int64 ナノ秒配列に変換"""
+    if isinstance(index, pd.DatetimeIndex):
+        return index.as_unit('ns').asi8
+    values = np.asarray(index)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ns]').view(np.int64)
+    return values
+
+
+def build_alignment(data, field='Open'):
+    """
+    銘柄ごとのデータから整列インデックスを作成
+
+    Args:
+        data (dict): {銘柄: DataFrame（DatetimeIndex）}
+        field (str): 価格行列に使用する列
+
+    Returns:
+        dict: {
+            'calendar': 全銘柄共通の日付（np.ndarray int64 ナノ秒、昇順）,
+            'dates': 共通日付（pd.DatetimeIndex）,
+            'symbols': 銘柄名のタプル,
+            'prices': 共通日付 × 銘柄の価格行列（np.ndarray float64）
+        }
+    """
+
+    symbols = tuple(data.keys())
+
+    # 各銘柄の日付を昇順の int64 配列にしてから共通部分を取る
+    sorted_frames = {
+        symbol: df if df.index.is_monotonic_increasing else df.sort_index()
+        for symbol, df in data.items()
+    }
+    calendar = None
+    for df in sorted_frames.values():
+        index_ns = _index_ns(df.index)
+        calendar = index_ns if calendar is None else np.intersect1d(calendar, index_ns)
+    if calendar is None:
+        calendar = np.empty(0, dtype=np.int64)
+
+    # 共通日付が各銘柄の DataFrame 内で何行目か（二分探索で1回だけ求める）
+    prices = np.empty((len(calendar), len(symbols)), dtype=np.float64)
+    for j, symbol in enumerate(symbols):
+        df = sorted_frames[symbol]
+        pos = np.searchsorted(_index_ns(df.index), calendar)
+        prices[:, j] = df[field].to_numpy(dtype=np.float64)[pos]
+
+    return {
+        'calendar': calendar,
+        'dates': pd.DatetimeIndex(calendar.view('datetime64[ns]')),
+        'symbols': symbols,
+        'prices': prices,
+    }
+
+
+def alignment_to_frame(alignment):
+    """整列インデックスの価格行列を DataFrame（日付 × 銘柄）に変換"""
+    return pd.DataFrame(alignment['prices'], index=alignment['dates'], columns=list(alignment['symbols']))
+
+
+def locate_range(index, start, end, closed='left'):
+    """
+    日付範囲に含まれる行の位置範囲を二分探索で取得
+
+    Args:
+        index (pd.DatetimeIndex | np.ndarray): 昇順の日付（datetime64・int64 ナノ秒可）
+        start (datetime): 範囲の開始（None の場合は先頭から）
+        end (datetime): 範囲の終了（None の場合は末尾まで）
+        closed (str): 'left' = [start, end), 'both' = [start, end]
+
+    Returns:
+        tuple: (開始位置, 終了位置)（index[開始位置:終了位置] が該当行）
+    """
+
+    values = _index_ns(index)
+    lo = 0 if start is None else np.searchsorted(values, _to_ns(start)[0], side='left')
+    hi = len(values) if end is None else np.searchsorted(
+        values, _to_ns(end)[0], side='right' if closed == 'both' else 'left'
+    )
+    return int(lo), int(max(lo, hi))
+
+
+def slice_range(df, start, end, closed='left'):
+    """
+    日付範囲で DataFrame を切り出す（ブールマスクの代わりに位置スライス）
+
+    Args:
+        df (pd.DataFrame): 昇順の DatetimeIndex を持つデータ
+        start (datetime): 範囲の開始（None の場合は先頭から）
+        end (datetime): 範囲の終了（None の場合は末尾まで）
+        closed (str): 'left' = [start, end), 'both' = [start, end]
+
+    Returns:
+        pd.DataFrame: 該当行
+    """
+
+    lo, hi = locate_range(df.index, start, end, closed)
+    return df.iloc[lo:hi]
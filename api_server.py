@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+ローカル REST/JSON API サーバー
+Streamlit画面を開かずにシグナル・バックテスト結果を取得するための軽量HTTPサービス
+
+エンドポイント:
+    GET /signal                               最新のIEFモメンタムと推奨銘柄
+    GET /backtest?start=YYYY-MM-DD&end=...    3ヶ月リバランスバックテスト
+    GET /sweep?start=...&end=...&commission_bps=0,10&spread_bps=0,20
+                                              取引コスト条件のグリッド評価
+    GET /snapshot                             モバイル向けスナップショット（シグナル・直近トレード・統計）
+    GET /metrics/cache                        メモリキャッシュの件数・サイズ・ヒット数・追い出し数
+
+全レスポンスに ETag を付与し、If-None-Match 一致時は 304 を返す。
+stream=1 を付けると NDJSON をチャンク転送で逐次送信する。
+パラメータの誤りは 400、データ取得元の失敗は 502、それ以外のエラーは 500 を返す
+（500 の詳細はサーバーのログのみに出力）。データ取得は再試行なし・短いタイムアウトで行う。
+ストリーム送信中のエラーは終端チャンクを送らずに接続を閉じる（クライアントは不完全な応答として検出）。
+
+使い方:
+    python api_server.py --port 8502
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import time
+import traceback
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from cost_utils import compute_net_returns
+from momentum_core import (
+    build_price_matrix,
+    compute_trade_log,
+    fetch_policy,
+    get_monthly_data_for_backtest,
+    latest_signal,
+)
+from cache_utils import BoundedCache, cache_metrics
+from snapshot import build_snapshot, encode_snapshot, snapshot_etag
+from trade_log import iter_trade_records, summarize_trade_log, switch_mask
+
+# 結果キャッシュ（キー → (有効期限, ETag, 値)）
+_RESULT_CACHE_MAX_ENTRIES = 256
+_RESULT_CACHE = BoundedCache('api_results', max_entries=_RESULT_CACHE_MAX_ENTRIES)
+RESULT_TTL_SECONDS = 1800  # momentum_core の月次データキャッシュと同じ30分
+
+DATE_FORMAT = '%Y-%m-%d'
+API_MAX_RETRIES = 1        # APIリクエストでは取得を再試行しない（待たせずに 502 を返す）
+API_FETCH_TIMEOUT = 10     # APIリクエストでの1回の取得のタイムアウト（秒）
+
+
+class BadRequest(ValueError):
+    """リクエストパラメータの誤り（400応答）"""
+
+
+class UpstreamError(RuntimeError):
+    """データ取得元の失敗（502応答）"""
+
+
+def _cached(key, compute):
+    """
+    結果キャッシュから取得、無ければ compute() で計算して保存
+
+    Returns:
+        tuple: (ETag, 値)
+    """
+
+    now = time.monotonic()
+    entry = _RESULT_CACHE.get(key)
+    if entry is not None and entry[0] > now:
+        return entry[1], entry[2]
+
+    etag, value = compute()
+    _RESULT_CACHE.put(key, (now + RESULT_TTL_SECONDS, etag, value))
+    return etag, value
+
+
+def _etag_for(*parts):
+    """値の内容から ETag を作成"""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else repr(part).encode('utf-8'))
+    return f'"{digest.hexdigest()}"'
+
+
+def _today():
+    """本日 0:00（キャッシュキーを日単位に揃えるため）"""
+    return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _parse_date(params, name, default=None):
+    """クエリパラメータの日付を解析"""
+    values = params.get(name)
+    if not values:
+        if default is None:
+            raise BadRequest(f"{name} パラメータが必要です (YYYY-MM-DD)")
+        return default
+    try:
+        return datetime.strptime(values[0], DATE_FORMAT)
+    except ValueError:
+        raise BadRequest(f"{name} の形式が不正です: {values[0]} (YYYY-MM-DD)")
+
+
+def _parse_range(params):
+    """start / end（既定は本日）を解析し、期間の妥当性を検査"""
+    today = _today()
+    start_date = _parse_date(params, 'start')
+    end_date = _parse_date(params, 'end', default=today)
+    if start_date >= end_date:
+        raise BadRequest(f"start は end より前の日付にしてください: {start_date:%Y-%m-%d} ～ {end_date:%Y-%m-%d}")
+    if start_date > today:
+        raise BadRequest(f"start が未来の日付です: {start_date:%Y-%m-%d}")
+    return start_date, end_date
+
+
+def _parse_float_list(params, name, default):
+    """カンマ区切りの数値リストを解析"""
+    values = params.get(name)
+    if not values:
+        return default
+    try:
+        return [float(v) for v in values[0].split(',') if v.strip()]
+    except ValueError:
+        raise BadRequest(f"{name} の形式が不正です: {values[0]}")
+
+
+def get_signal():
+    """
+    最新のIEFモメンタムシグナルを取得（日単位でキャッシュ）
+
+    Returns:
+        tuple: (ETag, JSON bytes)
+    """
+
+    today = _today()
+
+    def compute():
+        signal = latest_signal(today + timedelta(days=1), lookback_days=91)
+        if signal is None:
+            raise UpstreamError("IEFデータが不足しています")
+
+        payload = {
+            'recommended_etf': signal.recommended_etf,
+            'ief_return': signal.ief_return,
+            'period_start': signal.period_start.strftime(DATE_FORMAT),
+            'period_end': signal.period_end.strftime(DATE_FORMAT),
+        }
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        return _etag_for(body), body
+
+    return _cached(('signal', today), compute)
+
+
+def get_backtest(start_date, end_date):
+    """
+    バックテストのトレードログを取得（期間ごとにキャッシュ）
+
+    Returns:
+        tuple: (ETag, トレードログ)
+    """
+
+    def compute():
+        data = get_monthly_data_for_backtest(start_date, end_date)
+        if data is None:
+            raise UpstreamError("データ取得に失敗しました")
+        price_matrix = build_price_matrix(data)
+        if len(price_matrix) < 4:
+            raise BadRequest(f"共通期間が不足: {len(price_matrix)}期間（4ヶ月以上の期間を指定してください）")
+        trade_log = compute_trade_log(price_matrix)
+        return _etag_for(trade_log.tobytes()), trade_log
+
+    return _cached(('backtest', start_date, end_date), compute)
+
+
+def get_snapshot():
+    """
+    モバイル向けスナップショットを取得（日単位でキャッシュ）
+
+    Returns:
+        tuple: (ETag, JSON bytes)
+    """
+
+    today = _today()
+
+    def compute():
+        try:
+            snapshot = build_snapshot(end_date=today)
+        except RuntimeError as e:  # build_snapshot はデータ不足・取得失敗を RuntimeError で通知
+            raise UpstreamError(str(e)) from e
+        body = encode_snapshot(snapshot)
+        return snapshot_etag(body), body
+
+    return _cached(('snapshot', today), compute)
+
+
+def iter_sweep_rows(trade_log, commission_grid, spread_grid):
+    """
+    取引コスト条件ごとのグロス・ネット総リターンを1行ずつ返す
+
+    Yields:
+        dict: {'commission_bps', 'spread_bps', 'gross_total_return', 'net_total_return'}
+    """
+
+    gross = trade_log['return_pct']
+    switches = switch_mask(trade_log)
+    gross_total = float((np.prod(1 + gross / 100) - 1) * 100)
+
+    for commission_bps, spread_bps in itertools.product(commission_grid, spread_grid):
+        net = compute_net_returns(gross, switches, commission_bps=commission_bps, spread_bps=spread_bps)
+        yield {
+            'commission_bps': commission_bps,
+            'spread_bps': spread_bps,
+            'gross_total_return': gross_total,
+            'net_total_return': float((np.prod(1 + net['net_return_pct'] / 100) - 1) * 100),
+        }
+
+
+class MomentumAPIHandler(BaseHTTPRequestHandler):
+    """シグナル・バックテストAPIのリクエストハンドラ"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # ヘッダーと本文を分けて書くため遅延ACK待ちを回避
+    server_version = 'MomentumChecker/1.1'
+    quiet = False
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        stream = params.get('stream', ['0'])[0] in ('1', 'true')
+
+        try:
+            with fetch_policy(max_retries=API_MAX_RETRIES, timeout=API_FETCH_TIMEOUT):
+                self._dispatch(url, params, stream)
+        except BadRequest as e:
+            self._send_error(400, str(e))
+        except UpstreamError as e:
+            self._send_error(502, str(e))
+        except Exception as e:
+            # 例外の内容（パスや内部の値）はクライアントに返さず、サーバーのログにのみ出力
+            self.log_error("内部エラー: %s %s: %r", self.command, self.path, e)
+            traceback.print_exc()
+            self._send_error(500, "内部エラーが発生しました")
+
+    def _dispatch(self, url, params, stream):
+        """エンドポイントごとの処理（例外は do_GET で応答に変換）"""
+        if url.path == '/signal':
+            etag, body = get_signal()
+            self._send_body(etag, body)
+
+        elif url.path == '/backtest':
+            start_date, end_date = _parse_range(params)
+            etag, trade_log = get_backtest(start_date, end_date)
+            if self._not_modified(etag):
+                return
+            if stream:
+                self._send_stream(etag, iter_trade_records(trade_log))
+            else:
+                payload = {
+                    'summary': summarize_trade_log(trade_log),
+                    'trades': list(iter_trade_records(trade_log)),
+                }
+                self._send_body(etag, json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+
+        elif url.path == '/sweep':
+            start_date, end_date = _parse_range(params)
+            commission_grid = _parse_float_list(params, 'commission_bps', [0.0])
+            spread_grid = _parse_float_list(params, 'spread_bps', [0.0])
+            log_etag, trade_log = get_backtest(start_date, end_date)
+            etag = _etag_for(log_etag, commission_grid, spread_grid)
+            if self._not_modified(etag):
+                return
+            rows = iter_sweep_rows(trade_log, commission_grid, spread_grid)
+            if stream:
+                self._send_stream(etag, rows)
+            else:
+                self._send_body(etag, json.dumps({'results': list(rows)}).encode('utf-8'))
+
+        elif url.path == '/snapshot':
+            etag, body = get_snapshot()
+            self._send_body(etag, body)
+
+        elif url.path == '/metrics/cache':
+            body = json.dumps({'caches': cache_metrics()}, ensure_ascii=False).encode('utf-8')
+            self._send_body(None, body)
+
+        else:
+            self._send_error(404, f"不明なエンドポイント: {url.path}")
+
+    def _not_modified(self, etag):
+        """If-None-Match が一致すれば 304 を返して True"""
+        if self.headers.get('If-None-Match') != etag:
+            return False
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+        return True
+
+    def _send_body(self, etag, body, status=200):
+        """JSON レスポンスを送信（条件付きGET対応）"""
+        if etag is not None and self._not_modified(etag):
+            return
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if etag is not None:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', f'max-age={RESULT_TTL_SECONDS}')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, etag, records):
+        """NDJSON をチャンク転送で逐次送信"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('ETag', etag)
+        self.end_headers()
+
+        try:
+            batch = []
+            for record in records:
+                batch.append(json.dumps(record, ensure_ascii=False))
+                if len(batch) >= 500:
+                    self._write_chunk(('\n'.join(batch) + '\n').encode('utf-8'))
+                    batch = []
+            if batch:
+                self._write_chunk(('\n'.join(batch) + '\n').encode('utf-8'))
+        except Exception as e:
+            # ヘッダー送信後はステータスを変えられないため、終端チャンクを送らずに接続を閉じる
+            self.close_connection = True
+            self.log_error("ストリーム送信中のエラー: %r", e)
+            return
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _write_chunk(self, data):
+        self.wfile.write(f'{len(data):X}\r\n'.encode('ascii') + data + b'\r\n')
+
+    def _send_error(self, status, message):
+        body = json.dumps({'error': message}, ensure_ascii=False).encode('utf-8')
+        self._send_body(None, body, status=status)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+    def log_error(self, format, *args):
+        # エラーは quiet でも出力する
+        super().log_message(format, *args)
+
+
+def create_server(host='127.0.0.1', port=8502, quiet=False):
+    """APIサーバーを作成（serve_forever() で起動）"""
+    MomentumAPIHandler.quiet = quiet
+    server = ThreadingHTTPServer((host, port), MomentumAPIHandler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ETF Momentum Checker API サーバー")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--quiet', action='store_true', help="アクセスログを出力しない")
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.quiet)
+    print(f"🌐 API サーバー起動: http://{args.host}:{args.port}")
+    print("   /signal, /backtest?start=YYYY-MM-DD&end=YYYY-MM-DD, /sweep, /snapshot")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 API サーバーを停止します")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import sqlite3
 from datetime import datetime, timedelta
 
 # yfinanceユーティリティをインポート
@@ -10,7 +11,18 @@ from yfinance_utils import (
     calculate_period_summary_real,
     get_etf_info
 )
+import momentum_core
+import price_store
 from backtest_yfinance import calculate_real_backtest
+from cost_utils import apply_transaction_costs, summarize_gross_net
+from export_utils import prepare_export_frame, to_parquet_bytes, to_arrow_ipc_bytes
+from alignment_utils import slice_range
+from benchmark_utils import get_benchmark_series, summarize_benchmarks
+from chart_utils import build_overlay_figure_json, figure_from_json
+from strategy_compare import DEFAULT_STRATEGIES, evaluate_strategies
+from profiling_utils import run_profiled
+from signal_history import asof, get_signal_history, history_prices
+from backtest_history import query_runs, record_backtest
 
 # 既存のサンプルデータ関数をインポート
 from sample_data import get_sample_momentum_signal, get_sample_backtest_data
@@ -89,6 +101,18 @@ def main():
             max_value=datetime.now()
         )
         
+        # リターン計算方式（ローカル価格ストアから調整、切り替え時の再取得なし）
+        return_mode_label = st.radio(
+            "📈 リターン計算",
+            ["既定（調整済み始値）", "価格リターン", "トータルリターン（配当込み）"],
+            index=0
+        )
+        return_mode = {
+            "既定（調整済み始値）": None,
+            "価格リターン": "price",
+            "トータルリターン（配当込み）": "total"
+        }[return_mode_label]
+        
         # 期間変更の説明
         st.caption("👆 期間を変更したら下のボタンで反映してください")
         
@@ -96,15 +120,26 @@ def main():
         recalculate = st.button("🔄 期間変更を反映", type="primary", use_container_width=True)
         
         if recalculate:
-            # キャッシュクリアして最新データで再計算
-            st.cache_data.clear()
+            # 月次データのキャッシュ（プロセス内・共有）と価格ストアの未確定バーを取り直して再計算
+            momentum_core.clear_history_cache(shared=True)
+            price_store.refresh_partial_bars()
             # セッション状態をクリアして確実に再計算
             if 'last_calculation' in st.session_state:
                 del st.session_state['last_calculation']
-            st.success("✅ 期間を更新しました！キャッシュもクリアして最新データで再計算します。")
+            st.success("✅ 期間を更新しました！月次データを取得し直して再計算します。")
             st.balloons()
             st.rerun()
         
+        # 取引コスト設定
+        st.markdown("---")
+        st.subheader("💸 取引コスト")
+        
+        commission_bps = st.number_input("売買手数料 (bps/片道)", min_value=0.0, value=0.0, step=1.0)
+        spread_bps = st.number_input("スプレッド (bps)", min_value=0.0, value=0.0, step=1.0)
+        fixed_fee = st.number_input("固定手数料 ($/片道)", min_value=0.0, value=0.0, step=1.0)
+        tax_rate_pct = st.number_input("売却益課税 (%)", min_value=0.0, max_value=100.0, value=0.0, step=1.0)
+        capital = st.number_input("初期資金 ($)", min_value=100.0, value=10000.0, step=1000.0)
+        
         # ETF情報
         st.markdown("---")
         st.subheader("📊 ETF情報")
@@ -203,13 +238,18 @@ def main():
         start_datetime = datetime.combine(start_date, datetime.min.time())
         end_datetime = datetime.combine(end_date, datetime.min.time())
         
-        backtest_df = calculate_real_backtest(start_datetime, end_datetime)
+        backtest_df = calculate_real_backtest(start_datetime, end_datetime, return_mode)
         
         if backtest_df is None:
             st.error("❌ リアルデータでのバックテストに失敗しました。サンプルデータを表示します。")
             backtest_df = get_sample_backtest_data(start_date, end_date)
         else:
             st.success(f"✅ リアルデータでバックテスト完了！ {len(backtest_df)}期間を分析")
+            # 履歴データベースに保存（同じ条件・データの実行は1件のみ）
+            try:
+                record_backtest(backtest_df, start_datetime, end_datetime, return_mode)
+            except sqlite3.Error as e:
+                st.caption(f"⚠️ バックテスト履歴を保存できませんでした: {e}")
     else:
         # サンプルデータでバックテスト
         if data_source == "🔴 リアルデータ（yfinance）":
@@ -359,6 +399,127 @@ def main():
                 delta="年平均"
             )
     
+    # 取引コスト控除後（グロス・ネット両方を表示）
+    cost_df = apply_transaction_costs(
+        backtest_df,
+        commission_bps=commission_bps,
+        spread_bps=spread_bps,
+        fixed_fee=fixed_fee,
+        tax_rate=tax_rate_pct / 100,
+        capital=capital
+    )
+    cost_summary = summarize_gross_net(cost_df)
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.metric("総リターン（グロス）", f"{cost_summary['gross_total_return']:+.1f}%", delta="コスト控除前")
+    
+    with col2:
+        st.metric(
+            "総リターン（ネット）",
+            f"{cost_summary['net_total_return']:+.1f}%",
+            delta=f"{-cost_summary['total_cost']:+.1f}%",
+            delta_color="normal" if cost_summary['total_cost'] <= 0 else "inverse"
+        )
+    
+    with col3:
+        st.metric("売買回数（片道）", f"{cost_summary['trade_count']}回", delta="コスト発生回数")
+
+    # ベンチマーク比較（バックテストで使用した価格行列を再利用、追加のデータ取得なし）
+    price_matrix = backtest_df.attrs.get('price_matrix')
+    if price_matrix is not None and 'hold_end_date' in backtest_df.columns:
+        st.subheader("📊 ベンチマーク比較")
+
+        hold_prices = slice_range(
+            price_matrix, backtest_df['hold_start_date'].iloc[0], backtest_df['hold_end_date'].iloc[-1], closed='both'
+        )
+        benchmark_curves = get_benchmark_series(hold_prices)
+
+        strategy_curve = pd.Series(
+            np.concatenate(([1.0], (1 + returns / 100).cumprod().to_numpy())),
+            index=pd.DatetimeIndex([backtest_df['hold_start_date'].iloc[0]]).append(
+                pd.DatetimeIndex(backtest_df['hold_end_date'])
+            )
+        )
+        series_map = {'IEFモメンタム戦略': strategy_curve}
+        series_map.update({name: benchmark_curves[name] for name in benchmark_curves.columns})
+        st.plotly_chart(
+            figure_from_json(build_overlay_figure_json(series_map)),
+            use_container_width=True
+        )
+
+        benchmark_stats = summarize_benchmarks(benchmark_curves)
+        benchmark_table = pd.DataFrame({
+            'ベンチマーク': benchmark_stats.index,
+            '総リターン': benchmark_stats['total_return'].apply(lambda x: f"{x:+.1f}%"),
+            '最大ドローダウン': benchmark_stats['max_drawdown'].apply(lambda x: f"{x:.1f}%")
+        })
+        st.dataframe(benchmark_table, use_container_width=True, hide_index=True)
+
+        # シグナル違いの戦略比較（同じ価格行列・共有シグナルで一括評価）
+        with st.expander("🧪 戦略比較（シグナル別）"):
+            comparison = evaluate_strategies(price_matrix, DEFAULT_STRATEGIES)
+            st.plotly_chart(
+                figure_from_json(build_overlay_figure_json(
+                    {name: comparison['curves'][name].dropna() for name in comparison['curves'].columns},
+                    title='📈 戦略別 累積リターン比較'
+                )),
+                use_container_width=True
+            )
+            strategy_stats = comparison['stats']
+            strategy_table = pd.DataFrame({
+                '戦略': strategy_stats.index,
+                '総リターン': strategy_stats['total_return'].apply(lambda x: f"{x:+.1f}%"),
+                'CAGR': strategy_stats['cagr'].apply(lambda x: f"{x:+.1f}%"),
+                '勝率': strategy_stats['win_rate'].apply(lambda x: f"{x:.1f}%"),
+                '最大ドローダウン': strategy_stats['max_drawdown'].apply(lambda x: f"{x:.1f}%"),
+                '切替回数': strategy_stats['switches'].astype(int)
+            })
+            st.dataframe(strategy_table, use_container_width=True, hide_index=True)
+
+        # 指定日時点の推奨（全期間の保存済み履歴を二分探索、表示期間によらず同じ履歴）
+        with st.expander("🕰️ 指定日時点の推奨銘柄"):
+            history = get_signal_history(DEFAULT_STRATEGIES[0], history_prices(DEFAULT_STRATEGIES[0]))
+            record = None
+            if history is not None:
+                query_date = st.date_input(
+                    "確認する日付",
+                    value=min(price_matrix.index[-1], pd.Timestamp(history['date'][-1])).date(),
+                    min_value=pd.Timestamp(history['date'][0]).date(),
+                    max_value=pd.Timestamp(history['date'][-1]).date(),
+                    key="asof_date"
+                )
+                record = asof(history, query_date)
+            else:
+                st.warning("⚠️ シグナル履歴を取得できませんでした")
+            if record is not None:
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("推奨銘柄", record['selected_etf'], delta=f"IEF {record['signal']:+.2f}%")
+                with col2:
+                    st.metric("保有銘柄", record['held_etf'] or "なし")
+                with col3:
+                    st.metric("判定月", record['date'].strftime('%Y/%m'),
+                              delta="リバランス月" if record['is_rebalance'] else "保有継続中")
+
+        # 保存済みのバックテスト結果（再計算なし）
+        with st.expander("🗂️ バックテスト履歴"):
+            runs = query_runs(limit=20)
+            if runs.empty:
+                st.caption("保存済みの実行はありません")
+            else:
+                history_table = pd.DataFrame({
+                    '実行日時': runs['created_at'],
+                    '戦略': runs['name'],
+                    '期間': runs['start_date'] + ' ～ ' + runs['end_date'],
+                    'リターン方式': runs['return_mode'],
+                    '総リターン': runs['total_return'].apply(lambda x: f"{x:+.1f}%"),
+                    'CAGR': runs['cagr'].apply(lambda x: f"{x:+.1f}%"),
+                    '最大ドローダウン': runs['max_drawdown'].apply(lambda x: f"{x:.1f}%"),
+                })
+                st.dataframe(history_table, use_container_width=True, hide_index=True)
+
     # 3ヶ月トレード結果のCSV出力
     st.markdown("---")
     st.subheader("📥 データエクスポート")
@@ -375,6 +536,28 @@ def main():
         use_container_width=True
     )
     
+    # 型付きエクスポート（数値・日付列をそのまま保存、分析ノートブック向け）
+    export_df = prepare_export_frame(cost_df)
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.download_button(
+            label="📦 Parquet形式でダウンロード",
+            data=to_parquet_bytes(export_df),
+            file_name=f"momentum_3month_trades_{start_date}_{end_date}.parquet",
+            mime="application/vnd.apache.parquet",
+            use_container_width=True
+        )
+    
+    with col2:
+        st.download_button(
+            label="📦 Arrow IPC形式でダウンロード",
+            data=to_arrow_ipc_bytes(export_df),
+            file_name=f"momentum_3month_trades_{start_date}_{end_date}.arrow",
+            mime="application/vnd.apache.arrow.file",
+            use_container_width=True
+        )
+    
     # フッター
     st.markdown("---")
     with st.expander("ℹ️ yfinance統合について"):
@@ -396,4 +579,5 @@ def main():
     st.markdown("🤖 **ETF Momentum Checker v1.1-dev** | 📱 iPhone対応 | 🌐 yfinance統合")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # ?profile=1 または MOMENTUM_PROFILE=1 でリクエストごとのプロファイルを保存
+    run_profiled(main, 'app_main', st.query_params)
\ No newline at end of file
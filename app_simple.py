@@ -7,6 +7,8 @@ import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from data_quality import normalize_index
+
 # セッションの設定でconnection poolingを改善
 @st.cache_resource
 def get_session():
@@ -47,9 +49,8 @@ def get_data_safe(symbol, start_date, end_date):
         if data.empty:
             return None
             
-        # タイムゾーン処理
-        if data.index.tz is not None:
-            data.index = data.index.tz_localize(None)
+        # タイムゾーン・重複日付の正規化
+        data, _ = normalize_index(data)
             
         return data
         
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+バックテスト履歴データベース（SQLite）
+実行したバックテストの条件・データバージョン・統計指標・トレードログを保存し、
+再計算せずに過去の結果を検索・比較できるようにする
+
+    runs        1実行1行（戦略パラメータ・期間・データバージョン・統計指標）
+    trade_logs  実行ごとのトレードログ（固定長レコードのバイナリ、1実行1行）
+
+同じ戦略・期間・リターン方式・データバージョンの実行は1件だけ保存する。
+MOMENTUM_BACKTEST_DB でデータベースのパスを指定する。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from cache_utils import hash_frame
+from signal_history import strategy_id
+from signals import signal_params
+from strategy_compare import _strategy_stats, evaluate_strategy, normalize_strategy
+
+BACKTEST_DB_PATH = os.environ.get('MOMENTUM_BACKTEST_DB', os.path.join('.backtest_history', 'runs.sqlite'))
+
+STAT_COLUMNS = ('trades', 'total_return', 'cagr', 'avg_return', 'win_rate', 'max_drawdown', 'switches')
+PARAM_COLUMNS = ('signal', 'signal_symbol', 'risk_on', 'risk_off', 'interval', 'hold')
+RUN_COLUMNS = ('created_at', 'source', 'strategy_id', 'name', *PARAM_COLUMNS, 'params', 'return_mode',
+               'start_date', 'end_date', 'data_version', *STAT_COLUMNS)
+# 同じ実行とみなすキー（UNIQUE 制約）
+RUN_KEY = ('strategy_id', 'start_date', 'end_date', 'return_mode', 'data_version')
+_INSERT_RUN = (f"INSERT OR IGNORE INTO runs ({', '.join(RUN_COLUMNS)}) "
+               f"VALUES ({', '.join(['?'] * len(RUN_COLUMNS))})")
+_SELECT_RUN_ID = f"SELECT run_id FROM runs WHERE {' AND '.join(f'{c} = ?' for c in RUN_KEY)}"
+_KEY_POSITIONS = [RUN_COLUMNS.index(c) for c in RUN_KEY]
+
+# トレードログの1レコード（日付は 1970-01-01 からの日数、保有銘柄は symbols のコード）
+TRADE_DTYPE = np.dtype([
+    ('hold_start', '<i4'),
+    ('hold_end', '<i4'),
+    ('selected', 'i1'),
+    ('return_pct', '<f8'),
+])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    source TEXT NOT NULL,
+    strategy_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    signal TEXT NOT NULL,
+    signal_symbol TEXT NOT NULL,
+    risk_on TEXT NOT NULL,
+    risk_off TEXT NOT NULL,
+    interval INTEGER NOT NULL,
+    hold INTEGER NOT NULL,
+    params TEXT NOT NULL,
+    return_mode TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    data_version TEXT NOT NULL,
+    trades INTEGER NOT NULL,
+    total_return REAL,
+    cagr REAL,
+    avg_return REAL,
+    win_rate REAL,
+    max_drawdown REAL,
+    switches INTEGER,
+    UNIQUE (strategy_id, start_date, end_date, return_mode, data_version)
+);
+CREATE TABLE IF NOT EXISTS trade_logs (
+    run_id INTEGER PRIMARY KEY REFERENCES runs (run_id) ON DELETE CASCADE,
+    symbols TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_params ON runs (signal, signal_symbol, interval, risk_on, risk_off);
+CREATE INDEX IF NOT EXISTS runs_period ON runs (start_date, end_date);
+CREATE INDEX IF NOT EXISTS runs_strategy ON runs (strategy_id, created_at);
+CREATE INDEX IF NOT EXISTS runs_created ON runs (created_at);
+CREATE INDEX IF NOT EXISTS runs_signal_interval_cagr ON runs (signal, interval, cagr);
+CREATE INDEX IF NOT EXISTS runs_cagr ON runs (cagr);
+"""
+
+_LOCAL = threading.local()
+
+
+def connect(path=None):
+    """スレッドごとの接続（初回にスキーマを作成、WAL モード）"""
+    path = path or BACKTEST_DB_PATH
+    connections = getattr(_LOCAL, 'connections', None)
+    if connections is None:
+        connections = _LOCAL.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA foreign_keys=ON')
+        conn.executescript(_SCHEMA)
+        connections[path] = conn
+    return conn
+
+
+def _days(dates):
+    return np.asarray(dates, dtype='datetime64[D]').astype(np.int32)
+
+
+def encode_trade_log(hold_start, hold_end, selected, return_pct):
+    """
+    トレードログを固定長レコードのバイト列に変換
+
+    Args:
+        hold_start, hold_end: 保有開始日・終了日の配列
+        selected: 保有銘柄の配列
+        return_pct: トレードリターン（%）の配列
+
+    Returns:
+        tuple: (銘柄コード表 list, バイト列)
+    """
+
+    symbols, codes = np.unique(np.asarray(selected, dtype=object).astype(str), return_inverse=True)
+    records = np.empty(len(return_pct), dtype=TRADE_DTYPE)
+    records['hold_start'] = _days(hold_start)
+    records['hold_end'] = _days(hold_end)
+    records['selected'] = codes
+    records['return_pct'] = return_pct
+    return symbols.tolist(), records.tobytes()
+
+
+def decode_trade_log(symbols, data):
+    """encode_trade_log の逆変換（DataFrame）"""
+    records = np.frombuffer(data, dtype=TRADE_DTYPE)
+    return pd.DataFrame({
+        'hold_start_date': pd.to_datetime(records['hold_start'].astype('datetime64[D]')),
+        'hold_end_date': pd.to_datetime(records['hold_end'].astype('datetime64[D]')),
+        'selected_etf': np.array(symbols, dtype=object)[records['selected']],
+        'return_pct': records['return_pct'],
+    })
+
+
+def _run_row(strategy, stats, start_date, end_date, return_mode, data_version, source, created_at):
+    """runs テーブルの1行（列順は RUN_COLUMNS）"""
+    params = signal_params(strategy['signal'], **strategy['signal_params'])
+    return (
+        created_at, source, strategy_id(strategy), strategy['name'],
+        *(strategy[column] for column in PARAM_COLUMNS),
+        json.dumps(params, sort_keys=True), return_mode or 'default',
+        pd.Timestamp(start_date).strftime('%Y-%m-%d'), pd.Timestamp(end_date).strftime('%Y-%m-%d'),
+        str(data_version), *(stats.get(column) for column in STAT_COLUMNS),
+    )
+
+
+def _insert_runs(conn, rows, logs):
+    """
+    実行結果をまとめて保存（1トランザクション、重複は既存の run_id を返す）
+
+    Returns:
+        list: 各実行の run_id
+    """
+
+    run_ids = []
+    with conn:
+        for row, (symbols, data) in zip(rows, logs):
+            cursor = conn.execute(_INSERT_RUN, row)
+            if cursor.rowcount:
+                run_id = cursor.lastrowid
+                conn.execute("INSERT INTO trade_logs (run_id, symbols, data) VALUES (?, ?, ?)",
+                             (run_id, json.dumps(symbols), data))
+            else:
+                run_id = conn.execute(_SELECT_RUN_ID, [row[i] for i in _KEY_POSITIONS]).fetchone()[0]
+            run_ids.append(run_id)
+    return run_ids
+
+
+def record_strategy_runs(price_matrix, strategies, start_date, end_date, return_mode=None, source='batch',
+                         path=None):
+    """
+    複数戦略を同じ価格行列で評価して保存
+
+    Args:
+        price_matrix (pd.DataFrame): 日付 × 銘柄の整列済み価格行列
+        strategies (list): 戦略定義
+        start_date, end_date: 分析期間
+        return_mode (str): リターン計算方式
+        source (str): 実行元（'app' / 'api' / 'batch' など）
+        path (str): データベースのパス
+
+    Returns:
+        list: 各戦略の run_id
+    """
+
+    data_version = hash_frame(price_matrix)
+    created_at = datetime.now().isoformat(timespec='seconds')
+    rows, logs = [], []
+    for strategy in map(normalize_strategy, strategies):
+        result = evaluate_strategy(price_matrix, strategy, data_version=data_version)
+        selected = np.where(result['risk_on'], strategy['risk_on'], strategy['risk_off'])
+        rows.append(_run_row(strategy, _strategy_stats(result), start_date, end_date, return_mode,
+                             data_version, source, created_at))
+        logs.append(encode_trade_log(result['hold_start'], result['hold_end'], selected, result['return_pct']))
+    return _insert_runs(connect(path), rows, logs)
+
+
+def record_backtest(backtest_df, start_date, end_date, return_mode=None, source='app', path=None):
+    """
+    calculate_real_backtest の結果（従来の IEF 1ヶ月モメンタム戦略）を保存
+
+    Returns:
+        int: run_id（結果が空・価格行列が無い場合は None）
+    """
+
+    price_matrix = backtest_df.attrs.get('price_matrix')
+    if backtest_df.empty or price_matrix is None:
+        return None
+
+    strategy = normalize_strategy({'name': 'IEF 1ヶ月モメンタム'})
+    risk_on = (backtest_df['selected_etf'] == strategy['risk_on']).to_numpy()
+    result = {
+        'hold_start': backtest_df['hold_start_date'].to_numpy(dtype='datetime64[ns]'),
+        'hold_end': backtest_df['hold_end_date'].to_numpy(dtype='datetime64[ns]'),
+        'return_pct': backtest_df['return_pct'].to_numpy(dtype=np.float64),
+        'risk_on': risk_on,
+    }
+    row = _run_row(strategy, _strategy_stats(result), start_date, end_date, return_mode,
+                   hash_frame(price_matrix), source, datetime.now().isoformat(timespec='seconds'))
+    log = encode_trade_log(result['hold_start'], result['hold_end'], backtest_df['selected_etf'].to_numpy(),
+                           result['return_pct'])
+    return _insert_runs(connect(path), [row], [log])[0]
+
+
+def query_runs(signal=None, signal_symbol=None, interval=None, risk_on=None, risk_off=None, strategy=None,
+               start_date=None, end_date=None, min_cagr=None, order_by='created_at', descending=True,
+               limit=100, path=None):
+    """
+    保存済みの実行を検索（インデックスを使用、トレードログは読まない）
+
+    Args:
+        signal, signal_symbol, interval, risk_on, risk_off: 戦略パラメータの一致条件
+        strategy (dict): 戦略定義（設定の完全一致）
+        start_date (datetime): この日以降に開始した期間
+        end_date (datetime): この日以前に終了した期間
+        min_cagr (float): CAGR（%）の下限
+        order_by (str): 並び順の列（runs の列名）
+        descending (bool): 降順かどうか
+        limit (int): 最大件数
+
+    Returns:
+        pd.DataFrame: run_id × 実行条件・統計指標
+    """
+
+    conditions, values = [], []
+    for column, value in (('signal', signal), ('signal_symbol', signal_symbol), ('interval', interval),
+                          ('risk_on', risk_on), ('risk_off', risk_off)):
+        if value is not None:
+            conditions.append(f"{column} = ?")
+            values.append(value)
+    if strategy is not None:
+        conditions.append("strategy_id = ?")
+        values.append(strategy_id(strategy))
+    if start_date is not None:
+        conditions.append("start_date >= ?")
+        values.append(pd.Timestamp(start_date).strftime('%Y-%m-%d'))
+    if end_date is not None:
+        conditions.append("end_date <= ?")
+        values.append(pd.Timestamp(end_date).strftime('%Y-%m-%d'))
+    if min_cagr is not None:
+        conditions.append("cagr >= ?")
+        values.append(min_cagr)
+
+    columns = {row[1] for row in connect(path).execute("PRAGMA table_info(runs)")}
+    if order_by not in columns:
+        raise ValueError(f"並び替えできない列: {order_by}")
+
+    sql = "SELECT * FROM runs"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += f" ORDER BY {order_by} {'DESC' if descending else 'ASC'}, run_id DESC LIMIT ?"
+    return pd.read_sql_query(sql, connect(path), params=[*values, limit], index_col='run_id')
+
+
+def load_trade_log(run_id, path=None):
+    """
+    保存済みのトレードログ
+
+    Returns:
+        pd.DataFrame: hold_start_date, hold_end_date, selected_etf, return_pct（未保存なら None）
+    """
+
+    row = connect(path).execute("SELECT symbols, data FROM trade_logs WHERE run_id = ?", (run_id,)).fetchone()
+    if row is None:
+        return None
+    return decode_trade_log(json.loads(row[0]), row[1])
+
+
+def compare_runs(run_ids, path=None):
+    """
+    複数の実行の統計指標を並べる
+
+    Returns:
+        pd.DataFrame: run_id × 戦略名・期間・統計指標
+    """
+
+    run_ids = list(run_ids)
+    if not run_ids:
+        return pd.DataFrame()
+    placeholders = ', '.join(['?'] * len(run_ids))
+    return pd.read_sql_query(
+        f"SELECT run_id, name, start_date, end_date, return_mode, {', '.join(STAT_COLUMNS)} "
+        f"FROM runs WHERE run_id IN ({placeholders})",
+        connect(path), params=run_ids, index_col='run_id'
+    ).reindex(run_ids)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from strategy_compare import DEFAULT_STRATEGIES, load_strategy_prices
+
+    parser = argparse.ArgumentParser(description="バックテスト履歴データベース")
+    parser.add_argument('--record', action='store_true', help="既定の戦略（--grid で全グリッド）を評価して保存")
+    parser.add_argument('--grid', action='store_true')
+    parser.add_argument('--start', default='2011-01-01')
+    parser.add_argument('--signal')
+    parser.add_argument('--interval', type=int)
+    parser.add_argument('--order-by', default='cagr')
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.record:
+        if args.grid:
+            from signal_alerts import strategy_grid
+            strategies = strategy_grid()
+        else:
+            strategies = DEFAULT_STRATEGIES
+        start, end = datetime.strptime(args.start, '%Y-%m-%d'), datetime.now()
+        prices = load_strategy_prices(strategies, start, end)
+        if prices is None:
+            raise SystemExit("❌ データ取得に失敗しました")
+        run_ids = record_strategy_runs(prices, strategies, start, end)
+        print(f"💾 {len(run_ids):,}件の実行を保存しました")
+
+    runs = query_runs(signal=args.signal, interval=args.interval, order_by=args.order_by, limit=args.limit)
+    print(runs[['name', 'start_date', 'end_date', 'trades', 'total_return', 'cagr', 'max_drawdown']]
+          .round(2).to_string())
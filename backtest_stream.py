@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+ストリーミング型バックテスト
+価格行列をチャンク単位で受け取り、確定したトレードから順にトレードログを返す
+（全期間の結果をメモリに保持せず、一定メモリで長期間・継続的な計算を行う）
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from export_utils import trade_log_to_table, write_arrow_ipc_chunks, write_parquet_chunks
+from momentum_core import build_price_matrix, get_monthly_data_for_backtest, trade_log_at_positions
+from rebalance_schedule import bar_rebalance_positions
+from trade_log import NO_POSITION, iter_trade_records
+
+REBALANCE_INTERVAL = 3  # 3ヶ月ごとのリバランス
+
+
+def iter_price_chunks(price_matrix, chunk_rows=120):
+    """
+    価格行列を行数ごとのチャンクに分割して返す
+
+    Args:
+        price_matrix (pd.DataFrame): 日付 × 銘柄の価格行列
+        chunk_rows (int): 1チャンクの行数
+
+    Yields:
+        pd.DataFrame: 価格行列のチャンク
+    """
+
+    for start in range(0, len(price_matrix), chunk_rows):
+        yield price_matrix.iloc[start:start + chunk_rows]
+
+
+def iter_fetched_price_chunks(start_date, end_date, months_per_chunk=60):
+    """
+    期間を分割してデータを取得し、価格行列のチャンクを順に返す
+
+    最初のチャンクを取得した時点で後段の計算を開始できる。
+
+    Args:
+        start_date (datetime): 開始日
+        end_date (datetime): 終了日
+        months_per_chunk (int): 1回に取得する月数
+
+    Yields:
+        pd.DataFrame: 価格行列のチャンク（取得失敗時は終了）
+    """
+
+    window_start = start_date
+    last_date = None
+    while window_start < end_date:
+        window_end = min(window_start + relativedelta(months=months_per_chunk), end_date)
+        data = get_monthly_data_for_backtest(window_start, window_end)
+        if data is None:
+            print("❌ データ取得に失敗したためストリームを終了します")
+            return
+        price_matrix = build_price_matrix(data)
+
+        # 取得期間の境界で重複した行は除外
+        if last_date is not None:
+            price_matrix = price_matrix[price_matrix.index > last_date]
+        if not price_matrix.empty:
+            last_date = price_matrix.index[-1]
+            yield price_matrix
+        window_start = window_end
+
+
+def iter_trade_log_chunks(price_chunks):
+    """
+    価格行列のチャンクからトレードログのチャンクを逐次計算
+
+    リバランス判定には前月行、保有終了には2行先が必要なため、
+    未確定のリバランスに必要な末尾数行だけをバッファとして持ち越す。
+    全チャンクを連結して compute_trade_log を実行した結果と同じトレードを返す。
+
+    Args:
+        price_chunks (iterable): 日付昇順の価格行列チャンク（IEF, TQQQ, GLD 列）
+
+    Yields:
+        np.ndarray: TRADE_LOG_DTYPE のレコード配列（空チャンクは返さない）
+    """
+
+    buffer = None
+    base = 0             # buffer 先頭行の通算位置
+    next_rebalance = 1   # 次のリバランスの通算位置
+    prev_etf = NO_POSITION
+
+    for chunk in price_chunks:
+        if chunk is None or chunk.empty:
+            continue
+        buffer = chunk if buffer is None else pd.concat([buffer, chunk])
+        total_rows = base + len(buffer)
+
+        # 保有終了行（+2）まで揃ったリバランスを確定
+        last = total_rows - 3
+        if next_rebalance <= last:
+            positions = bar_rebalance_positions(last + 3, REBALANCE_INTERVAL, next_rebalance)
+            log = trade_log_at_positions(buffer, positions - base, prev_etf=prev_etf)
+            prev_etf = int(log['etf'][-1])
+            next_rebalance = int(positions[-1]) + REBALANCE_INTERVAL
+            yield log
+
+        # 次のリバランス判定に必要な前月行以降だけを残す
+        keep_from = max(next_rebalance - 1 - base, 0)
+        buffer = buffer.iloc[keep_from:]
+        base += keep_from
+
+
+def iter_trade_records_stream(price_chunks):
+    """トレードを1件ずつ辞書で返す（NDJSON 出力などに使用）"""
+    for log in iter_trade_log_chunks(price_chunks):
+        yield from iter_trade_records(log)
+
+
+def new_running_stats():
+    """ストリーミング統計の初期状態"""
+    return {
+        'trades': 0,
+        'wins': 0,
+        'sum_return': 0.0,
+        'equity': 1.0,
+        'peak': 1.0,
+        'max_drawdown': 0.0,
+        'max_gain': -np.inf,
+        'max_loss': np.inf,
+    }
+
+
+def update_running_stats(stats, log):
+    """
+    トレードログのチャンクでストリーミング統計を更新
+
+    Args:
+        stats (dict): new_running_stats() の状態（更新される）
+        log (np.ndarray): TRADE_LOG_DTYPE のレコード配列
+    """
+
+    returns = log['return_pct']
+    if len(returns) == 0:
+        return stats
+
+    equity = stats['equity'] * np.cumprod(1 + returns / 100)
+    peak = np.maximum.accumulate(np.maximum(equity, stats['peak']))
+
+    stats['trades'] += len(returns)
+    stats['wins'] += int((returns > 0).sum())
+    stats['sum_return'] += float(returns.sum())
+    stats['equity'] = float(equity[-1])
+    stats['peak'] = float(peak[-1])
+    stats['max_drawdown'] = min(stats['max_drawdown'], float(((equity / peak - 1) * 100).min()))
+    stats['max_gain'] = max(stats['max_gain'], float(returns.max()))
+    stats['max_loss'] = min(stats['max_loss'], float(returns.min()))
+    return stats
+
+
+def finalize_running_stats(stats):
+    """
+    ストリーミング統計の結果を作成
+
+    Returns:
+        dict: {'trades', 'total_return', 'avg_return', 'win_rate', 'max_gain', 'max_loss', 'max_drawdown'}（%）
+    """
+
+    trades = stats['trades']
+    if trades == 0:
+        return {'trades': 0}
+    return {
+        'trades': trades,
+        'total_return': (stats['equity'] - 1) * 100,
+        'avg_return': stats['sum_return'] / trades,
+        'win_rate': stats['wins'] / trades * 100,
+        'max_gain': stats['max_gain'],
+        'max_loss': stats['max_loss'],
+        'max_drawdown': stats['max_drawdown'],
+    }
+
+
+def consume_trade_log_stream(log_chunks, path=None, file_format='parquet'):
+    """
+    トレードログのストリームをファイルへ書き出しつつ統計を計算
+
+    Args:
+        log_chunks (iterable): トレードログのチャンク
+        path (str): 出力ファイルパス（None の場合は統計のみ）
+        file_format (str): 'parquet', 'arrow' または 'ndjson'
+
+    Returns:
+        dict: finalize_running_stats() の結果
+    """
+
+    stats = new_running_stats()
+
+    def tracked():
+        for log in log_chunks:
+            update_running_stats(stats, log)
+            yield log
+
+    if path is None:
+        for _ in tracked():
+            pass
+    elif file_format == 'parquet':
+        write_parquet_chunks((trade_log_to_table(log) for log in tracked()), path)
+    elif file_format == 'arrow':
+        write_arrow_ipc_chunks((trade_log_to_table(log) for log in tracked()), path)
+    elif file_format == 'ndjson':
+        with open(path, 'w', encoding='utf-8') as f:
+            for log in tracked():
+                for record in iter_trade_records(log):
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    else:
+        raise ValueError(f"未対応の出力形式: {file_format}")
+
+    return finalize_running_stats(stats)
+
+
+if __name__ == "__main__":
+    from datetime import datetime
+
+    print("🧪 ストリーミングバックテスト")
+    chunks = iter_fetched_price_chunks(datetime(2011, 1, 1), datetime.now(), months_per_chunk=36)
+    stats = consume_trade_log_stream(iter_trade_log_chunks(chunks))
+    print(f"✅ {stats}")
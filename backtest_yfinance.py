@@ -3,153 +3,60 @@
 yfinanceを使用した3ヶ月リバランスバックテスト機能
 """
 
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import warnings
-from yfinance_utils import get_etf_data
+from profiling_utils import profiled
 
-warnings.filterwarnings('ignore')
+# 計算エンジンは共通パッケージ momentum_core に集約（既存の import 先として再公開）
+from momentum_core import (
+    BacktestResult,
+    build_price_matrix,
+    compute_trade_log,
+    get_monthly_data_for_backtest,
+    run_backtest,
+    trade_log_at_positions,
+)
 
-def get_monthly_data_for_backtest(start_date, end_date):
-    """
-    バックテスト用の月次データを取得
-    
-    Args:
-        start_date (datetime): 開始日
-        end_date (datetime): 終了日
-    
-    Returns:
-        dict: {'IEF': df, 'TQQQ': df, 'GLD': df} または None
-    """
-    
-    print(f"📊 バックテスト用データ取得: {start_date.strftime('%Y-%m-%d')} ～ {end_date.strftime('%Y-%m-%d')}")
-    
-    symbols = ['IEF', 'TQQQ', 'GLD']
-    data = {}
-    
-    for symbol in symbols:
-        print(f"   {symbol} データ取得中...")
-        df = get_etf_data(symbol, start_date, end_date)
-        
-        if df is None or df.empty:
-            print(f"   ❌ {symbol}: データ取得失敗")
-            return None
-        else:
-            print(f"   ✅ {symbol}: {len(df)}期間")
-            data[symbol] = df
-    
-    return data
+warnings.filterwarnings('ignore')
 
-def calculate_real_backtest(start_date, end_date):
+@profiled('backtest')
+def calculate_real_backtest(start_date, end_date, return_mode=None):
     """
     リアルデータを使用した3ヶ月リバランスバックテスト
+    （momentum_core.run_backtest の結果を進捗表示付きで従来形式のDataFrameにする）
     
     Args:
         start_date (datetime): 開始日
         end_date (datetime): 終了日
+        return_mode (str): None（従来の調整済みデータ）、'price'（価格リターン）、
+            'total'（トータルリターン）
     
     Returns:
-        pd.DataFrame: バックテスト結果 または None
+        pd.DataFrame: バックテスト結果（attrs に trade_log・price_matrix）または None
     """
     
     print("\n🚀 リアルデータバックテスト開始")
     print("=" * 50)
     
-    # データ取得
-    data = get_monthly_data_for_backtest(start_date, end_date)
-    if data is None:
-        print("❌ データ取得に失敗しました")
-        return None
-    
-    ief_data = data['IEF']
-    tqqq_data = data['TQQQ']
-    gld_data = data['GLD']
-    
-    # データの整合性チェック
-    min_periods = min(len(ief_data), len(tqqq_data), len(gld_data))
-    if min_periods < 4:  # 最低4期間必要（判定期間1 + 保有期間3）
-        print(f"❌ データが不足しています (取得期間: {min_periods})")
-        return None
-    
-    print(f"✅ データ整合性確認: {min_periods}期間で分析")
-    
-    # 日付インデックスを統一
-    common_dates = ief_data.index.intersection(tqqq_data.index).intersection(gld_data.index)
-    
-    if len(common_dates) < 4:
-        print(f"❌ 共通期間が不足: {len(common_dates)}期間")
+    result = run_backtest(start_date, end_date, return_mode)
+    if result is None:
+        print("❌ バックテストを実行できませんでした（データ取得失敗・期間不足）")
         return None
     
+    common_dates = result.price_matrix.index
+    print(f"✅ データ整合性確認: {len(common_dates)}期間で分析")
     print(f"📅 分析期間: {common_dates[0].strftime('%Y-%m-%d')} ～ {common_dates[-1].strftime('%Y-%m-%d')}")
     
-    # 正しい3ヶ月リバランス戦略でバックテスト実行
-    results = []
-    current_position = None  # 現在のポジション
-    
-    # 3ヶ月ごとのリバランス（重複保有期間なし）
-    i = 1  # 前月データが必要なので1から開始
-    
-    while i < len(common_dates) - 2:  # 3ヶ月後データが必要
-        
-        # リバランス判定日（3ヶ月期間の開始）
-        rebalance_date = common_dates[i]
-        
-        # IEF判定: 前月のパフォーマンス
-        ief_current = ief_data.loc[rebalance_date, 'Open']  # 今月初
-        ief_previous = ief_data.loc[common_dates[i-1], 'Open']  # 前月初
-        ief_return = ((ief_current - ief_previous) / ief_previous) * 100
-        
-        # 推奨銘柄判定
-        selected_etf = 'TQQQ' if ief_return > 0 else 'GLD'
-        
-        # 3ヶ月保有期間設定
-        hold_start_date = rebalance_date  # リバランス日に売買
-        hold_end_date = common_dates[i + 2]  # 3ヶ月後（次のリバランス日）
-        
-        # アクション判定
-        if current_position == selected_etf:
-            action = "継続保有"
-        else:
-            action = f"{current_position or '初回'} → {selected_etf}"
-            current_position = selected_etf
-        
-        # パフォーマンス計算
-        if selected_etf == 'TQQQ':
-            start_price = tqqq_data.loc[hold_start_date, 'Open']  # 開始価格
-            end_price = tqqq_data.loc[hold_end_date, 'Open']      # 終了価格
-        else:  # GLD
-            start_price = gld_data.loc[hold_start_date, 'Open']   # 開始価格
-            end_price = gld_data.loc[hold_end_date, 'Open']       # 終了価格
-        
-        return_pct = ((end_price - start_price) / start_price) * 100
-        
-        results.append({
-            'period': f"{rebalance_date.strftime('%Y/%m')}",
-            'rebalance_date': rebalance_date.strftime('%Y/%m/%d'),
-            'ief_signal': ief_return,
-            'selected_etf': selected_etf,
-            'action': action,
-            'start_price': start_price,
-            'end_price': end_price,
-            'return_pct': return_pct,
-            'hold_start_date': hold_start_date,
-            'hold_end_date': hold_end_date,
-            'start_date': hold_start_date,  # 互換性のため
-            'end_date': hold_end_date      # 互換性のため
-        })
-        
-        print(f"   📈 {rebalance_date.strftime('%Y/%m')}: IEF{ief_return:+.1f}% → {selected_etf} ({action}) → {return_pct:+.1f}%")
-        
-        # 次のリバランスは3ヶ月後
-        i += 3
-    
-    if not results:
+    if result.trades == 0:
         print("❌ バックテスト結果が生成されませんでした")
         return None
     
-    df = pd.DataFrame(results)
+    df = result.to_frame()
+    for row in df.itertuples(index=False):
+        print(f"   📈 {row.period}: IEF{row.ief_signal:+.1f}% → {row.selected_etf} ({row.action}) → {row.return_pct:+.1f}%")
+    
     print(f"\n✅ バックテスト完了: {len(df)}期間の結果を生成")
     
     return df
@@ -171,7 +78,7 @@ def compare_backtest_results(start_date, end_date):
     
     # サンプルデータでのバックテスト（既存機能）
     try:
-        from app import get_sample_backtest_data
+        from sample_data import get_sample_backtest_data
         sample_results = get_sample_backtest_data(start_date.date(), end_date.date())
         
         print(f"\n📈 結果比較:")
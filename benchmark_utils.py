@@ -0,0 +1,144 @@
+"""
+ベンチマーク系列ユーティリティ
+バックテストで使用した整列済み価格行列から、買い持ち・固定比率ポートフォリオの
+累積リターン系列をまとめて計算する
+"""
+
+import numpy as np
+import pandas as pd
+
+from cache_utils import BoundedCache, hash_frame
+
+# 既定のベンチマーク定義 {名前: {銘柄: 比率}}
+DEFAULT_BENCHMARKS = {
+    'TQQQ 買い持ち': {'TQQQ': 1.0},
+    'GLD 買い持ち': {'GLD': 1.0},
+    'IEF 買い持ち': {'IEF': 1.0},
+    '60/40 (TQQQ/IEF)': {'TQQQ': 0.6, 'IEF': 0.4},
+}
+
+# (価格データバージョン, ベンチマーク定義, リバランス有無) → 計算結果
+_BENCHMARK_CACHE_MAX_ENTRIES = 32
+_BENCHMARK_CACHE = BoundedCache('benchmarks', max_entries=_BENCHMARK_CACHE_MAX_ENTRIES)
+
+
+def _benchmark_key(prices, benchmarks, rebalance):
+    """メモ化キーを作成（価格の内容ハッシュ・定義）"""
+    spec = tuple(
+        (name, tuple(sorted(weights.items())))
+        for name, weights in benchmarks.items()
+    )
+    # 同じ銘柄・期間でもリターン方式（price / total）で価格が異なるため内容で区別する
+    return (hash_frame(prices), spec, rebalance)
+
+
+def compute_benchmark_curves(prices, benchmarks=None, rebalance=True):
+    """
+    整列済み価格行列からベンチマークの累積リターン（倍率）を計算
+
+    全ベンチマークを1回の行列演算で求める。
+    rebalance=True の場合は各期間の始めに固定比率へリバランスし、
+    False の場合は初期比率で買い持ちする。
+
+    Args:
+        prices (pd.DataFrame): 日付 × 銘柄の価格行列（欠損なし）
+        benchmarks (dict): {名前: {銘柄: 比率}}（None の場合は既定定義）
+        rebalance (bool): 毎期リバランスするかどうか
+
+    Returns:
+        pd.DataFrame: 日付 × ベンチマーク名の累積リターン（初日=1.0）
+    """
+
+    if benchmarks is None:
+        benchmarks = DEFAULT_BENCHMARKS
+
+    # 価格行列に存在する銘柄のみで構成できるベンチマークに限定
+    usable = {
+        name: weights for name, weights in benchmarks.items()
+        if all(symbol in prices.columns for symbol in weights)
+    }
+    if prices.empty or not usable:
+        return pd.DataFrame(index=prices.index)
+
+    values = prices.to_numpy(dtype=np.float64)
+    symbol_pos = {symbol: i for i, symbol in enumerate(prices.columns)}
+
+    # 比率行列 W（銘柄 × ベンチマーク）
+    weights = np.zeros((values.shape[1], len(usable)))
+    for j, symbol_weights in enumerate(usable.values()):
+        total = sum(symbol_weights.values())
+        for symbol, weight in symbol_weights.items():
+            weights[symbol_pos[symbol], j] = weight / total
+
+    if rebalance:
+        # 期間リターン行列 × 比率行列 → 各ベンチマークの期間リターン
+        period_returns = values[1:] / values[:-1] - 1
+        curves = np.empty((values.shape[0], weights.shape[1]))
+        curves[0] = 1.0
+        curves[1:] = np.cumprod(1 + period_returns @ weights, axis=0)
+    else:
+        # 初日を1に正規化した価格 × 比率行列 → 買い持ち評価額
+        curves = (values / values[0]) @ weights
+
+    return pd.DataFrame(curves, index=prices.index, columns=list(usable.keys()))
+
+
+def get_benchmark_series(prices, benchmarks=None, rebalance=True):
+    """
+    ベンチマーク累積リターンを取得（価格データの内容ごとにメモ化）
+
+    同じ価格行列に対する2回目以降の呼び出しは再計算しない。
+    チャート・統計パネルなど複数箇所から同じ結果を共有するために使用する。
+
+    Args:
+        prices (pd.DataFrame): 日付 × 銘柄の整列済み価格行列
+        benchmarks (dict): {名前: {銘柄: 比率}}（None の場合は既定定義）
+        rebalance (bool): 毎期リバランスするかどうか
+
+    Returns:
+        pd.DataFrame: 日付 × ベンチマーク名の累積リターン（初日=1.0）
+    """
+
+    if benchmarks is None:
+        benchmarks = DEFAULT_BENCHMARKS
+    if prices is None or prices.empty:
+        return pd.DataFrame()
+
+    key = _benchmark_key(prices, benchmarks, rebalance)
+    cached = _BENCHMARK_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    curves = compute_benchmark_curves(prices, benchmarks, rebalance)
+    _BENCHMARK_CACHE.put(key, curves)
+
+    return curves
+
+
+def summarize_benchmarks(curves):
+    """
+    ベンチマーク累積リターンから統計を計算
+
+    Args:
+        curves (pd.DataFrame): get_benchmark_series の結果
+
+    Returns:
+        pd.DataFrame: ベンチマーク名 × (総リターン, 最大ドローダウン)（%）
+    """
+
+    if curves.empty:
+        return pd.DataFrame(columns=['total_return', 'max_drawdown'])
+
+    values = curves.to_numpy()
+    total_return = (values[-1] / values[0] - 1) * 100
+    drawdown = (values / np.maximum.accumulate(values, axis=0) - 1) * 100
+
+    return pd.DataFrame(
+        {'total_return': total_return, 'max_drawdown': drawdown.min(axis=0)},
+        index=curves.columns
+    )
+
+
+def clear_benchmark_cache():
+    """ベンチマークキャッシュをクリア"""
+    _BENCHMARK_CACHE.clear()
@@ -0,0 +1,289 @@
+"""
+キャッシュ共通ユーティリティ（上限付きメモリキャッシュ・キャッシュキー用ハッシュ）
+件数・推定バイト数の上限と LRU / LFU の追い出しを持つキャッシュ。
+プロジェクト内のメモリキャッシュはすべてこのクラスを使い、cache_metrics で
+件数・サイズ・ヒット数・追い出し数をまとめて確認できる。
+
+他のプロジェクト内モジュールを import しない（signals・chart_utils・momentum_core の
+どこからでも循環 import なしで使えるように）。
+
+上限は環境変数で上書きできる（名前は大文字、'-' と '.' は '_'）:
+    MOMENTUM_CACHE_{NAME}_ENTRIES   件数の上限
+    MOMENTUM_CACHE_{NAME}_MB        推定サイズの上限（MB）
+    MOMENTUM_CACHE_MB               個別指定が無いキャッシュのサイズ上限（MB）
+    MOMENTUM_CACHE_POLICY           'lru'（既定）または 'lfu'
+"""
+
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+POLICIES = ('lru', 'lfu')
+
+_MISSING = object()
+_REGISTRY: "OrderedDict[str, BoundedCache]" = OrderedDict()
+_REGISTRY_LOCK = threading.Lock()
+
+
+def hash_frame(df, columns=None):
+    """
+    DataFrameの内容ハッシュを計算（キャッシュキー用）
+
+    Args:
+        df (pd.DataFrame): 対象データ
+        columns (list): ハッシュ対象の列（None の場合は全列）
+
+    Returns:
+        str: 16進ハッシュ文字列
+    """
+
+    target = df if columns is None else df[list(columns)]
+    row_hashes = pd.util.hash_pandas_object(target, index=True).to_numpy()
+    digest = hashlib.sha1(row_hashes.tobytes())
+    digest.update(','.join(map(str, target.columns)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def estimate_nbytes(value: Any, _depth: int = 0) -> int:
+    """値のおおよそのメモリ使用量（バイト）"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=False))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, str)):
+        return sys.getsizeof(value)
+    if _depth < 4 and isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v, _depth + 1) for v in value.values())
+    if _depth < 4 and isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v, _depth + 1) for v in value)
+    return sys.getsizeof(value)
+
+
+def _env_name(name: str) -> str:
+    return name.upper().replace('-', '_').replace('.', '_')
+
+
+def _env_limits(name: str, max_entries: Optional[int], max_bytes: Optional[int]):
+    """環境変数による上限の上書き"""
+    prefix = f"MOMENTUM_CACHE_{_env_name(name)}"
+    if os.environ.get(f"{prefix}_ENTRIES"):
+        max_entries = int(os.environ[f"{prefix}_ENTRIES"])
+    megabytes = os.environ.get(f"{prefix}_MB") or os.environ.get('MOMENTUM_CACHE_MB')
+    if megabytes:
+        max_bytes = int(float(megabytes) * 1024 ** 2)
+    return max_entries, max_bytes
+
+
+class BoundedCache:
+    """
+    件数・推定バイト数の上限付きキャッシュ（スレッドセーフ）
+
+    Args:
+        name: メトリクス・環境変数で使う名前
+        max_entries: 件数の上限（None は無制限）
+        max_bytes: 推定サイズの上限（None は無制限）
+        policy: 'lru'（最も長く使われていないものから）または 'lfu'（使用回数が少ないものから）
+        sizeof: 値のサイズ推定関数
+    """
+
+    def __init__(self, name: str, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 policy: Optional[str] = None, sizeof=estimate_nbytes):
+        policy = policy or os.environ.get('MOMENTUM_CACHE_POLICY', 'lru')
+        if policy not in POLICIES:
+            raise ValueError(f"未対応の追い出し方式: {policy}")
+
+        self.name = name
+        self.max_entries, self.max_bytes = _env_limits(name, max_entries, max_bytes)
+        self.policy = policy
+        self._sizeof = sizeof
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()  # 先頭ほど長く使われていない
+        self._sizes: Dict[Hashable, int] = {}
+        self._uses: Dict[Hashable, int] = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'rejected': 0}
+
+        with _REGISTRY_LOCK:
+            _REGISTRY[name] = self
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """値を取得（ヒット・ミスを記録し、使用順・回数を更新）"""
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self._stats['misses'] += 1
+                return default
+            self._use(key)
+            self._stats['hits'] += 1
+            return value
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """値を取得（統計・使用順は変更しない）"""
+        return self._data.get(key, default)
+
+    def touch(self, key: Hashable) -> None:
+        """peek で取得した値を使用したことを記録（ヒットとして数える）"""
+        with self._lock:
+            if key in self._data:
+                self._use(key)
+                self._stats['hits'] += 1
+
+    def record_miss(self) -> None:
+        """peek で見つからなかったことを記録"""
+        with self._lock:
+            self._stats['misses'] += 1
+
+    def put(self, key: Hashable, value: Any) -> bool:
+        """
+        値を保存し、上限を超えた分を追い出す
+
+        Returns:
+            保存したかどうか（1件でサイズ上限を超える値は保存しない）
+        """
+
+        size = self._sizeof(value)
+        with self._lock:
+            if self.max_bytes is not None and size > self.max_bytes:
+                self._stats['rejected'] += 1
+                self._remove(key)
+                return False
+            self._remove(key)
+            self._data[key] = value
+            self._sizes[key] = size
+            self._uses[key] = 1
+            self._bytes += size
+            self._evict(protect=key)
+            return True
+
+    __setitem__ = put
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._data.get(key, default)
+            self._remove(key)
+            return value
+
+    def keys(self) -> List[Hashable]:
+        """キーの一覧（スナップショット）"""
+        with self._lock:
+            return list(self._data)
+
+    def items(self) -> List[tuple]:
+        """(キー, 値) の一覧（スナップショット、統計は変更しない）"""
+        with self._lock:
+            return list(self._data.items())
+
+    def clear(self, reset_stats: bool = False) -> None:
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._uses.clear()
+            self._bytes = 0
+            if reset_stats:
+                self._stats.update(hits=0, misses=0, evictions=0, rejected=0)
+
+    def configure(self, max_entries: Any = _MISSING, max_bytes: Any = _MISSING, policy: Optional[str] = None) -> None:
+        """上限・追い出し方式を変更（超過分はすぐに追い出す）"""
+        with self._lock:
+            if max_entries is not _MISSING:
+                self.max_entries = max_entries
+            if max_bytes is not _MISSING:
+                self.max_bytes = max_bytes
+            if policy is not None:
+                if policy not in POLICIES:
+                    raise ValueError(f"未対応の追い出し方式: {policy}")
+                self.policy = policy
+            self._evict()
+
+    def info(self) -> Dict[str, Any]:
+        """件数・推定サイズ・上限・ヒット数・追い出し数"""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                'name': self.name,
+                'policy': self.policy,
+                'entries': len(self._data),
+                'max_entries': self.max_entries,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                **self._stats,
+                'hit_rate': self._stats['hits'] / lookups if lookups else 0.0,
+            }
+
+    def _use(self, key: Hashable) -> None:
+        self._data.move_to_end(key)
+        self._uses[key] += 1
+
+    def _remove(self, key: Hashable) -> None:
+        if key in self._data:
+            del self._data[key]
+            self._bytes -= self._sizes.pop(key)
+            del self._uses[key]
+
+    def _over_limit(self) -> bool:
+        return (self.max_entries is not None and len(self._data) > self.max_entries) or \
+            (self.max_bytes is not None and self._bytes > self.max_bytes)
+
+    def _victim(self, protect: Hashable) -> Hashable:
+        candidates = (key for key in self._data if key != protect)
+        if self.policy == 'lru':
+            return next(candidates)
+        # 使用回数が最小のもの（同数なら長く使われていない方）
+        return min(candidates, key=self._uses.__getitem__)
+
+    def _evict(self, protect: Hashable = _MISSING) -> None:
+        while self._over_limit() and len(self._data) > (1 if protect in self._data else 0):
+            self._remove(self._victim(protect))
+            self._stats['evictions'] += 1
+
+
+def get_cache(name: str) -> Optional[BoundedCache]:
+    with _REGISTRY_LOCK:
+        return _REGISTRY.get(name)
+
+
+def configure_cache(name: str, **limits) -> None:
+    """
+    登録済みキャッシュの上限を変更
+
+    Args:
+        name: キャッシュ名（cache_metrics の name 列）
+        **limits: max_entries / max_bytes / policy
+    """
+
+    cache = get_cache(name)
+    if cache is None:
+        raise KeyError(f"未登録のキャッシュ: {name}")
+    cache.configure(**limits)
+
+
+def cache_metrics() -> List[Dict[str, Any]]:
+    """
+    登録済みの全キャッシュのメトリクス（表示には pd.DataFrame(cache_metrics()) を使用）
+
+    Returns:
+        list: キャッシュごとの件数・推定サイズ・上限・ヒット数・ミス数・追い出し数・ヒット率
+    """
+
+    with _REGISTRY_LOCK:
+        caches = list(_REGISTRY.values())
+    return [cache.info() for cache in caches]
+
+
+def total_cache_bytes() -> int:
+    """全キャッシュの推定サイズの合計"""
+    return sum(info['bytes'] for info in cache_metrics())
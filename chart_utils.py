@@ -0,0 +1,277 @@
+"""
+チャート描画ユーティリティ
+長期間の累積リターンや多数の比較ラインを軽量に描画するための関数群
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from cache_utils import BoundedCache, hash_frame
+
+# 1ラインあたりの既定の最大描画点数（一般的なチャート幅のピクセル数程度）
+DEFAULT_MAX_POINTS = 1000
+
+# ETFごとの表示色
+ETF_COLORS = {'TQQQ': '#ff7f0e', 'GLD': '#2ca02c', 'IEF': '#9467bd'}
+
+# 図JSONのキャッシュ（結果ハッシュ → JSON文字列）
+_FIGURE_CACHE_MAX_ENTRIES = 64
+_FIGURE_CACHE = BoundedCache('figures', max_entries=_FIGURE_CACHE_MAX_ENTRIES)
+
+
+def _to_numeric_x(x):
+    """日付列を含むx値を数値配列（int64ナノ秒 または float）に変換"""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets法で残す点のインデックスを計算
+
+    Args:
+        x (array-like): x値（昇順、日付可）
+        y (array-like): y値
+        n_out (int): 出力点数
+
+    Returns:
+        np.ndarray: 残す点のインデックス（昇順）
+    """
+
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    xs = _to_numeric_x(x)
+    ys = np.asarray(y, dtype=np.float64)
+
+    # 先頭と末尾を除いた点を n_out - 2 個のバケットに分割
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    prev = 0
+    for b in range(n_out - 2):
+        start, end = edges[b], edges[b + 1]
+
+        # 次バケットの平均点（最後のバケットは末尾の点）
+        if b < n_out - 3:
+            next_start, next_end = edges[b + 1], edges[b + 2]
+            avg_x = xs[next_start:next_end].mean()
+            avg_y = ys[next_start:next_end].mean()
+        else:
+            avg_x, avg_y = xs[-1], ys[-1]
+
+        # 前回選択点・候補点・次バケット平均点が作る三角形の面積が最大の点を選ぶ
+        bx = xs[start:end]
+        by = ys[start:end]
+        area = np.abs((xs[prev] - avg_x) * (by - ys[prev]) - (xs[prev] - bx) * (avg_y - ys[prev]))
+        prev = start + int(np.argmax(area))
+        indices[b + 1] = prev
+
+    return indices
+
+
+def minmax_indices(y, n_out):
+    """
+    バケットごとの最小値・最大値を残すダウンサンプリング
+
+    Args:
+        y (array-like): y値
+        n_out (int): 出力点数の上限
+
+    Returns:
+        np.ndarray: 残す点のインデックス（昇順）
+    """
+
+    ys = np.asarray(y, dtype=np.float64)
+    n = len(ys)
+    n_buckets = n_out // 2
+    if n_out >= n or n_buckets < 1:
+        return np.arange(n)
+
+    # 均等幅のバケットに切り詰めて reshape し、ベクトル演算で最小・最大位置を取得
+    bucket_size = int(np.ceil(n / n_buckets))
+    padded = np.full(n_buckets * bucket_size, np.nan)
+    padded[:n] = ys
+    buckets = padded.reshape(n_buckets, bucket_size)
+    valid = ~np.all(np.isnan(buckets), axis=1)
+
+    offsets = np.arange(n_buckets)[valid] * bucket_size
+    min_pos = offsets + np.nanargmin(buckets[valid], axis=1)
+    max_pos = offsets + np.nanargmax(buckets[valid], axis=1)
+
+    indices = np.unique(np.concatenate(([0, n - 1], min_pos, max_pos)))
+    return indices
+
+
+def downsample_series(x, y, max_points=DEFAULT_MAX_POINTS, method='lttb'):
+    """
+    描画用に系列を間引く
+
+    Args:
+        x (array-like): x値
+        y (array-like): y値
+        max_points (int): 最大点数（チャート幅ピクセル数を目安に指定）
+        method (str): 'lttb' または 'minmax'
+
+    Returns:
+        tuple: (間引き後x, 間引き後y)
+    """
+
+    x = np.asarray(x)
+    y = np.asarray(y)
+
+    if method == 'lttb':
+        idx = lttb_indices(x, y, max_points)
+    elif method == 'minmax':
+        idx = minmax_indices(y, max_points)
+    else:
+        raise ValueError(f"未対応のダウンサンプリング方式: {method}")
+
+    return x[idx], y[idx]
+
+
+def _cache_figure_json(key, build):
+    """図JSONをキャッシュから取得、無ければ build() で作成して保存"""
+    cached = _FIGURE_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    fig_json = build().to_json()
+    _FIGURE_CACHE.put(key, fig_json)
+    return fig_json
+
+
+def clear_figure_cache():
+    """図JSONキャッシュをクリア"""
+    _FIGURE_CACHE.clear()
+
+
+def _equity_trace(x, y, name, color, max_points, method, width=2, show_markers=False):
+    """間引き済みの WebGL ライン trace を作成"""
+    xs, ys = downsample_series(x, y, max_points, method)
+    return go.Scattergl(
+        x=xs,
+        y=ys,
+        mode='lines+markers' if show_markers else 'lines',
+        name=name,
+        line=dict(color=color, width=width),
+        marker=dict(size=6)
+    )
+
+
+def build_performance_figure_json(backtest_df, date_col='date', etf_col='etf',
+                                  max_points=DEFAULT_MAX_POINTS, method='lttb'):
+    """
+    累積パフォーマンスチャートのJSONを作成（結果ハッシュでキャッシュ）
+
+    入力のDataFrameは変更しない。
+
+    Args:
+        backtest_df (pd.DataFrame): バックテスト結果（return_pct 列必須）
+        date_col (str): 日付列名
+        etf_col (str): 保有銘柄列名
+        max_points (int): 1ラインあたりの最大描画点数
+        method (str): 'lttb' または 'minmax'
+
+    Returns:
+        str: Plotly figure JSON
+    """
+
+    columns = [date_col, etf_col, 'return_pct']
+    key = (hash_frame(backtest_df, columns), 'performance', date_col, etf_col, max_points, method)
+
+    def build():
+        dates = backtest_df[date_col].to_numpy()
+        etfs = backtest_df[etf_col].to_numpy()
+        cumulative = np.cumprod(1 + backtest_df['return_pct'].to_numpy(dtype=np.float64) / 100)
+
+        fig = go.Figure()
+        fig.add_trace(_equity_trace(
+            dates, cumulative, '累積リターン', '#1f77b4', max_points, method,
+            width=3, show_markers=len(cumulative) <= max_points
+        ))
+
+        # ETF保有期間のマーカー（銘柄ごとに1 trace、点数も上限内に間引く）
+        for etf, color in ETF_COLORS.items():
+            mask = etfs == etf
+            if not mask.any():
+                continue
+            xs, ys = downsample_series(dates[mask], cumulative[mask], max_points, method)
+            fig.add_trace(go.Scattergl(
+                x=xs,
+                y=ys,
+                mode='markers',
+                name=f'{etf} 保有期間',
+                marker=dict(color=color, size=10, symbol='square'),
+                showlegend=True
+            ))
+
+        fig.update_layout(
+            title='📈 累積パフォーマンス',
+            xaxis_title='期間',
+            yaxis_title='累積リターン（倍率）',
+            hovermode='x unified',
+            height=500
+        )
+        return fig
+
+    return _cache_figure_json(key, build)
+
+
+def build_overlay_figure_json(series_map, title='📈 累積リターン比較',
+                              max_points=DEFAULT_MAX_POINTS, method='lttb'):
+    """
+    複数の累積リターン系列を重ねたチャートのJSONを作成
+
+    Args:
+        series_map (dict): {名前: pd.Series（DatetimeIndex, 倍率）}
+        title (str): チャートタイトル
+        max_points (int): 1ラインあたりの最大描画点数
+        method (str): 'lttb' または 'minmax'
+
+    Returns:
+        str: Plotly figure JSON
+    """
+
+    digest = hashlib.sha1()
+    for name, series in series_map.items():
+        digest.update(str(name).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(series, index=True).to_numpy().tobytes())
+    key = (digest.hexdigest(), 'overlay', title, max_points, method)
+
+    def build():
+        fig = go.Figure()
+        for name, series in series_map.items():
+            fig.add_trace(_equity_trace(
+                series.index.to_numpy(), series.to_numpy(dtype=np.float64),
+                str(name), ETF_COLORS.get(name), max_points, method
+            ))
+        fig.update_layout(
+            title=title,
+            xaxis_title='期間',
+            yaxis_title='累積リターン（倍率）',
+            hovermode='x unified',
+            height=500
+        )
+        return fig
+
+    return _cache_figure_json(key, build)
+
+
+def figure_from_json(fig_json):
+    """キャッシュ済みJSONから Plotly Figure を復元"""
+    return pio.from_json(fig_json)
+
+
+def figure_json_size(fig_json):
+    """図JSONのサイズ（バイト）"""
+    return len(fig_json.encode('utf-8'))
@@ -0,0 +1,31 @@
+"""
+pytest 共通設定
+各テストをオフラインの固定データ（momentum_core.fixtures）で実行し、
+共通キャッシュ・価格ストア・履歴の保存先はテストごとの一時ディレクトリにする
+"""
+
+import pytest
+
+import momentum_core
+import price_store
+import signal_history
+from momentum_core import shared_cache
+from momentum_core.fixtures import fixture_history
+
+
+@pytest.fixture
+def fixture_provider(monkeypatch, tmp_path):
+    """固定データのプロバイダーに切り替え、終了後に元のプロバイダーへ戻す"""
+    monkeypatch.setattr(shared_cache, 'SHARED_CACHE_PATH', 'off')
+    monkeypatch.setattr(price_store, 'STORE_DIR', str(tmp_path / 'price_store'))
+    monkeypatch.setattr(signal_history, 'HISTORY_DIR', str(tmp_path / 'signal_history'))
+
+    previous = momentum_core.set_history_provider(fixture_history)
+    momentum_core.clear_history_cache()
+    price_store.clear_adjusted_cache()
+    signal_history.clear_history_cache()
+    yield fixture_history
+    momentum_core.set_history_provider(previous)
+    momentum_core.clear_history_cache()
+    price_store.clear_adjusted_cache()
+    signal_history.clear_history_cache()
@@ -0,0 +1,162 @@
+"""
+取引コスト・スリッページモデル
+バックテスト結果の売買マスクに対して配列演算でコストを適用する
+"""
+
+import numpy as np
+import pandas as pd
+
+# 既定のコスト設定
+DEFAULT_COST_MODEL = {
+    'commission_bps': 0.0,   # 片道あたりの売買手数料（bps）
+    'spread_bps': 0.0,       # ビッド・アスクスプレッド（bps、片道で半分を負担）
+    'fixed_fee': 0.0,        # 片道あたりの固定手数料（ドル）
+    'tax_rate': 0.0,         # 売却益に対する税率（0.2 = 20%）
+    'capital': 10000.0,      # 初期資金（固定手数料の比率換算に使用）
+}
+
+HOLD_ACTION = "継続保有"
+
+
+def get_switch_mask(backtest_df):
+    """
+    各期間の始めに売買が発生したかどうかのマスクを取得
+
+    action 列があればそれを使用し、無ければ保有銘柄の変化から判定する。
+
+    Args:
+        backtest_df (pd.DataFrame): バックテスト結果
+
+    Returns:
+        np.ndarray: bool配列（True = 売買あり）
+    """
+
+    if 'action' in backtest_df.columns:
+        return (backtest_df['action'] != HOLD_ACTION).to_numpy()
+
+    etf_col = 'selected_etf' if 'selected_etf' in backtest_df.columns else 'etf'
+    etfs = backtest_df[etf_col].to_numpy()
+    mask = np.ones(len(etfs), dtype=bool)
+    mask[1:] = etfs[1:] != etfs[:-1]
+    return mask
+
+
+def compute_net_returns(gross_return_pct, switch_mask, commission_bps=0.0, spread_bps=0.0,
+                        fixed_fee=0.0, tax_rate=0.0, capital=10000.0):
+    """
+    グロスリターンと売買マスクからコスト控除後リターンを計算
+
+    全て配列演算で計算する（行ごとのループなし）。
+    - 初回は買いのみ（片道1回）、銘柄変更時は売り+買い（片道2回）
+    - 比例コスト = 手数料 + スプレッドの半分（片道あたり）
+    - 固定手数料は資産推移 E_t = a_t * E_(t-1) - b_t を累積積・累積和で解いて反映
+    - 税金は銘柄変更時に、売却するロットの含み益に対して課税
+
+    Args:
+        gross_return_pct (array-like): 期間ごとのグロスリターン（%）
+        switch_mask (array-like): 売買マスク（True = 期首に売買）
+        commission_bps (float): 片道あたりの手数料（bps）
+        spread_bps (float): スプレッド（bps）
+        fixed_fee (float): 片道あたりの固定手数料（ドル）
+        tax_rate (float): 売却益に対する税率
+        capital (float): 初期資金（ドル）
+
+    Returns:
+        dict: {'net_return_pct', 'cost_pct', 'trade_sides', 'equity'}（各 np.ndarray）
+    """
+
+    growth = 1 + np.asarray(gross_return_pct, dtype=np.float64) / 100
+    switches = np.asarray(switch_mask, dtype=bool)
+    n = len(growth)
+    if n == 0:
+        empty = np.empty(0)
+        return {'net_return_pct': empty, 'cost_pct': empty, 'trade_sides': empty.astype(np.int64), 'equity': empty}
+
+    # 片道回数: 初回は買いのみ、以降の銘柄変更は売り+買い
+    sides = switches.astype(np.int64) * 2
+    if switches[0]:
+        sides[0] = 1
+
+    # 比例コストによる資産倍率
+    side_cost = (commission_bps + spread_bps / 2) / 10000
+    proportional = (1 - side_cost) ** sides
+
+    # 税金: 売却ロットの含み益に課税（ロット = 直前の売買から次の売買までの連続期間）
+    tax_factor = np.ones(n)
+    if tax_rate > 0:
+        lot_id = np.cumsum(switches)
+        lot_growth = pd.Series(growth).groupby(lot_id).cumprod().to_numpy()
+        # 期首に売却するロットは直前期間のロット（先頭の期間は売却なし）
+        sold_growth = np.ones(n)
+        sold_growth[1:] = lot_growth[:-1]
+        sell_now = switches.copy()
+        sell_now[0] = False
+        gain_fraction = np.where(sell_now, np.maximum(sold_growth - 1, 0) / sold_growth, 0.0)
+        tax_factor = 1 - tax_rate * gain_fraction
+
+    # 資産推移 E_t = (E_(t-1) * 比例コスト * 税 - 固定手数料 * 片道回数) * グロス倍率
+    a = proportional * tax_factor * growth
+    b = fixed_fee * sides * growth
+    cum_a = np.cumprod(a)
+    equity = cum_a * (capital - np.cumsum(b / cum_a))
+
+    previous_equity = np.concatenate(([capital], equity[:-1]))
+    net_growth = equity / previous_equity
+    net_return_pct = (net_growth - 1) * 100
+
+    return {
+        'net_return_pct': net_return_pct,
+        'cost_pct': (growth - net_growth) * 100,
+        'trade_sides': sides,
+        'equity': equity,
+    }
+
+
+def apply_transaction_costs(backtest_df, **cost_model):
+    """
+    バックテスト結果に取引コストを適用（入力は変更しない）
+
+    Args:
+        backtest_df (pd.DataFrame): バックテスト結果（return_pct 列必須）
+        **cost_model: DEFAULT_COST_MODEL のキーで上書きするコスト設定
+
+    Returns:
+        pd.DataFrame: gross_return_pct, net_return_pct, cost_pct, trade_sides 列を追加したコピー
+    """
+
+    params = dict(DEFAULT_COST_MODEL)
+    unknown = set(cost_model) - set(params)
+    if unknown:
+        raise ValueError(f"未対応のコスト設定: {', '.join(sorted(unknown))}")
+    params.update(cost_model)
+
+    result = backtest_df.copy()
+    net = compute_net_returns(backtest_df['return_pct'].to_numpy(), get_switch_mask(backtest_df), **params)
+
+    result['gross_return_pct'] = backtest_df['return_pct'].to_numpy()
+    result['net_return_pct'] = net['net_return_pct']
+    result['cost_pct'] = net['cost_pct']
+    result['trade_sides'] = net['trade_sides']
+    return result
+
+
+def summarize_gross_net(backtest_df):
+    """
+    グロス・ネットの総リターンを計算
+
+    Args:
+        backtest_df (pd.DataFrame): apply_transaction_costs の結果
+
+    Returns:
+        dict: {'gross_total_return', 'net_total_return', 'total_cost', 'trade_count'}（%）
+    """
+
+    gross_total = (np.prod(1 + backtest_df['gross_return_pct'].to_numpy() / 100) - 1) * 100
+    net_total = (np.prod(1 + backtest_df['net_return_pct'].to_numpy() / 100) - 1) * 100
+
+    return {
+        'gross_total_return': gross_total,
+        'net_total_return': net_total,
+        'total_cost': gross_total - net_total,
+        'trade_count': int(backtest_df['trade_sides'].sum()),
+    }
@@ -0,0 +1,220 @@
+"""
+データ品質検証
+取得した価格バーをストア・キャッシュに入れる時点で1回だけ配列演算で検査し、
+計算処理側で毎回の防御的チェックを不要にする
+
+検査項目:
+    タイムゾーン付きインデックス、未ソート、重複日付、欠損月（ギャップ）、
+    欠損値・0以下の価格、高値・安値の不整合、外れ値リターン
+"""
+
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+OUTLIER_ZSCORE = 8.0  # 対数リターンのロバストZスコア（中央値・MAD基準）
+
+
+def normalize_index(bars):
+    """
+    インデックスをタイムゾーンなし・昇順・重複なし（後の行を優先）に揃える
+
+    Returns:
+        tuple: (正規化後のバー, {'tz_aware', 'unsorted', 'duplicates'})
+    """
+
+    index = bars.index
+    info = {
+        'tz_aware': getattr(index, 'tz', None) is not None,
+        'unsorted': not index.is_monotonic_increasing,
+        'duplicates': int(index.duplicated().sum()),
+    }
+    if not (info['tz_aware'] or info['unsorted'] or info['duplicates']):
+        return bars, info
+
+    bars = bars.copy()
+    if info['tz_aware']:
+        bars.index = bars.index.tz_localize(None)
+    if info['duplicates']:
+        bars = bars[~bars.index.duplicated(keep='last')]
+    if info['unsorted']:
+        bars = bars.sort_index()
+    return bars, info
+
+
+def _missing_periods(index, interval):
+    """欠損期間数（月次は暦月、それ以外は中央値間隔の倍数で判定）"""
+    if len(index) < 2:
+        return 0, []
+    if interval == '1mo':
+        months = index.to_numpy().astype('datetime64[M]').astype(np.int64)
+        steps = np.diff(months)
+    else:
+        ns = index.as_unit('ns').asi8
+        diffs = np.diff(ns)
+        typical = np.median(diffs)
+        steps = np.rint(diffs / typical).astype(np.int64) if typical > 0 else np.ones_like(diffs)
+        # 日次の週末・祝日（3営業日程度まで）はギャップとしない
+        steps = np.where(diffs <= typical * 4, 1, steps)
+    gap_at = np.flatnonzero(steps > 1)
+    gaps = [(index[i].strftime('%Y-%m-%d'), index[i + 1].strftime('%Y-%m-%d')) for i in gap_at]
+    return int((steps[gap_at] - 1).sum()), gaps
+
+
+def validate_bars(bars, interval='1mo', outlier_zscore=OUTLIER_ZSCORE):
+    """
+    価格バーを検査（入力は変更しない、インデックスは正規化済みであること）
+
+    Args:
+        bars (pd.DataFrame): 日付 × Open/High/Low/Close（/Volume）
+        interval (str): バー間隔（'1mo' は暦月でギャップ判定）
+        outlier_zscore (float): 外れ値とみなすロバストZスコア
+
+    Returns:
+        dict: 検査結果（件数・該当日付）と 'invalid_rows'（除外すべき行の bool 配列）
+    """
+
+    columns = [c for c in PRICE_COLUMNS if c in bars.columns]
+    prices = bars[columns].to_numpy(dtype=np.float64)
+
+    missing_values = ~np.isfinite(prices)
+    non_positive = np.isfinite(prices) & (prices <= 0)
+    invalid_rows = missing_values.any(axis=1) | non_positive.any(axis=1)
+
+    # 高値・安値の不整合（High < max(Open, Close) または Low > min(Open, Close)）
+    inconsistent = np.zeros(len(bars), dtype=bool)
+    if all(c in bars.columns for c in PRICE_COLUMNS):
+        open_, high, low, close = (bars[c].to_numpy(dtype=np.float64) for c in PRICE_COLUMNS)
+        tolerance = 1e-9 * np.abs(np.maximum(open_, close))
+        inconsistent = (high < np.maximum(open_, close) - tolerance) | (low > np.minimum(open_, close) + tolerance)
+        inconsistent &= ~invalid_rows
+
+    # 外れ値（有効行の終値の対数リターン）
+    outliers = np.zeros(len(bars), dtype=bool)
+    valid_positions = np.flatnonzero(~invalid_rows)
+    if columns and len(valid_positions) > 2:
+        reference = 'Close' if 'Close' in columns else columns[0]
+        valid_prices = bars[reference].to_numpy(dtype=np.float64)[valid_positions]
+        log_returns = np.diff(np.log(valid_prices))
+        median = np.median(log_returns)
+        mad = np.median(np.abs(log_returns - median)) * 1.4826
+        if mad > 0:
+            outliers[valid_positions[1:]] = np.abs(log_returns - median) / mad > outlier_zscore
+
+    gap_count, gaps = _missing_periods(bars.index[~invalid_rows], interval)
+
+    def dates(mask):
+        return [d.strftime('%Y-%m-%d') for d in bars.index[mask]]
+
+    return {
+        'rows': int(len(bars)),
+        'first_date': bars.index[0].strftime('%Y-%m-%d') if len(bars) else None,
+        'last_date': bars.index[-1].strftime('%Y-%m-%d') if len(bars) else None,
+        'missing_values': dict(zip(columns, missing_values.sum(axis=0).tolist())),
+        'non_positive': dict(zip(columns, non_positive.sum(axis=0).tolist())),
+        'invalid_dates': dates(invalid_rows),
+        'inconsistent_ohlc_dates': dates(inconsistent),
+        'outlier_dates': dates(outliers),
+        'missing_periods': gap_count,
+        'gaps': gaps,
+        'invalid_rows': invalid_rows,
+    }
+
+
+def clean_bars(bars, interval='1mo', symbol=None):
+    """
+    インデックスを正規化し、欠損値・0以下の価格を含む行を除外して品質レポートを作成
+
+    外れ値・ギャップ・高値安値の不整合は除外せずレポートに記録する。
+
+    Args:
+        bars (pd.DataFrame): 取得した価格バー
+        interval (str): バー間隔
+        symbol (str): 銘柄（レポート用）
+
+    Returns:
+        tuple: (検査済みのバー, 品質レポート dict)
+    """
+
+    bars, index_info = normalize_index(bars)
+    result = validate_bars(bars, interval)
+    invalid_rows = result.pop('invalid_rows')
+    if invalid_rows.any():
+        bars = bars[~invalid_rows]
+
+    # タイムゾーン付きは yfinance の通常の形式のため警告しない
+    warnings = []
+    if index_info['duplicates']:
+        warnings.append(f"重複日付 {index_info['duplicates']}件を除外（後の行を優先）")
+    if result['invalid_dates']:
+        warnings.append(f"欠損値・0以下の価格を含む {len(result['invalid_dates'])}行を除外")
+    if result['missing_periods']:
+        warnings.append(f"欠損期間 {result['missing_periods']}件")
+    if result['outlier_dates']:
+        warnings.append(f"外れ値リターン {len(result['outlier_dates'])}件")
+    if result['inconsistent_ohlc_dates']:
+        warnings.append(f"高値・安値の不整合 {len(result['inconsistent_ohlc_dates'])}件")
+
+    report = {
+        'symbol': symbol,
+        'interval': interval,
+        'checked_at': datetime.now().isoformat(timespec='seconds'),
+        **index_info,
+        **result,
+        'rows_after_clean': int(len(bars)),
+        # 除外後の系列が欠損期間なしで連続していれば True（外れ値・不整合は参考情報）
+        'ok': bool(len(bars)) and result['missing_periods'] == 0,
+        'warnings': warnings,
+    }
+    return bars, report
+
+
+def report_path(symbol, interval='1mo', store_dir='.'):
+    return os.path.join(store_dir, f"{symbol}_{interval}_quality.json")
+
+
+def write_quality_report(report, store_dir):
+    """品質レポートを JSON で保存"""
+    path = report_path(report['symbol'], report['interval'], store_dir)
+    os.makedirs(store_dir or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def load_quality_report(symbol, interval='1mo', store_dir='.'):
+    """保存済みの品質レポート（無ければ None）"""
+    path = report_path(symbol, interval, store_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def summarize_reports(reports):
+    """
+    銘柄ごとの品質レポートを一覧表にまとめる
+
+    Returns:
+        pd.DataFrame: 銘柄 × 主要項目
+    """
+
+    rows = []
+    for report in reports:
+        rows.append({
+            'symbol': report['symbol'],
+            'rows': report['rows_after_clean'],
+            'first_date': report['first_date'],
+            'last_date': report['last_date'],
+            'duplicates': report['duplicates'],
+            'invalid_rows': len(report['invalid_dates']),
+            'missing_periods': report['missing_periods'],
+            'outliers': len(report['outlier_dates']),
+            'inconsistent_ohlc': len(report['inconsistent_ohlc_dates']),
+            'ok': report['ok'],
+        })
+    return pd.DataFrame(rows)
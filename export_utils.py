@@ -0,0 +1,217 @@
+"""
+型付きデータエクスポート
+バックテスト結果・スイープ結果を Parquet / Arrow IPC 形式で出力する
+（整形済み文字列ではなく数値列と日付列をそのまま保存）
+"""
+
+import io
+import itertools
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from trade_log import ETF_SYMBOLS, NO_POSITION
+
+DEFAULT_COMPRESSION = 'zstd'
+
+# エクスポート対象の列（表示用の文字列列・重複列は含めない）
+EXPORT_COLUMNS = [
+    'hold_start_date', 'hold_end_date', 'date', 'ief_signal', 'selected_etf', 'etf', 'action',
+    'start_price', 'end_price', 'return_pct',
+    'gross_return_pct', 'net_return_pct', 'cost_pct', 'trade_sides',
+]
+
+CATEGORICAL_COLUMNS = ('selected_etf', 'etf', 'action')
+
+
+def prepare_export_frame(backtest_df):
+    """
+    バックテスト結果からエクスポート用の型付きDataFrameを作成
+
+    Args:
+        backtest_df (pd.DataFrame): バックテスト結果
+
+    Returns:
+        pd.DataFrame: 数値・日付・カテゴリ列のみのDataFrame
+    """
+
+    columns = [c for c in EXPORT_COLUMNS if c in backtest_df.columns]
+    export_df = backtest_df[columns].copy()
+    export_df.attrs = {}
+
+    for column in CATEGORICAL_COLUMNS:
+        if column in export_df.columns:
+            export_df[column] = export_df[column].astype('category')
+
+    for column in ('hold_start_date', 'hold_end_date', 'date'):
+        if column in export_df.columns:
+            export_df[column] = pd.to_datetime(export_df[column])
+
+    return export_df.reset_index(drop=True)
+
+
+def trade_log_to_table(log):
+    """
+    トレードログ（レコード配列）を Arrow Table に変換
+
+    銘柄は辞書エンコード列、日付は timestamp[ns] 列として保存する。
+
+    Args:
+        log (np.ndarray): TRADE_LOG_DTYPE のレコード配列
+
+    Returns:
+        pa.Table: Arrow Table
+    """
+
+    symbols = pa.array(ETF_SYMBOLS)
+    prev_codes = np.where(log['prev_etf'] == NO_POSITION, 0, log['prev_etf']).astype(np.int8)
+    prev_valid = log['prev_etf'] != NO_POSITION
+
+    return pa.table({
+        'hold_start_date': pa.array(log['hold_start'], type=pa.int64()).cast(pa.timestamp('ns')),
+        'hold_end_date': pa.array(log['hold_end'], type=pa.int64()).cast(pa.timestamp('ns')),
+        'ief_signal': log['ief_signal'],
+        'selected_etf': pa.DictionaryArray.from_arrays(pa.array(log['etf'], type=pa.int8()), symbols),
+        'previous_etf': pa.DictionaryArray.from_arrays(
+            pa.array(prev_codes, type=pa.int8(), mask=~prev_valid), symbols
+        ),
+        'switched': log['etf'] != log['prev_etf'],
+        'start_price': log['start_price'],
+        'end_price': log['end_price'],
+        'return_pct': log['return_pct'],
+    })
+
+
+def _to_table(data):
+    """DataFrame / Table を Arrow Table に変換"""
+    if isinstance(data, pa.Table):
+        return data
+    return pa.Table.from_pandas(data, preserve_index=False)
+
+
+def to_parquet_bytes(data, compression=DEFAULT_COMPRESSION):
+    """
+    Parquet 形式のバイト列を作成（ダウンロード用）
+
+    Args:
+        data (pd.DataFrame | pa.Table): 出力データ
+        compression (str): 'zstd', 'snappy', 'gzip' または None
+
+    Returns:
+        bytes: Parquet ファイルの内容
+    """
+
+    buffer = io.BytesIO()
+    pq.write_table(_to_table(data), buffer, compression=compression)
+    return buffer.getvalue()
+
+
+def to_arrow_ipc_bytes(data, compression=DEFAULT_COMPRESSION):
+    """
+    Arrow IPC（Feather v2）形式のバイト列を作成（ダウンロード用）
+
+    Args:
+        data (pd.DataFrame | pa.Table): 出力データ
+        compression (str): 'zstd', 'lz4' または None
+
+    Returns:
+        bytes: Arrow IPC ファイルの内容
+    """
+
+    table = _to_table(data)
+    sink = pa.BufferOutputStream()
+    options = ipc.IpcWriteOptions(compression=compression)
+    with ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _chunk_table(chunk):
+    """DataFrame / Table / RecordBatch のチャンクを Arrow Table に変換"""
+    if isinstance(chunk, pa.RecordBatch):
+        return pa.Table.from_batches([chunk])
+    return _to_table(chunk)
+
+
+def _resolve_schema(chunks, schema):
+    """
+    書き込み前にスキーマを確定する
+
+    schema が None の場合は最初のチャンクのスキーマを使う（チャンクが無ければ列なし）。
+
+    Returns:
+        tuple: (スキーマ, 最初のチャンクを含むチャンクのイテレータ)
+    """
+
+    chunks = iter(chunks)
+    if schema is not None:
+        return schema, chunks
+    first = next(chunks, None)
+    if first is None:
+        return pa.schema([]), chunks
+    first = _chunk_table(first)
+    return first.schema, itertools.chain([first], chunks)
+
+
+def _iter_record_batches(chunks, schema):
+    """チャンクを確定したスキーマに揃えた RecordBatch に変換（途中で型が変わっても書き込める）"""
+    for chunk in chunks:
+        table = _chunk_table(chunk)
+        if not table.schema.equals(schema):
+            table = table.select(schema.names).cast(schema)
+        yield from table.to_batches()
+
+
+def write_parquet_chunks(chunks, path, schema=None, compression=DEFAULT_COMPRESSION, row_group_size=1_000_000):
+    """
+    チャンクを逐次 Parquet ファイルに書き込む（大規模スイープ結果用）
+
+    全チャンクをメモリに保持せず、1チャンクずつ行グループとして書き出す。
+
+    Args:
+        chunks (iterable): DataFrame / pa.Table / pa.RecordBatch のイテラブル
+        path (str): 出力ファイルパス
+        schema (pa.Schema): スキーマ（None の場合は最初のチャンクから決定）
+        compression (str): 圧縮方式
+        row_group_size (int): 行グループの最大行数
+
+    Returns:
+        int: 書き込んだ行数
+    """
+
+    schema, chunks = _resolve_schema(chunks, schema)
+    rows = 0
+    # チャンクが無い場合もスキーマだけの空ファイルを書く
+    with pq.ParquetWriter(path, schema, compression=compression) as writer:
+        for batch in _iter_record_batches(chunks, schema):
+            writer.write_batch(batch, row_group_size=row_group_size)
+            rows += batch.num_rows
+    return rows
+
+
+def write_arrow_ipc_chunks(chunks, path, schema=None, compression=DEFAULT_COMPRESSION):
+    """
+    チャンクを逐次 Arrow IPC ファイルに書き込む（大規模スイープ結果用）
+
+    Args:
+        chunks (iterable): DataFrame / pa.Table / pa.RecordBatch のイテラブル
+        path (str): 出力ファイルパス
+        schema (pa.Schema): スキーマ（None の場合は最初のチャンクから決定）
+        compression (str): 圧縮方式
+
+    Returns:
+        int: 書き込んだ行数
+    """
+
+    schema, chunks = _resolve_schema(chunks, schema)
+    rows = 0
+    options = ipc.IpcWriteOptions(compression=compression)
+    # チャンクが無い場合もスキーマだけの空ファイルを書く
+    with pa.OSFile(path, 'wb') as sink, ipc.new_file(sink, schema, options=options) as writer:
+        for batch in _iter_record_batches(chunks, schema):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
@@ -2,9 +2,114 @@
 """
 iPhone用 ETF Momentum Checker
 Pythonista 3 で実行するための軽量版
+
+サーバー側（snapshot.py / api_server.py の /snapshot）が計算したスナップショットを
+表示するだけのため、標準ライブラリのみで動作する。取得元は次の順に使用:
+    1. SNAPSHOT_FILE（iCloud Drive 等の共有フォルダに snapshot.py --out で書き出したファイル）
+    2. SNAPSHOT_URL（ETag による条件付きGET、変更がなければ 304 で本文を受信しない）
+    3. 前回取得したローカルコピー（オフライン時）
 """
 
-import datetime
+import json
+import os
+import urllib.error
+import urllib.request
+
+# 取得元（環境に合わせて変更、環境変数でも指定可）
+SNAPSHOT_URL = os.environ.get('MOMENTUM_SNAPSHOT_URL', 'http://127.0.0.1:8502/snapshot')
+SNAPSHOT_FILE = os.environ.get('MOMENTUM_SNAPSHOT_FILE', '')
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'momentum_snapshot_cache.json')
+REQUEST_TIMEOUT = 3  # 秒
+
+_SNAPSHOT = None  # 起動中は1回だけ取得
+
+
+def _read_json(path):
+    with open(path, 'rb') as f:
+        return json.loads(f.read().decode('utf-8'))
+
+
+def _read_cache():
+    """前回取得したスナップショットと ETag"""
+    try:
+        cached = _read_json(CACHE_FILE)
+        return cached.get('etag'), cached.get('snapshot')
+    except (OSError, ValueError):
+        return None, None
+
+
+def _write_cache(etag, snapshot):
+    try:
+        with open(CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'etag': etag, 'snapshot': snapshot}, f, ensure_ascii=False, separators=(',', ':'))
+    except OSError:
+        pass
+
+
+def fetch_snapshot(url=None, timeout=REQUEST_TIMEOUT):
+    """
+    スナップショットを条件付きGETで取得
+
+    Returns:
+        tuple: (スナップショット dict または None, 取得元の説明)
+    """
+
+    url = url or SNAPSHOT_URL
+    etag, cached = _read_cache()
+    request = urllib.request.Request(url, headers={'Accept': 'application/json'})
+    if etag and cached is not None:
+        request.add_header('If-None-Match', etag)
+
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            snapshot = json.loads(response.read().decode('utf-8'))
+            _write_cache(response.headers.get('ETag'), snapshot)
+            return snapshot, "サーバー"
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return cached, "サーバー（変更なし）"
+        source = f"前回取得分（HTTP {e.code}）"
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        source = f"前回取得分（オフライン: {getattr(e, 'reason', e)}）"
+    return cached, source
+
+
+def load_snapshot(refresh=False):
+    """
+    スナップショットを取得（共有ファイル → サーバー → ローカルコピーの順）
+
+    Returns:
+        tuple: (スナップショット dict または None, 取得元の説明)
+    """
+
+    global _SNAPSHOT
+    if _SNAPSHOT is not None and not refresh:
+        return _SNAPSHOT
+
+    if SNAPSHOT_FILE and os.path.exists(SNAPSHOT_FILE):
+        try:
+            _SNAPSHOT = (_read_json(SNAPSHOT_FILE), "共有ファイル")
+            return _SNAPSHOT
+        except (OSError, ValueError):
+            pass
+
+    _SNAPSHOT = fetch_snapshot()
+    return _SNAPSHOT
+
+
+def _snapshot_or_message():
+    """表示用にスナップショットを取得（無ければメッセージを表示して None）"""
+    snapshot, source = load_snapshot()
+    if snapshot is None:
+        print("❌ スナップショットを取得できません")
+        print(f"   SNAPSHOT_URL: {SNAPSHOT_URL}")
+        print("   サーバーで python api_server.py --host 0.0.0.0 を起動するか、")
+        print("   python snapshot.py --out <共有フォルダ> で書き出したファイルを SNAPSHOT_FILE に指定してください")
+        print()
+        return None
+    print(f"📡 データ: {source} | 基準月: {snapshot['as_of'][:7].replace('-', '/')}")
+    print()
+    return snapshot
 
 def show_header():
     """ヘッダー表示"""
@@ -23,40 +128,54 @@ def show_version():
     print()
 
 def show_current_recommendation():
-    """現在の推奨銘柄（例）"""
+    """現在の推奨銘柄（サーバーで計算済みのスナップショット）"""
     print("🎯 現在の推奨銘柄")
     print("-" * 20)
-    print("推奨ETF: TQQQ")
-    print("IEFリターン: +0.50%")
-    print("判定期間: 2024/11/01 ～ 2024/12/01")
-    print("判定ロジック: IEF正のモメンタム → TQQQ選択")
+    snapshot = _snapshot_or_message()
+    if snapshot is None:
+        return
+
+    signal = snapshot['signal']
+    holding = snapshot['holding']
+    print(f"推奨ETF: {signal['etf']}")
+    print(f"IEFリターン: {signal['ief_return']:+.2f}%")
+    print(f"判定期間: {signal['start'].replace('-', '/')} ～ {signal['end'].replace('-', '/')}")
+    direction = "正" if signal['ief_return'] > 0 else "負"
+    print(f"判定ロジック: IEF{direction}のモメンタム → {signal['etf']}選択")
+    if holding['etf']:
+        print(f"戦略の保有中銘柄: {holding['etf']}（{holding['since'].replace('-', '/')} から）")
     print()
 
 def show_sample_backtest():
-    """サンプルバックテスト結果"""
-    print("📊 サンプルバックテスト結果（2023年）")
+    """バックテスト結果（直近のトレードと統計）"""
+    snapshot = _snapshot_or_message()
+    if snapshot is None:
+        return
+
+    start, end = snapshot['period']
+    print(f"📊 バックテスト結果（{start[:7].replace('-', '/')} ～ {end[:7].replace('-', '/')}）")
     print("-" * 40)
-    
-    # サンプルデータ
-    results = [
-        ("2023-01", "TQQQ", "$25.50", "$32.10", "+25.9%"),
-        ("2023-04", "GLD", "$180.20", "$175.80", "-2.4%"),
-        ("2023-07", "TQQQ", "$28.90", "$31.40", "+8.7%"),
-        ("2023-10", "GLD", "$185.50", "$191.20", "+3.1%")
-    ]
-    
-    print(f"{'期間':<8} {'銘柄':<6} {'開始価格':<8} {'終了価格':<8} {'損益率':<8}")
-    print("-" * 50)
-    
-    for period, etf, start, end, return_rate in results:
-        print(f"{period:<8} {etf:<6} {start:<8} {end:<8} {return_rate:<8}")
-    
+
+    columns = snapshot['trade_columns']
+    print(f"{'期間':<8} {'銘柄':<6} {'損益率':>8}  売買")
+    print("-" * 40)
+    for values in snapshot['trades']:
+        trade = dict(zip(columns, values))
+        print(f"{trade['start'][:7]:<8} {trade['etf']:<6} {trade['return_pct']:>+7.1f}%  {trade['action']}")
+
+    summary = snapshot['summary']
     print()
     print("📈 統計情報")
-    print("平均リターン: +8.8%")
-    print("勝率: 75.0%")
-    print("最大利益: +25.9%")
-    print("最大損失: -2.4%")
+    if not summary.get('trades'):
+        print("トレードなし")
+        print()
+        return
+    print(f"トレード数: {summary['trades']}")
+    print(f"総リターン: {summary['total_return']:+.1f}%")
+    print(f"平均リターン: {summary['avg_return']:+.1f}%")
+    print(f"勝率: {summary['win_rate']:.1f}%")
+    print(f"最大利益: {summary['max_gain']:+.1f}%")
+    print(f"最大損失: {summary['max_loss']:+.1f}%")
     print()
 
 def show_strategy_info():
@@ -67,7 +186,7 @@ def show_strategy_info():
     print("リバランス: 3ヶ月ごと")
     print("判定指標: IEF 1ヶ月リターン")
     print("選択銘柄: TQQQ（正）/ GLD（負）")
-    print("データソース: yfinance（月次OHLC）")
+    print("データソース: yfinance（月次OHLC、サーバーで計算）")
     print()
 
 def calculate_simple_return():
@@ -116,7 +235,7 @@ def main_menu():
         print("📋 メニュー")
         print("1. バージョン情報")
         print("2. 現在の推奨銘柄")
-        print("3. サンプルバックテスト")
+        print("3. バックテスト結果")
         print("4. 戦略情報")
         print("5. ETF情報")
         print("6. 簡易リターン計算")
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+負荷試験ツール
+N人の仮想ユーザーが操作シナリオ（初回表示・期間変更・再実行・CSVダウンロード）を
+同時に実行し、1操作あたりの待ち時間（p50/p95/p99）・スループット・同時ユーザーあたりのメモリを測定する
+
+データはオフラインの固定データプロバイダー（momentum_core.fixtures）から取得するため、
+ネットワークアクセスなしで何度でも同じ条件で実行できる。
+
+    python load_test.py --users 20 --iterations 10              # 計算処理を直接実行
+    python load_test.py --users 5 --mode app                    # ヘッドレスの Streamlit セッション（app.py）
+    python load_test.py --users 50 --latency 0.3 --cold         # プロバイダー応答 0.3秒・キャッシュなしから開始
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import resource
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+# 負荷試験はプロセス内のキャッシュのみで測定する（共有キャッシュはプロセス外の状態を持つため）
+os.environ.setdefault('MOMENTUM_SHARED_CACHE', 'off')
+
+import numpy as np
+import pandas as pd
+
+import momentum_core
+from backtest_yfinance import calculate_real_backtest
+from benchmark_utils import get_benchmark_series
+from cost_utils import apply_transaction_costs
+from export_utils import prepare_export_frame, to_parquet_bytes
+from momentum_core import fixtures
+from cache_utils import total_cache_bytes
+from signal_history import get_signal_history, history_prices
+from strategy_compare import DEFAULT_STRATEGIES, evaluate_strategies
+
+ACTIONS = ('open', 'change_dates', 'rerun', 'download_csv')
+# 1操作ごとの次の操作の選択確率（初回表示の後）
+ACTION_WEIGHTS = {'change_dates': 0.45, 'rerun': 0.35, 'download_csv': 0.2}
+DEFAULT_START = date(2020, 1, 1)
+EARLIEST_START = date(2010, 3, 1)
+PERCENTILES = (50, 95, 99)
+APP_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+
+def current_rss_mb():
+    """現在の常駐メモリ（MB）、取得できない環境では最大常駐メモリ"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class MemorySampler:
+    """実行中の常駐メモリの最大値を一定間隔で記録"""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak_mb = current_rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+
+def random_dates(rng):
+    """期間変更操作で選ぶ開始日・終了日"""
+    today = date.today()
+    start_year = rng.randint(EARLIEST_START.year + 1, today.year - 2)
+    start = date(start_year, rng.randint(1, 12), rng.randint(1, 28))
+    end_year = rng.randint(start_year + 2, today.year)
+    end = min(date(end_year, rng.randint(1, 12), rng.randint(1, 28)), today)
+    return start, end
+
+
+def scenario(rng, iterations):
+    """1ユーザーの操作列（最初は必ず初回表示）"""
+    names = list(ACTION_WEIGHTS)
+    weights = list(ACTION_WEIGHTS.values())
+    return ['open'] + rng.choices(names, weights=weights, k=iterations - 1)
+
+
+# ---- 計算処理を直接実行するユーザー ----
+
+def render_compute(start, end, export=False):
+    """app.main の1回の描画と同じ計算処理（画面出力なし）"""
+    start_datetime = datetime.combine(start, datetime.min.time())
+    end_datetime = datetime.combine(end, datetime.min.time())
+
+    momentum_core.latest_signal(datetime.now())
+    backtest_df = calculate_real_backtest(start_datetime, end_datetime)
+    if backtest_df is None or backtest_df.empty:
+        return
+
+    cost_df = apply_transaction_costs(backtest_df)
+    price_matrix = backtest_df.attrs.get('price_matrix')
+    if price_matrix is not None:
+        get_benchmark_series(price_matrix)
+        evaluate_strategies(price_matrix, DEFAULT_STRATEGIES)
+        get_signal_history(DEFAULT_STRATEGIES[0], history_prices(DEFAULT_STRATEGIES[0]))
+
+    if export:
+        backtest_df.to_csv(index=False, encoding='utf-8-sig')
+        to_parquet_bytes(prepare_export_frame(cost_df))
+
+
+def compute_user(user_id, iterations, think_time, seed):
+    """
+    計算処理を直接呼び出す仮想ユーザー
+
+    Returns:
+        list: [(操作名, 所要秒)]
+    """
+
+    rng = random.Random(seed + user_id)
+    start, end = DEFAULT_START, date.today()
+    timings = []
+    for action in scenario(rng, iterations):
+        if action == 'change_dates':
+            start, end = random_dates(rng)
+        started = time.perf_counter()
+        render_compute(start, end, export=(action == 'download_csv'))
+        timings.append((action, time.perf_counter() - started))
+        if think_time:
+            time.sleep(rng.uniform(0, think_time * 2))
+    return timings
+
+
+# ---- ヘッドレスの Streamlit セッションで app.py を実行するユーザー ----
+
+def app_user(user_id, iterations, think_time, seed, script=APP_SCRIPT, timeout=120):
+    """
+    streamlit.testing の AppTest で app.py を実行する仮想ユーザー
+
+    ダウンロードボタンは描画時にデータを作成するため、CSVダウンロードは再描画として計測する。
+
+    Returns:
+        list: [(操作名, 所要秒)]
+    """
+
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed + user_id)
+    at = AppTest.from_file(script, default_timeout=timeout)
+    at.session_state['yfinance_ok'] = True
+    timings = []
+    for action in scenario(rng, iterations):
+        started = time.perf_counter()
+        if action == 'change_dates':
+            start, end = random_dates(rng)
+            at.date_input[0].set_value(start)
+            at.date_input[1].set_value(end)
+        at.run()
+        if at.exception:
+            raise RuntimeError(f"ユーザー{user_id}: {at.exception[0].message}")
+        timings.append((action, time.perf_counter() - started))
+        if think_time:
+            time.sleep(rng.uniform(0, think_time * 2))
+    return timings
+
+
+def summarize_timings(timings, elapsed, users, baseline_mb, peak_mb):
+    """
+    操作ごと・全体の待ち時間分布とスループット
+
+    Returns:
+        tuple: (操作別の表 pd.DataFrame, 全体指標 dict)
+    """
+
+    frame = pd.DataFrame(timings, columns=['action', 'seconds'])
+    frame['ms'] = frame['seconds'] * 1000
+
+    def row(values):
+        p = np.percentile(values, PERCENTILES)
+        return {'count': len(values), 'mean_ms': values.mean(),
+                **{f"p{q}_ms": v for q, v in zip(PERCENTILES, p)}, 'max_ms': values.max()}
+
+    table = pd.DataFrame({
+        action: row(group['ms'].to_numpy()) for action, group in frame.groupby('action', sort=False)
+    }).T
+    table.loc['all'] = row(frame['ms'].to_numpy())
+
+    overall = {
+        'users': users,
+        'requests': len(frame),
+        'elapsed_s': elapsed,
+        'throughput_rps': len(frame) / elapsed if elapsed else 0.0,
+        'baseline_rss_mb': baseline_mb,
+        'peak_rss_mb': peak_mb,
+        'memory_per_user_mb': (peak_mb - baseline_mb) / users,
+        'cache_mb': total_cache_bytes() / 1024 ** 2,
+        **momentum_core.history_cache_info(),
+    }
+    return table, overall
+
+
+def run_load_test(users=10, iterations=10, mode='compute', think_time=0.0, latency=0.0, cold=False,
+                  seed=0, quiet=True):
+    """
+    N人の仮想ユーザーを同時に実行
+
+    Args:
+        users (int): 同時ユーザー数
+        iterations (int): 1ユーザーの操作数
+        mode (str): 'compute'（計算処理を直接実行）または 'app'（AppTest で app.py を実行）
+        think_time (float): 操作間の平均待ち時間（秒）
+        latency (float): 固定データプロバイダーの1回の取得に追加する待ち時間（秒）
+        cold (bool): 開始前にデータキャッシュをクリアするかどうか
+        seed (int): 操作シナリオの乱数シード
+        quiet (bool): 計算処理の標準出力を抑制するかどうか
+
+    Returns:
+        tuple: (操作別の表 pd.DataFrame, 全体指標 dict)
+    """
+
+    fixtures.FIXTURE_LATENCY = latency
+    momentum_core.set_history_provider(fixtures.fixture_history)
+    if cold:
+        momentum_core.clear_history_cache()
+
+    worker = compute_user if mode == 'compute' else app_user
+    baseline_mb = current_rss_mb()
+    output = contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext()
+
+    with output, MemorySampler() as memory, ThreadPoolExecutor(max_workers=users) as executor:
+        started = time.perf_counter()
+        futures = [executor.submit(worker, i, iterations, think_time, seed) for i in range(users)]
+        timings = [t for future in futures for t in future.result()]
+        elapsed = time.perf_counter() - started
+
+    return summarize_timings(timings, elapsed, users, baseline_mb, memory.peak_mb)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ETF Momentum ダッシュボードの負荷試験")
+    parser.add_argument('--users', type=int, nargs='+', default=[10],
+                        help="同時ユーザー数（複数指定で順に実行）")
+    parser.add_argument('--iterations', type=int, default=10, help="1ユーザーの操作数")
+    parser.add_argument('--mode', choices=('compute', 'app'), default='compute')
+    parser.add_argument('--think-time', type=float, default=0.0, help="操作間の平均待ち時間（秒）")
+    parser.add_argument('--latency', type=float, default=0.0, help="プロバイダーの応答時間（秒）")
+    parser.add_argument('--cold', action='store_true', help="各実行の前にデータキャッシュをクリア")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rows = []
+    for users in args.users:
+        table, overall = run_load_test(
+            users=users, iterations=args.iterations, mode=args.mode, think_time=args.think_time,
+            latency=args.latency, cold=args.cold, seed=args.seed
+        )
+        print(f"\n👥 {users}ユーザー × {args.iterations}操作 ({args.mode})")
+        print(table.round(1).to_string())
+        print(f"⚡ スループット: {overall['throughput_rps']:.1f} 操作/秒 | "
+              f"💾 メモリ: {overall['memory_per_user_mb']:.1f} MB/ユーザー "
+              f"(ピーク {overall['peak_rss_mb']:.0f} MB) | "
+              f"🎯 キャッシュヒット率: {overall['hit_rate']:.0%}")
+        rows.append({'users': users, **{k: overall[k] for k in ('throughput_rps', 'memory_per_user_mb', 'peak_rss_mb')},
+                     **{f"p{q}_ms": table.loc['all', f"p{q}_ms"] for q in PERCENTILES}})
+
+    if len(rows) > 1:
+        print("\n📈 ユーザー数別")
+        print(pd.DataFrame(rows).set_index('users').round(1).to_string())
@@ -0,0 +1,59 @@
+"""
+モメンタム戦略の共通計算パッケージ（Streamlit 非依存）
+
+app.py / app_yfinance.py / streamlit_app_full.py・APIサーバー・バッチ処理は
+すべてこのパッケージのデータ取得キャッシュと計算エンジンを使用する。
+画面表示は各エントリーポイント側で行い、進捗は on_status コールバックで受け取る。
+"""
+
+from cache_utils import BoundedCache, cache_metrics, configure_cache
+from momentum_core.data import (
+    DateLike,
+    HistoryProvider,
+    StatusCallback,
+    canonical_range,
+    clear_history_cache,
+    fetch_monthly_history,
+    fetch_policy,
+    get_monthly_history,
+    history_cache_info,
+    quality_report,
+    set_history_provider,
+)
+from momentum_core.engine import (
+    STRATEGY_SYMBOLS,
+    BacktestResult,
+    MomentumSignal,
+    build_price_matrix,
+    compute_trade_log,
+    get_monthly_data_for_backtest,
+    latest_signal,
+    run_backtest,
+    trade_log_at_positions,
+)
+
+__all__ = [
+    'BoundedCache',
+    'cache_metrics',
+    'configure_cache',
+    'DateLike',
+    'HistoryProvider',
+    'StatusCallback',
+    'canonical_range',
+    'clear_history_cache',
+    'fetch_monthly_history',
+    'fetch_policy',
+    'get_monthly_history',
+    'history_cache_info',
+    'quality_report',
+    'set_history_provider',
+    'STRATEGY_SYMBOLS',
+    'BacktestResult',
+    'MomentumSignal',
+    'build_price_matrix',
+    'compute_trade_log',
+    'get_monthly_data_for_backtest',
+    'latest_signal',
+    'run_backtest',
+    'trade_log_at_positions',
+]
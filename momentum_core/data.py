@@ -0,0 +1,311 @@
+"""
+月次データ取得（yfinance）と共通キャッシュ
+
+全画面・API・バッチ処理がこのキャッシュを共有するため、
+同じ銘柄・期間のデータはプロセス内に1つだけ保持される。
+取得元は MOMENTUM_DATA_PROVIDER（'yfinance' または オフライン用の 'fixture'）か
+set_history_provider で切り替える。
+再試行回数・タイムアウトは fetch_policy で呼び出し元ごとに変更できる（APIは短く、再試行なし）。
+"""
+
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Callable, Dict, Iterator, Optional, Tuple, Union
+
+import pandas as pd
+import yfinance as yf
+
+from alignment_utils import slice_range
+from data_quality import clean_bars
+from momentum_core import shared_cache
+from cache_utils import BoundedCache
+
+DateLike = Union[date, datetime, pd.Timestamp, str]
+
+# (level, message) を受け取る進捗通知。level は 'info' / 'success' / 'warning' / 'error'
+StatusCallback = Callable[[str, str], None]
+
+# (銘柄, 開始日 'YYYY-MM-DD', 終了日 'YYYY-MM-DD'（含まない）, adjusted=True) → yfinance の history 形式の月次データ
+# adjusted=False の場合は未調整価格と Dividends / Stock Splits 列（price_store 用）
+HistoryProvider = Callable[..., pd.DataFrame]
+
+HISTORY_TTL_SECONDS = 1800  # 30分キャッシュ
+HISTORY_INTERVAL = '1mo'
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_FETCH_TIMEOUT = 30  # yfinance の1回の取得のタイムアウト（秒）
+
+# (最大試行回数, タイムアウト秒) — fetch_policy で現在のスレッド（コンテキスト）だけ変更する
+_FETCH_POLICY: contextvars.ContextVar = contextvars.ContextVar(
+    'fetch_policy', default=(DEFAULT_MAX_RETRIES, DEFAULT_FETCH_TIMEOUT)
+)
+
+# (銘柄, 月初に揃えた開始日, 月初に揃えた終了日) → (有効期限, 月次データ)
+_HISTORY_CACHE_MAX_ENTRIES = 256
+_HISTORY_CACHE = BoundedCache('monthly_history', max_entries=_HISTORY_CACHE_MAX_ENTRIES)
+_HISTORY_CACHE_LOCK = threading.Lock()
+_HISTORY_STATS = {'hits': 0, 'superset_hits': 0, 'misses': 0}
+
+# 銘柄 → 直近取得時のデータ品質レポート
+_QUALITY_REPORTS: Dict[str, dict] = {}
+
+
+def _notify(on_status: Optional[StatusCallback], level: str, message: str) -> None:
+    if on_status is not None:
+        on_status(level, message)
+
+
+@contextmanager
+def fetch_policy(max_retries: int = DEFAULT_MAX_RETRIES, timeout: float = DEFAULT_FETCH_TIMEOUT) -> Iterator[None]:
+    """
+    with ブロック内の取得の最大試行回数・タイムアウトを変更（他のスレッドには影響しない）
+
+    例: with fetch_policy(max_retries=1, timeout=10): ...  # 応答時間を優先するAPIリクエスト
+    """
+
+    token = _FETCH_POLICY.set((max_retries, timeout))
+    try:
+        yield
+    finally:
+        _FETCH_POLICY.reset(token)
+
+
+def yfinance_history(symbol: str, start: str, end: str, adjusted: bool = True) -> pd.DataFrame:
+    """yfinance から月次データを取得（adjusted=True は配当込みの調整済み価格、False は未調整価格と配当・分割）"""
+    return yf.Ticker(symbol).history(
+        start=start,
+        end=end,
+        interval=HISTORY_INTERVAL,
+        auto_adjust=adjusted,
+        actions=True,
+        prepost=False,
+        timeout=_FETCH_POLICY.get()[1]
+    )
+
+
+def _default_provider() -> HistoryProvider:
+    if os.environ.get('MOMENTUM_DATA_PROVIDER', 'yfinance') == 'fixture':
+        from momentum_core.fixtures import fixture_history
+        return fixture_history
+    return yfinance_history
+
+
+_PROVIDER: HistoryProvider = _default_provider()
+
+
+def set_history_provider(provider: Optional[HistoryProvider]) -> HistoryProvider:
+    """
+    月次データの取得元を切り替える（None で yfinance に戻す）
+
+    切り替え後もキャッシュ済みのデータはそのまま使われるため、必要に応じて
+    clear_history_cache を呼ぶこと。
+
+    Returns:
+        切り替え前の取得元
+    """
+
+    global _PROVIDER
+    previous = _PROVIDER
+    _PROVIDER = provider or yfinance_history
+    return previous
+
+
+def to_day(value: DateLike) -> date:
+    """日付・日時・文字列を日付に正規化"""
+    return pd.Timestamp(value).date()
+
+
+def fetch_monthly_history(symbol: str, start_date: DateLike, end_date: DateLike, max_retries: Optional[int] = None,
+                          on_status: Optional[StatusCallback] = None,
+                          retry_wait: float = 2.0) -> Optional[pd.DataFrame]:
+    """
+    取得元（既定は yfinance）から月次OHLCデータを取得（キャッシュなし、再試行あり）
+
+    Args:
+        symbol: ETFシンボル
+        start_date: 開始日
+        end_date: 終了日（含まない）
+        max_retries: 最大試行回数（None の場合は fetch_policy の設定、既定 3）
+        on_status: 進捗通知（None の場合は通知しない）
+        retry_wait: 再試行までの待ち時間の基準（秒、試行ごとに増加）
+
+    Returns:
+        月次OHLCデータ（品質検査済み: タイムゾーンなし・昇順・重複なし・価格はすべて正）、
+        取得失敗時は None
+    """
+
+    start_str = to_day(start_date).strftime('%Y-%m-%d')
+    end_str = to_day(end_date).strftime('%Y-%m-%d')
+    if max_retries is None:
+        max_retries = _FETCH_POLICY.get()[0]
+
+    for attempt in range(max_retries):
+        try:
+            _notify(on_status, 'info', f"📊 {symbol} データ取得中... (試行 {attempt + 1}/{max_retries})")
+
+            data = _PROVIDER(symbol, start_str, end_str)
+
+            # 取得時に1回だけ品質検査（タイムゾーン正規化・重複・欠損値・0以下の価格を除外）
+            data, report = clean_bars(data, HISTORY_INTERVAL, symbol)
+            _QUALITY_REPORTS[symbol] = report
+            for warning in report['warnings']:
+                _notify(on_status, 'warning', f"⚠️ {symbol}: {warning}")
+
+            if data.empty:
+                if attempt < max_retries - 1:
+                    _notify(on_status, 'warning', f"⚠️ {symbol}: データが空です。再試行中...")
+                    time.sleep(retry_wait)
+                    continue
+                _notify(on_status, 'error', f"❌ {symbol}: データを取得できませんでした")
+                return None
+
+            _notify(on_status, 'success', f"✅ {symbol}: {len(data)}期間のデータを取得")
+            return data
+
+        except Exception as e:
+            error_msg = str(e)
+            if attempt < max_retries - 1:
+                _notify(on_status, 'warning', f"⚠️ {symbol}: エラー発生、再試行中... ({error_msg[:50]}...)")
+                time.sleep(retry_wait * (attempt + 1))  # 指数バックオフ
+            else:
+                _notify(on_status, 'error', f"❌ {symbol}: 最終エラー - {error_msg}")
+                return None
+
+    return None
+
+
+def fetch_raw_history(symbol: str, start_date: DateLike, end_date: DateLike) -> Optional[pd.DataFrame]:
+    """
+    取得元から未調整の月次データと配当・分割イベントを取得（キャッシュ・品質検査なし、price_store 用）
+
+    Returns:
+        yfinance の history（auto_adjust=False, actions=True）形式のデータ、空の場合は None
+    """
+
+    data = _PROVIDER(symbol, to_day(start_date).strftime('%Y-%m-%d'), to_day(end_date).strftime('%Y-%m-%d'),
+                     adjusted=False)
+    if data is None or data.empty:
+        return None
+    return data
+
+
+def canonical_range(start_date: DateLike, end_date: DateLike) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """
+    取得期間を月境界に揃える（月次バーの範囲が同じ要求は同じキーになる）
+
+    開始日はその月の月初、終了日（含まない）は月初でなければ翌月の月初に切り上げる。
+    例: 2024-03-15 ～ 2024-06-19 → 2024-03-01 ～ 2024-07-01（3月～6月のバー）
+    """
+
+    start = pd.Timestamp(to_day(start_date)).to_period('M').to_timestamp()
+    end = pd.Timestamp(to_day(end_date))
+    end_month = end.to_period('M').to_timestamp()
+    return start, (end_month if end == end_month else end_month + pd.DateOffset(months=1))
+
+
+def _slice_months(data: pd.DataFrame, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+    """月次データから [start, end) のバーを切り出す"""
+    return slice_range(data, start, end)
+
+
+def _cached_superset(symbol: str, start: pd.Timestamp, end: pd.Timestamp,
+                     now: float) -> Optional[Tuple[Tuple[str, pd.Timestamp, pd.Timestamp], pd.DataFrame]]:
+    """期間を含む有効なキャッシュエントリ（ロック内で呼ぶ）"""
+    for key, (expires, data) in _HISTORY_CACHE.items():
+        if key[0] == symbol and key[1] <= start and key[2] >= end and expires > now:
+            return key, data
+    return None
+
+
+def get_monthly_history(symbol: str, start_date: DateLike, end_date: DateLike, max_retries: Optional[int] = None,
+                        on_status: Optional[StatusCallback] = None) -> Optional[pd.DataFrame]:
+    """
+    月次OHLCデータを取得（全エントリーポイント共通のキャッシュ、30分）
+
+    期間は canonical_range で月境界に揃えてからキャッシュを参照するため、
+    datetime.now() のように毎回変わる終了日でも同じ月なら同じエントリを使う。
+    取得済みの期間を含む要求は、そのデータを切り出して返す（ダウンロードなし）。
+    プロセス内に無い場合は共有キャッシュ（shared_cache）を参照し、プロセス間で取得を1回にまとめる。
+    返されるDataFrameはキャッシュと共有されるため変更しないこと。
+
+    Args:
+        symbol: ETFシンボル
+        start_date: 開始日
+        end_date: 終了日（含まない）
+        max_retries: 最大試行回数（None の場合は fetch_policy の設定）
+        on_status: 進捗通知
+
+    Returns:
+        月次OHLCデータ、取得失敗時は None（プロセス内には失敗をキャッシュしない）
+    """
+
+    start, end = canonical_range(start_date, end_date)
+    key = (symbol, start, end)
+    now = time.monotonic()
+    with _HISTORY_CACHE_LOCK:
+        entry = _HISTORY_CACHE.peek(key)
+        if entry is not None and entry[0] > now:
+            _HISTORY_CACHE.touch(key)
+            _HISTORY_STATS['hits'] += 1
+            return entry[1]
+        superset = _cached_superset(symbol, start, end, now)
+        if superset is not None:
+            _HISTORY_CACHE.touch(superset[0])
+            _HISTORY_STATS['superset_hits'] += 1
+            return _slice_months(superset[1], start, end)
+        _HISTORY_CACHE.record_miss()
+        _HISTORY_STATS['misses'] += 1
+
+    expires = now + HISTORY_TTL_SECONDS
+    if shared_cache.shared_cache_enabled():
+        # 他プロセスが取得済みならそれを使い、未取得なら1プロセスだけが取得する
+        data, shared_expires = shared_cache.get_or_compute(
+            f"history:{symbol}:{start.date()}:{end.date()}",
+            lambda: fetch_monthly_history(symbol, start, end, max_retries, on_status),
+            HISTORY_TTL_SECONDS,
+        )
+        expires = now + max(shared_expires - time.time(), 0)
+    else:
+        data = fetch_monthly_history(symbol, start, end, max_retries, on_status)
+    if data is None:
+        return None
+
+    with _HISTORY_CACHE_LOCK:
+        # 新しいエントリに含まれる古いエントリは不要
+        for old_key in [k for k in _HISTORY_CACHE.keys() if k[0] == symbol and k[1] >= start and k[2] <= end]:
+            _HISTORY_CACHE.pop(old_key)
+        _HISTORY_CACHE.put(key, (expires, data))
+    return data
+
+
+def quality_report(symbol: str) -> Optional[dict]:
+    """直近取得時のデータ品質レポート（未取得なら None）"""
+    return _QUALITY_REPORTS.get(symbol)
+
+
+def history_cache_info() -> Dict[str, float]:
+    """キャッシュの件数・ヒット数（完全一致 / 切り出し）・ミス数・ヒット率"""
+    with _HISTORY_CACHE_LOCK:
+        stats = dict(_HISTORY_STATS)
+        entries = len(_HISTORY_CACHE)
+    requests = stats['hits'] + stats['superset_hits'] + stats['misses']
+    hit_rate = (stats['hits'] + stats['superset_hits']) / requests if requests else 0.0
+    return {'entries': entries, **stats, 'hit_rate': hit_rate}
+
+
+def clear_history_cache(shared: bool = False) -> None:
+    """
+    月次データのキャッシュをクリア
+
+    Args:
+        shared: True の場合は共有キャッシュ（shared_cache）の月次データも削除する
+    """
+
+    with _HISTORY_CACHE_LOCK:
+        _HISTORY_CACHE.clear(reset_stats=True)
+        _HISTORY_STATS.update(hits=0, superset_hits=0, misses=0)
+    if shared and shared_cache.shared_cache_enabled():
+        shared_cache.invalidate_prefix('history:')
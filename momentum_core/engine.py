@@ -0,0 +1,244 @@
+"""
+3ヶ月リバランス戦略の計算エンジン（全画面・API・バッチ処理で共通）
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import price_store
+from alignment_utils import alignment_to_frame, build_alignment
+from momentum_core.data import DateLike, StatusCallback, get_monthly_history
+from profiling_utils import profiled
+from rebalance_schedule import bar_rebalance_positions
+from signals import get_signal, signal_threshold
+from trade_log import ETF_CODES, NO_POSITION, build_trade_log, trade_log_to_frame
+
+STRATEGY_SYMBOLS = ['IEF', 'TQQQ', 'GLD']
+MIN_PERIODS = 4  # 判定期間1 + 保有期間3
+
+
+@dataclass(frozen=True)
+class MomentumSignal:
+    """最新のIEFモメンタムシグナル"""
+
+    recommended_etf: str
+    ief_return: float
+    period_start: pd.Timestamp
+    period_end: pd.Timestamp
+
+    def period_label(self, date_format: str = '%Y/%m/%d') -> str:
+        """判定期間の表示用文字列"""
+        return f"{self.period_start.strftime(date_format)} ～ {self.period_end.strftime(date_format)}"
+
+
+@dataclass(frozen=True)
+class BacktestResult:
+    """バックテスト結果（トレードログと計算に使った価格行列）"""
+
+    trade_log: np.ndarray
+    price_matrix: pd.DataFrame
+
+    @property
+    def trades(self) -> int:
+        return len(self.trade_log)
+
+    def to_frame(self) -> pd.DataFrame:
+        """従来形式のDataFrame（attrs に trade_log・price_matrix を付与）"""
+        df = trade_log_to_frame(self.trade_log)
+        df.attrs['trade_log'] = self.trade_log
+        df.attrs['price_matrix'] = self.price_matrix
+        return df
+
+
+def get_monthly_data_for_backtest(start_date: DateLike, end_date: DateLike, return_mode: Optional[str] = None,
+                                  symbols: Optional[List[str]] = None) -> Optional[Dict[str, pd.DataFrame]]:
+    """
+    バックテスト用の月次データを取得
+
+    Args:
+        start_date: 開始日
+        end_date: 終了日
+        return_mode: None の場合は共通キャッシュ経由の yfinance データ（調整済み）、
+            'price' / 'total' / 'raw' の場合はローカル価格ストアから該当方式で調整
+        symbols: 取得する銘柄（None の場合は IEF, TQQQ, GLD）
+
+    Returns:
+        {'IEF': df, 'TQQQ': df, 'GLD': df} または None
+    """
+
+    print(f"📊 バックテスト用データ取得: {start_date.strftime('%Y-%m-%d')} ～ {end_date.strftime('%Y-%m-%d')}")
+
+    symbols = symbols or STRATEGY_SYMBOLS
+    data = {}
+
+    for symbol in symbols:
+        print(f"   {symbol} データ取得中...")
+        if return_mode is None:
+            df = get_monthly_history(symbol, start_date, end_date)
+        elif price_store.ensure_symbol(symbol, start_date, end_date):
+            df = price_store.get_adjusted_bars(symbol, return_mode, start_date=start_date, end_date=end_date)
+        else:
+            df = None
+
+        if df is None or df.empty:
+            print(f"   ❌ {symbol}: データ取得失敗")
+            return None
+        else:
+            print(f"   ✅ {symbol}: {len(df)}期間")
+            data[symbol] = df
+
+    return data
+
+
+def build_price_matrix(data: Dict[str, pd.DataFrame], field: str = 'Open') -> pd.DataFrame:
+    """
+    銘柄ごとのデータを共通日付で整列した価格行列に変換
+
+    Args:
+        data: {'IEF': df, 'TQQQ': df, 'GLD': df}
+        field: 使用する価格列
+
+    Returns:
+        日付 × 銘柄の価格行列（全銘柄に存在する日付のみ）
+    """
+
+    return alignment_to_frame(build_alignment(data, field))
+
+
+@profiled('compute_trade_log')
+def compute_trade_log(price_matrix: pd.DataFrame, signal: Optional[str] = None,
+                      signal_params: Optional[dict] = None, signal_symbol: str = 'IEF') -> np.ndarray:
+    """
+    整列済み価格行列から3ヶ月リバランス戦略のトレードログを計算
+
+    各リバランス日 i で前月初→今月初のIEFリターンを判定し、
+    TQQQ（正）または GLD（負）を i から i+2 の月初まで保有する。
+    全リバランスを配列演算でまとめて計算する。
+
+    Args:
+        price_matrix: 日付 × 銘柄（IEF, TQQQ, GLD）の始値行列
+        signal: 判定に使うシグナル名（None の場合は従来のIEF前月比）
+        signal_params: シグナルのパラメータ
+        signal_symbol: シグナルを判定する銘柄
+
+    Returns:
+        TRADE_LOG_DTYPE のレコード配列
+    """
+
+    n = len(price_matrix)
+
+    # リバランス位置: 前月データが必要なので1から、3ヶ月後データが必要なので n-3 まで
+    rebalance_pos = bar_rebalance_positions(n, interval=3, first=1)
+
+    scores = None
+    threshold = 0.0
+    if signal is not None:
+        scores = get_signal(price_matrix, signal, **(signal_params or {}))[signal_symbol].to_numpy()
+        threshold = signal_threshold(signal)
+
+    return trade_log_at_positions(price_matrix, rebalance_pos, scores=scores, threshold=threshold)
+
+
+def trade_log_at_positions(price_matrix: pd.DataFrame, rebalance_pos: np.ndarray, prev_etf: int = NO_POSITION,
+                           scores: Optional[np.ndarray] = None, threshold: float = 0.0) -> np.ndarray:
+    """
+    指定したリバランス位置のトレードを計算
+
+    Args:
+        price_matrix: 日付 × 銘柄（IEF, TQQQ, GLD）の始値行列
+        rebalance_pos: リバランス日の行位置（1 以上、末尾から3行目まで）
+        prev_etf: 最初のトレードより前の保有銘柄コード
+        scores: 行ごとのシグナル値（None の場合はIEF前月比）
+        threshold: シグナルがこの値を超えたら TQQQ（NaN は GLD）
+
+    Returns:
+        TRADE_LOG_DTYPE のレコード配列
+    """
+
+    end_pos = rebalance_pos + 2
+
+    if scores is None:
+        ief = price_matrix['IEF'].to_numpy(dtype=np.float64)
+        ief_signal = (ief[rebalance_pos] - ief[rebalance_pos - 1]) / ief[rebalance_pos - 1] * 100
+    else:
+        ief_signal = np.asarray(scores, dtype=np.float64)[rebalance_pos]
+
+    # 推奨銘柄判定
+    is_tqqq = ief_signal > threshold
+    etf_codes = np.where(is_tqqq, ETF_CODES['TQQQ'], ETF_CODES['GLD']).astype(np.int8)
+
+    tqqq = price_matrix['TQQQ'].to_numpy(dtype=np.float64)
+    gld = price_matrix['GLD'].to_numpy(dtype=np.float64)
+    start_price = np.where(is_tqqq, tqqq[rebalance_pos], gld[rebalance_pos])
+    end_price = np.where(is_tqqq, tqqq[end_pos], gld[end_pos])
+
+    dates = price_matrix.index.to_numpy()
+
+    return build_trade_log(
+        dates[rebalance_pos], dates[end_pos], ief_signal, etf_codes, start_price, end_price,
+        prev_etf=prev_etf
+    )
+
+
+def run_backtest(start_date: DateLike, end_date: DateLike, return_mode: Optional[str] = None,
+                 signal: Optional[str] = None, signal_params: Optional[dict] = None,
+                 signal_symbol: str = 'IEF') -> Optional[BacktestResult]:
+    """
+    データ取得から3ヶ月リバランスバックテストまでを実行
+
+    Args:
+        start_date: 開始日
+        end_date: 終了日
+        return_mode: get_monthly_data_for_backtest と同じ
+        signal: compute_trade_log と同じ
+        signal_params: シグナルのパラメータ
+        signal_symbol: シグナルを判定する銘柄
+
+    Returns:
+        バックテスト結果、データ不足・取得失敗時は None
+    """
+
+    data = get_monthly_data_for_backtest(start_date, end_date, return_mode)
+    if data is None:
+        return None
+
+    price_matrix = build_price_matrix(data)
+    if len(price_matrix) < MIN_PERIODS:
+        print(f"❌ 共通期間が不足: {len(price_matrix)}期間")
+        return None
+
+    trade_log = compute_trade_log(price_matrix, signal, signal_params, signal_symbol)
+    return BacktestResult(trade_log=trade_log, price_matrix=price_matrix)
+
+
+def latest_signal(end_date: Optional[DateLike] = None, lookback_days: int = 90,
+                  on_status: Optional[StatusCallback] = None) -> Optional[MomentumSignal]:
+    """
+    最新のIEFモメンタムシグナル（直近2ヶ月の月初始値の変化率）
+
+    Args:
+        end_date: 終了日（含まない、None の場合は現在）
+        lookback_days: 取得期間（日）
+        on_status: 進捗通知
+
+    Returns:
+        シグナル、データ不足時は None
+    """
+
+    end = pd.Timestamp(end_date) if end_date is not None else pd.Timestamp(datetime.now())
+    ief_data = get_monthly_history("IEF", end - timedelta(days=lookback_days), end, on_status=on_status)
+    if ief_data is None or len(ief_data) < 2:
+        return None
+
+    opens = ief_data['Open'].to_numpy()
+    ief_return = float((opens[-1] - opens[-2]) / opens[-2] * 100)
+    return MomentumSignal(
+        recommended_etf="TQQQ" if ief_return > 0 else "GLD",
+        ief_return=ief_return,
+        period_start=ief_data.index[-2],
+        period_end=ief_data.index[-1],
+    )
@@ -0,0 +1,87 @@
+"""
+オフライン用の月次データプロバイダー（負荷試験・動作確認用）
+
+銘柄ごとに固定シードで生成した月次OHLCデータを、yfinance の history と同じ形式
+（月初日付・America/New_York のタイムゾーン付き、終了日は含まない）で返す。
+ネットワークアクセスは行わず、同じ銘柄・期間なら常に同じ値になる。
+
+    MOMENTUM_DATA_PROVIDER=fixture        アプリ全体でこのプロバイダーを使用
+    MOMENTUM_FIXTURE_LATENCY=0.3          1回の取得に追加する待ち時間（秒、プロバイダーの応答時間を模擬）
+"""
+
+import os
+import time
+import zlib
+from datetime import datetime
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+FIXTURE_START = '2010-02-01'  # TQQQ の上場月
+FIXTURE_LATENCY = float(os.environ.get('MOMENTUM_FIXTURE_LATENCY', '0'))
+
+# 銘柄 → (月次期待リターン, 月次ボラティリティ, 初値)
+FIXTURE_PARAMS = {
+    'IEF': (0.002, 0.018, 95.0),
+    'TQQQ': (0.035, 0.17, 1.5),
+    'GLD': (0.005, 0.045, 110.0),
+}
+_DEFAULT_PARAMS = (0.006, 0.05, 50.0)
+
+_FULL_HISTORY: Dict[str, pd.DataFrame] = {}
+
+
+def _full_history(symbol: str) -> pd.DataFrame:
+    """銘柄の全期間データ（初回のみ生成）"""
+    data = _FULL_HISTORY.get(symbol)
+    if data is not None:
+        return data
+
+    mean, vol, first = FIXTURE_PARAMS.get(symbol, _DEFAULT_PARAMS)
+    index = pd.date_range(FIXTURE_START, pd.Timestamp(datetime.now()).to_period('M').to_timestamp(), freq='MS')
+    rng = np.random.default_rng(zlib.crc32(symbol.encode('utf-8')))
+    log_returns = rng.normal(mean - vol ** 2 / 2, vol, size=(len(index), 2))
+
+    opens = first * np.exp(np.cumsum(log_returns[:, 0]))
+    closes = opens * np.exp(log_returns[:, 1] * 0.5)
+    spread = np.abs(rng.normal(0, vol / 2, size=len(index)))
+    data = pd.DataFrame({
+        'Open': opens,
+        'High': np.maximum(opens, closes) * (1 + spread),
+        'Low': np.minimum(opens, closes) * (1 - spread),
+        'Close': closes,
+        'Volume': rng.integers(1_000_000, 50_000_000, size=len(index)).astype(np.float64),
+        'Dividends': 0.0,
+        'Stock Splits': 0.0,
+    }, index=index.tz_localize('America/New_York'))
+    data.index.name = 'Date'
+    _FULL_HISTORY[symbol] = data
+    return data
+
+
+def fixture_history(symbol: str, start: str, end: str, adjusted: bool = True, interval: str = '1mo') -> pd.DataFrame:
+    """
+    yfinance の Ticker(symbol).history(start, end, interval) と同じ形式の固定データ
+
+    Args:
+        symbol: 銘柄
+        start: 開始日（'YYYY-MM-DD'）
+        end: 終了日（'YYYY-MM-DD'、含まない）
+        adjusted: 調整済みかどうか（固定データは配当・分割なしのため同じ値）
+        interval: バー間隔（'1mo' のみ対応）
+
+    Returns:
+        月次OHLCデータ（期間外なら空の DataFrame）
+    """
+
+    if interval != '1mo':
+        raise ValueError(f"未対応のバー間隔: {interval}")
+    if FIXTURE_LATENCY > 0:
+        time.sleep(FIXTURE_LATENCY)
+
+    data = _full_history(symbol)
+    index = data.index.tz_localize(None)
+    lo = index.searchsorted(pd.Timestamp(start), side='left')
+    hi = index.searchsorted(pd.Timestamp(end), side='left')
+    return data.iloc[lo:hi].copy()
@@ -0,0 +1,333 @@
+"""
+プロセス間共有キャッシュ（SQLite WAL モード）
+
+複数の Streamlit レプリカ・APIサーバー・バッチ処理が同じデータベースファイル
+（共有ボリューム上に置けばホスト間でも可）を参照し、取得・計算結果を1回だけ作る。
+
+    entries  キー → 内容ハッシュ・有効期限
+    blobs    内容ハッシュ → シリアライズ済みの値（同じ内容は1つだけ保存）
+    leases   キー → 更新中のワーカー・リース期限（1キーを更新するのは1ワーカーのみ）
+
+同じプロセス内の同時リクエスト（Streamlit の複数セッションなど）はキーごとのロックで
+1スレッドにまとめ、リースはそのスレッドの呼び出しごとの所有者IDで取得する。
+計算中はリースを延長し続け、計算の失敗（None）は NEGATIVE_TTL の間だけ保存して待機中のワーカーに返す。
+期限切れのエントリ・内容は保存時に PURGE_INTERVAL ごとに削除する。
+
+MOMENTUM_SHARED_CACHE にデータベースのパスを指定する（'off' で無効）。
+"""
+
+import hashlib
+import io
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+SHARED_CACHE_PATH = os.environ.get('MOMENTUM_SHARED_CACHE', os.path.join('.shared_cache', 'cache.sqlite'))
+LEASE_SECONDS = 60.0      # 更新中のワーカーが落ちた場合に他のワーカーが引き継ぐまでの時間
+WAIT_INTERVAL = 0.2       # 他のワーカーの更新完了を待つ間隔（秒）
+PURGE_INTERVAL = 600.0    # 期限切れの削除を行う最短間隔（秒）
+NEGATIVE_TTL = 30.0       # 取得失敗（None）を保存しておく期間（秒、障害時に全ワーカーが順に再試行しないように）
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    created REAL NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires);
+"""
+
+_OWNER_PREFIX = f"{socket.gethostname()}:{os.getpid()}"
+_LOCAL = threading.local()
+# キー → [ロック, 使用中のスレッド数]（プロセス内の single-flight 用）
+_KEY_LOCKS: Dict[str, list] = {}
+_KEY_LOCKS_GUARD = threading.Lock()
+_LAST_PURGE: Dict[str, float] = {}
+_STATS = {'hits': 0, 'misses': 0, 'refreshes': 0, 'failures': 0, 'waits': 0}
+_STATS_LOCK = threading.Lock()
+
+
+def shared_cache_enabled(path: Optional[str] = None) -> bool:
+    """共有キャッシュが有効かどうか"""
+    return (path or SHARED_CACHE_PATH).lower() not in ('', 'off', '0', 'false')
+
+
+def _connect(path: Optional[str] = None) -> sqlite3.Connection:
+    """スレッドごとの接続（初回に WAL モードとスキーマを設定）"""
+    path = path or SHARED_CACHE_PATH
+    connections = getattr(_LOCAL, 'connections', None)
+    if connections is None:
+        connections = _LOCAL.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(_SCHEMA)
+        connections[path] = conn
+    return conn
+
+
+def _count(name: str) -> None:
+    with _STATS_LOCK:
+        _STATS[name] += 1
+
+
+def serialize(value: Any) -> Tuple[str, bytes]:
+    """値をバイト列に変換（DataFrame は Parquet、それ以外は pickle）"""
+    if isinstance(value, pd.DataFrame):
+        buffer = io.BytesIO()
+        value.to_parquet(buffer, compression='zstd')
+        return 'parquet', buffer.getvalue()
+    return 'pickle', pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def deserialize(kind: str, data: bytes) -> Any:
+    if kind == 'parquet':
+        return pd.read_parquet(io.BytesIO(data))
+    return pickle.loads(data)
+
+
+def get_entry(key: str, path: Optional[str] = None) -> Optional[Tuple[Any, float]]:
+    """
+    有効なエントリを取得
+
+    Returns:
+        (値, 有効期限の UNIX 時刻) または None（未保存・期限切れ）
+    """
+
+    row = _connect(path).execute(
+        "SELECT b.kind, b.data, e.expires FROM entries e JOIN blobs b ON b.digest = e.digest "
+        "WHERE e.key = ? AND e.expires > ?",
+        (key, time.time())
+    ).fetchone()
+    if row is None:
+        return None
+    return deserialize(row[0], row[1]), row[2]
+
+
+def put_entry(key: str, value: Any, ttl: float, path: Optional[str] = None) -> str:
+    """
+    エントリを保存（内容ハッシュで重複排除）
+
+    Returns:
+        内容ハッシュ（SHA-256）
+    """
+
+    kind, data = serialize(value)
+    digest = hashlib.sha256(data).hexdigest()
+    now = time.time()
+    conn = _connect(path)
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute("INSERT OR IGNORE INTO blobs (digest, kind, data) VALUES (?, ?, ?)", (digest, kind, data))
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, digest, created, expires) VALUES (?, ?, ?, ?)",
+            (key, digest, now, now + ttl)
+        )
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+
+    db_path = path or SHARED_CACHE_PATH
+    if now - _LAST_PURGE.get(db_path, 0.0) >= PURGE_INTERVAL:
+        _LAST_PURGE[db_path] = now
+        purge_expired(path)
+    return digest
+
+
+def new_lease_owner() -> str:
+    """リースの所有者ID（呼び出しごとに一意）"""
+    return f"{_OWNER_PREFIX}:{threading.get_ident()}:{uuid.uuid4().hex[:8]}"
+
+
+def acquire_lease(key: str, owner: str, lease_seconds: float = LEASE_SECONDS, path: Optional[str] = None) -> bool:
+    """キーの更新リースを取得（有効なリースが既にあれば False）"""
+    now = time.time()
+    cursor = _connect(path).execute(
+        "INSERT INTO leases (key, owner, expires) VALUES (?, ?, ?) "
+        "ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+        "WHERE leases.expires <= ?",
+        (key, owner, now + lease_seconds, now)
+    )
+    return cursor.rowcount == 1
+
+
+def renew_lease(key: str, owner: str, lease_seconds: float = LEASE_SECONDS, path: Optional[str] = None) -> bool:
+    """自分が持っているリースを延長（既に他のワーカーに移っていれば False）"""
+    cursor = _connect(path).execute(
+        "UPDATE leases SET expires = ? WHERE key = ? AND owner = ?",
+        (time.time() + lease_seconds, key, owner)
+    )
+    return cursor.rowcount == 1
+
+
+def _keep_lease(key: str, owner: str, lease_seconds: float, path: Optional[str], stop: threading.Event) -> None:
+    """stop が設定されるまでリース期間の 1/3 ごとにリースを延長（計算中に期限切れにならないように）"""
+    while not stop.wait(lease_seconds / 3):
+        if not renew_lease(key, owner, lease_seconds, path):
+            return
+
+
+def release_lease(key: str, owner: str, path: Optional[str] = None) -> None:
+    """自分が持っているリースだけを解放"""
+    _connect(path).execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+
+def _key_lock(key: str) -> threading.Lock:
+    with _KEY_LOCKS_GUARD:
+        slot = _KEY_LOCKS.setdefault(key, [threading.Lock(), 0])
+        slot[1] += 1
+        return slot[0]
+
+
+def _release_key_lock(key: str) -> None:
+    with _KEY_LOCKS_GUARD:
+        slot = _KEY_LOCKS[key]
+        slot[1] -= 1
+        if slot[1] == 0:
+            del _KEY_LOCKS[key]
+
+
+def get_or_compute(key: str, compute: Callable[[], Any], ttl: float, lease_seconds: float = LEASE_SECONDS,
+                   path: Optional[str] = None, negative_ttl: float = NEGATIVE_TTL) -> Tuple[Any, float]:
+    """
+    共有キャッシュから取得し、無ければ1ワーカーだけが計算して保存
+
+    同じプロセス内ではキーごとのロックで1スレッドだけがリース取得・計算に進み、
+    他のスレッドはその結果を共有キャッシュから読む。
+    リースを取れなかったワーカーは、保存されるかリースが切れるまで待つ。
+    計算中のリースは別スレッドで延長するため、compute が lease_seconds より長くかかっても
+    他のワーカーが重複して計算することはない（計算中のワーカーが落ちた場合のみ引き継ぐ）。
+    compute が None を返した場合（取得失敗など）は None を negative_ttl の間だけ保存し、
+    待機中のワーカーにも None を返す。
+
+    Args:
+        key: キャッシュキー
+        compute: 値を作る関数
+        ttl: 有効期間（秒）
+        lease_seconds: リース期間（秒、計算中は延長される）
+        path: データベースのパス
+        negative_ttl: 失敗（None）を保存する期間（秒、0 の場合は保存しない）
+
+    Returns:
+        (値, 有効期限の UNIX 時刻)
+    """
+
+    entry = get_entry(key, path)
+    if entry is not None:
+        _count('hits')
+        return entry
+
+    lock = _key_lock(key)
+    try:
+        with lock:
+            return _get_or_compute_locked(key, compute, ttl, lease_seconds, path, negative_ttl)
+    finally:
+        _release_key_lock(key)
+
+
+def _get_or_compute_locked(key, compute, ttl, lease_seconds, path, negative_ttl):
+    """get_or_compute の本体（プロセス内でキーのロックを持った状態で実行）"""
+    owner = new_lease_owner()
+    while True:
+        entry = get_entry(key, path)
+        if entry is not None:
+            _count('hits')
+            return entry
+        if acquire_lease(key, owner, lease_seconds, path):
+            break
+        _count('waits')
+        time.sleep(WAIT_INTERVAL)
+
+    _count('misses')
+    stop = threading.Event()
+    keeper = threading.Thread(target=_keep_lease, args=(key, owner, lease_seconds, path, stop),
+                              name=f"lease:{key}", daemon=True)
+    keeper.start()
+    try:
+        # リース取得までに他のワーカーが保存している場合がある
+        entry = get_entry(key, path)
+        if entry is not None:
+            return entry
+        value = compute()
+        if value is None:
+            _count('failures')
+            if negative_ttl > 0:
+                put_entry(key, None, negative_ttl, path)
+            return None, time.time() + negative_ttl
+        put_entry(key, value, ttl, path)
+        _count('refreshes')
+        return value, time.time() + ttl
+    finally:
+        stop.set()
+        keeper.join()
+        release_lease(key, owner, path)
+
+
+def invalidate_prefix(prefix: str, path: Optional[str] = None) -> int:
+    """
+    キーが prefix で始まるエントリを削除（次の要求で取得し直す）
+
+    Returns:
+        削除したエントリ数
+    """
+
+    return _connect(path).execute(
+        "DELETE FROM entries WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+    ).rowcount
+
+
+def purge_expired(path: Optional[str] = None) -> int:
+    """
+    期限切れのエントリ・リースと、参照されなくなった内容を削除
+
+    Returns:
+        削除したエントリ数
+    """
+
+    now = time.time()
+    conn = _connect(path)
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        removed = conn.execute("DELETE FROM entries WHERE expires <= ?", (now,)).rowcount
+        conn.execute("DELETE FROM leases WHERE expires <= ?", (now,))
+        conn.execute("DELETE FROM blobs WHERE digest NOT IN (SELECT digest FROM entries)")
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    return removed
+
+
+def shared_cache_info(path: Optional[str] = None) -> Dict[str, Any]:
+    """エントリ数・内容数・このプロセスのヒット数など"""
+    conn = _connect(path)
+    with _STATS_LOCK:
+        stats = dict(_STATS)
+    return {
+        'path': path or SHARED_CACHE_PATH,
+        'entries': conn.execute("SELECT COUNT(*) FROM entries WHERE expires > ?", (time.time(),)).fetchone()[0],
+        'blobs': conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0],
+        **stats,
+    }
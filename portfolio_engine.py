@@ -0,0 +1,273 @@
+"""
+ポートフォリオエンジン
+目標比率行列（日付 × 銘柄）から、リバランス間のドリフトを含む
+ポートフォリオリターン・売買回転率・比率乖離を行列演算で計算する
+
+比率の生成:
+    fixed_weights               固定比率（例: TQQQ 60% / IEF 40%）
+    inverse_volatility_weights  ボラティリティの逆数に比例（簡易リスクパリティ）
+    volatility_target_weights   目標ボラティリティに合わせて比率全体を拡大・縮小
+
+比率の合計が1未満の部分は現金（リターン0）、1を超える部分は借入（金利0）として扱う。
+"""
+
+import numpy as np
+import pandas as pd
+
+from rebalance_schedule import FREQUENCIES, bar_schedule_positions
+
+PERIODS_PER_YEAR = 12  # 月次バー
+
+
+def _as_frame(weights, prices):
+    """比率を価格行列と同じ日付 × 銘柄の DataFrame に揃える"""
+    if isinstance(weights, pd.DataFrame):
+        return weights.reindex(index=prices.index, columns=prices.columns)
+    return pd.DataFrame(np.asarray(weights, dtype=np.float64), index=prices.index, columns=prices.columns)
+
+
+def fixed_weights(prices, weights):
+    """
+    全日付で同じ固定比率
+
+    Args:
+        prices (pd.DataFrame): 日付 × 銘柄の価格行列
+        weights (dict): {銘柄: 比率}（記載のない銘柄は0）
+
+    Returns:
+        pd.DataFrame: 日付 × 銘柄の目標比率
+    """
+
+    unknown = set(weights) - set(prices.columns)
+    if unknown:
+        raise ValueError(f"価格行列にない銘柄: {sorted(unknown)}")
+    row = np.array([weights.get(c, 0.0) for c in prices.columns], dtype=np.float64)
+    return pd.DataFrame(np.broadcast_to(row, prices.shape).copy(), index=prices.index, columns=prices.columns)
+
+
+def _trailing_volatility(prices, window):
+    """各日付までの期間リターンの標準偏差（年率、当日の価格までを使用）"""
+    returns = prices.pct_change(fill_method=None)
+    return returns.rolling(window, min_periods=window).std() * np.sqrt(PERIODS_PER_YEAR)
+
+
+def inverse_volatility_weights(prices, window=12):
+    """
+    ボラティリティの逆数に比例した比率（合計1、計算期間不足の行は NaN）
+
+    Args:
+        prices (pd.DataFrame): 日付 × 銘柄の価格行列
+        window (int): ボラティリティの計算期間（バー数）
+
+    Returns:
+        pd.DataFrame: 日付 × 銘柄の目標比率
+    """
+
+    inverse = 1 / _trailing_volatility(prices, window).replace(0, np.nan)
+    return inverse.div(inverse.sum(axis=1, min_count=prices.shape[1]), axis=0)
+
+
+def volatility_target_weights(prices, base_weights, target_vol=0.15, window=12, max_leverage=1.0):
+    """
+    基準比率のポートフォリオが目標ボラティリティになるよう比率全体を拡大・縮小
+
+    共分散は直近 window バーのリターンから日付ごとに計算する。
+
+    Args:
+        prices (pd.DataFrame): 日付 × 銘柄の価格行列
+        base_weights (pd.DataFrame): 基準の目標比率
+        target_vol (float): 目標ボラティリティ（年率、小数）
+        window (int): 共分散の計算期間（バー数）
+        max_leverage (float): 拡大倍率の上限
+
+    Returns:
+        pd.DataFrame: 日付 × 銘柄の目標比率（計算期間不足の行は NaN）
+    """
+
+    base = _as_frame(base_weights, prices).to_numpy()
+    returns = prices.pct_change(fill_method=None).to_numpy()
+    n_rows, n_assets = returns.shape
+
+    # 移動窓の共分散を累積和で一括計算（行 t は t-window+1..t のリターン）
+    valid = np.nan_to_num(returns)
+    outer = valid[:, :, None] * valid[:, None, :]
+    cum_x = np.cumsum(np.vstack([np.zeros((1, n_assets)), valid]), axis=0)
+    cum_xx = np.cumsum(np.concatenate([np.zeros((1, n_assets, n_assets)), outer]), axis=0)
+
+    scale = np.full(n_rows, np.nan)
+    rows = np.arange(window, n_rows)  # 行0はリターンが無いため window 行目から
+    if len(rows):
+        sum_x = cum_x[rows + 1] - cum_x[rows + 1 - window]
+        sum_xx = cum_xx[rows + 1] - cum_xx[rows + 1 - window]
+        cov = (sum_xx - sum_x[:, :, None] * sum_x[:, None, :] / window) / (window - 1)
+        w = base[rows]
+        port_vol = np.sqrt(np.maximum(np.einsum('ti,tij,tj->t', w, cov, w), 0) * PERIODS_PER_YEAR)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale[rows] = np.minimum(target_vol / port_vol, max_leverage)
+
+    return pd.DataFrame(base * scale[:, None], index=prices.index, columns=prices.columns)
+
+
+def rebalance_rows(prices, target_weights, rebalance=None, interval=3):
+    """
+    リバランスする行の位置
+
+    Args:
+        prices (pd.DataFrame): 日付 × 銘柄の価格行列
+        target_weights (pd.DataFrame): 目標比率（全銘柄 NaN の行はリバランスしない）
+        rebalance: None（比率がある全行）、'every_n'（比率がある最初の行から interval 行ごと）、
+            または rebalance_schedule の頻度（'quarterly_first' など、NYSE取引日のカレンダー基準）
+        interval (int): 'every_n' の間隔
+
+    Returns:
+        np.ndarray: リバランス行の位置（int64）
+    """
+
+    has_weights = np.flatnonzero(target_weights.notna().any(axis=1).to_numpy())
+    if rebalance is None:
+        return has_weights
+    if rebalance not in FREQUENCIES:
+        raise ValueError(f"未対応のリバランス頻度: {rebalance}")
+
+    if rebalance == 'every_n':
+        first = has_weights[0] if len(has_weights) else len(prices)
+        scheduled = bar_schedule_positions(prices.index[first:].to_numpy(), rebalance, n=interval) + first
+    else:
+        scheduled = bar_schedule_positions(prices.index.to_numpy(), rebalance)
+    return np.intersect1d(scheduled, has_weights)
+
+
+def simulate_portfolio(prices, target_weights, rebalance=None, interval=3, cost_bps=0.0):
+    """
+    目標比率行列からポートフォリオを計算
+
+    行 t の比率は t → t+1 の期間に適用する。リバランス行では目標比率に戻し、
+    それ以外の行では値動きに応じて比率がドリフトする。
+    売買コストはリバランス行の時点で資産から控除する（その行の equity はコスト控除後、
+    最終行のリバランスも控除される）。
+
+    Args:
+        prices (pd.DataFrame): 日付 × 銘柄の価格行列（欠損なし）
+        target_weights (pd.DataFrame | np.ndarray): 日付 × 銘柄の目標比率
+        rebalance: rebalance_rows と同じ
+        interval (int): 'every_n' の間隔
+        cost_bps (float): 売買金額に対するコスト（bps、リバランス時に控除）
+
+    Returns:
+        dict: {
+            'returns': 期間リターン（pd.Series、小数、保有開始行の日付、期間末のリバランス行のコストを含む）,
+            'equity': 累積資産（pd.Series、最初のリバランス行 = 1.0 から初回購入のコストを控除した値）,
+            'weights': 各行の実効比率（pd.DataFrame）,
+            'turnover': リバランス行の売買回転率（pd.Series、片道合計）,
+            'drift': 各行の目標比率からの乖離（pd.Series、絶対値合計）,
+        }
+    """
+
+    target = _as_frame(target_weights, prices)
+    price_values = prices.to_numpy(dtype=np.float64)
+    n_rows = len(prices)
+
+    rows = rebalance_rows(prices, target, rebalance, interval)
+    if len(rows) == 0:
+        raise ValueError("リバランス可能な行がありません（目標比率がすべて NaN）")
+
+    # 各行が属するリバランス区間
+    is_rebalance = np.zeros(n_rows, dtype=bool)
+    is_rebalance[rows] = True
+    segment = np.cumsum(is_rebalance) - 1
+    active = segment >= 0
+    segment_row = rows[np.maximum(segment, 0)]
+
+    segment_weights = np.nan_to_num(target.to_numpy()[segment_row])
+    growth = price_values / price_values[segment_row]
+
+    # 区間開始からの値動きでドリフトした比率（現金部分はリターン0）
+    holdings = segment_weights * growth
+    cash = 1 - segment_weights.sum(axis=1)
+    value = holdings.sum(axis=1) + cash
+    weights = holdings / value[:, None]
+
+    # リバランス直前の比率（前区間の比率を当日の価格までドリフト）
+    previous_row = np.concatenate(([0], rows[:-1]))
+    prev_weights = np.nan_to_num(target.to_numpy()[previous_row])
+    prev_holdings = prev_weights * price_values[rows] / price_values[previous_row]
+    prev_value = prev_holdings.sum(axis=1) + 1 - prev_weights.sum(axis=1)
+    pre_rebalance = prev_holdings / prev_value[:, None]
+    pre_rebalance[0] = 0.0  # 最初のリバランスは現金から購入
+    turnover_values = np.abs(segment_weights[rows] - pre_rebalance).sum(axis=1)
+
+    asset_returns = price_values[1:] / price_values[:-1] - 1
+    period_returns = (weights[:-1] * asset_returns).sum(axis=1)
+    # リバランス行のコストはその行（期間末）で控除
+    costs = np.zeros(n_rows)
+    costs[rows] = turnover_values * cost_bps / 10000
+    period_returns = (1 + period_returns) * (1 - costs[1:]) - 1
+    period_returns[~active[:-1]] = 0.0
+
+    start = rows[0]
+    initial = 1 - costs[start]
+    returns = pd.Series(period_returns[start:], index=prices.index[start:-1])
+    equity = pd.Series(
+        initial * np.concatenate(([1.0], np.cumprod(1 + period_returns[start:]))), index=prices.index[start:]
+    )
+
+    weights[~active] = 0.0
+    drift = np.abs(weights - segment_weights).sum(axis=1)
+    drift[~active] = 0.0
+
+    return {
+        'returns': returns,
+        'equity': equity,
+        'weights': pd.DataFrame(weights, index=prices.index, columns=prices.columns),
+        'turnover': pd.Series(turnover_values, index=prices.index[rows]),
+        'drift': pd.Series(drift, index=prices.index),
+    }
+
+
+def sweep_fixed_weights(prices, weight_sets, rebalance='every_n', interval=3):
+    """
+    複数の固定比率をまとめて計算（全組み合わせを1回の行列演算で評価）
+
+    Args:
+        prices (pd.DataFrame): 日付 × 銘柄の価格行列（欠損なし）
+        weight_sets (np.ndarray | list): (組み合わせ数, 銘柄数) の比率
+        rebalance: 'every_n' または rebalance_schedule の頻度
+        interval (int): 'every_n' の間隔
+
+    Returns:
+        pd.DataFrame: 組み合わせごとの {'total_return', 'cagr', 'max_drawdown'}（%、最初のリバランス行から）
+    """
+
+    weight_sets = np.atleast_2d(np.asarray(weight_sets, dtype=np.float64))
+    price_values = prices.to_numpy(dtype=np.float64)
+
+    rows = bar_schedule_positions(prices.index.to_numpy(), rebalance, n=interval)
+    if len(rows) == 0:
+        raise ValueError("リバランス可能な行がありません")
+
+    # simulate_portfolio と同じく最初のリバランス行から開始（それ以前の行は保有なし）
+    start = rows[0]
+    price_values = price_values[start:]
+    rows = rows - start
+    n_rows = len(price_values)
+    segment_row = rows[np.cumsum(np.isin(np.arange(n_rows), rows)) - 1]
+    growth = price_values / price_values[segment_row]                     # (T, N)
+
+    # 区間開始からの資産倍率 (S, T) = Σ_i w_i * growth_i + 現金
+    cash = (1 - weight_sets.sum(axis=1))[:, None]
+    value = weight_sets @ growth.T + cash
+
+    # 1期間の倍率: 前行の区間のまま当日の価格で評価した値 / 前行の値
+    carried = weight_sets @ (price_values[1:] / price_values[segment_row[:-1]]).T + cash
+    step = np.ones((len(weight_sets), n_rows))
+    step[:, 1:] = carried / value[:, :-1]
+    equity = np.cumprod(step, axis=1)
+
+    peak = np.maximum.accumulate(equity, axis=1)
+    years = (n_rows - 1) / PERIODS_PER_YEAR
+    final = equity[:, -1]
+    return pd.DataFrame({
+        'total_return': (final - 1) * 100,
+        'cagr': (np.power(np.maximum(final, 0), 1 / years) - 1) * 100 if years > 0 else np.nan,
+        'max_drawdown': (equity / peak - 1).min(axis=1) * 100,
+    })
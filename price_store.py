@@ -0,0 +1,396 @@
+"""
+ローカル価格ストア
+未調整の価格バーと配当・分割イベントを銘柄ごとに保存し、
+価格リターン用・トータルリターン用の調整済み系列を必要時に計算する（メモ化あり）
+
+保存形式（store_dir 以下）:
+    {symbol}_{interval}_bars.parquet    日付 × Open/High/Low/Close/Volume
+                                        メタデータ: 取得済みの期間（取得元に先頭より前のバーが無い期間も含む）
+    {symbol}_{interval}_events.parquet  配当・分割のある日付のみ（dividend, split）
+    {symbol}_{interval}_quality.json    保存時のデータ品質レポート（data_quality）
+
+保存時に data_quality で検査済みのため、読み込んだバーはタイムゾーンなし・昇順・重複なしで、
+欠損値・0以下の価格を含まない。
+
+データは momentum_core の取得元（set_history_provider）から取得する。
+保存時点で未確定だった当月のバーは PARTIAL_BAR_TTL_SECONDS を過ぎると取り直す。
+ファイルは一時ファイルに書いてから置き換える（同時に読み込む他のセッションが書きかけを読まないように）。
+"""
+
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from alignment_utils import slice_range
+from cache_utils import BoundedCache
+from data_quality import clean_bars, normalize_index, write_quality_report
+
+STORE_DIR = os.environ.get('MOMENTUM_STORE_DIR', '.price_store')
+PARTIAL_BAR_TTL_SECONDS = 1800  # momentum_core の月次データキャッシュと同じ30分
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+COVERAGE_KEY = b'momentum_coverage'  # バーファイルのメタデータ: 取得済みの期間 [開始日, 終了日)
+
+# 調整方式
+#   'price': 取得時の価格（分割調整済み、配当なし）→ 価格リターン
+#   'total': 配当再投資を反映した価格 → トータルリターン
+#   'raw'  : 分割調整も戻した実際の取引価格
+RETURN_MODES = ('price', 'total', 'raw')
+
+# (銘柄, 間隔, 方式, データバージョン) → 調整済みバー
+_ADJUSTED_CACHE_MAX_ENTRIES = 64
+_ADJUSTED_CACHE = BoundedCache('adjusted_bars', max_entries=_ADJUSTED_CACHE_MAX_ENTRIES)
+
+# この時刻より前に保存された未確定バーは TTL 内でも取り直す（refresh_partial_bars）
+_REFRESH_REQUESTED_AT = 0.0
+
+
+def _paths(symbol, interval, store_dir=None):
+    """バー・イベントファイルのパス"""
+    root = store_dir or STORE_DIR
+    return (
+        os.path.join(root, f"{symbol}_{interval}_bars.parquet"),
+        os.path.join(root, f"{symbol}_{interval}_events.parquet"),
+    )
+
+
+def split_history(history):
+    """
+    yfinance の history（auto_adjust=False, actions=True）をバーとイベントに分割
+
+    Args:
+        history (pd.DataFrame): yfinance の取得結果
+
+    Returns:
+        tuple: (バー DataFrame, イベント DataFrame)
+    """
+
+    history, _ = normalize_index(history)
+
+    bars = history[BAR_COLUMNS].astype(np.float64)
+
+    dividends = history['Dividends'] if 'Dividends' in history.columns else pd.Series(0.0, index=history.index)
+    splits = history['Stock Splits'] if 'Stock Splits' in history.columns else pd.Series(0.0, index=history.index)
+    has_event = (dividends.to_numpy() != 0) | (splits.to_numpy() != 0)
+    events = pd.DataFrame({
+        'dividend': dividends.to_numpy(dtype=np.float64)[has_event],
+        'split': splits.to_numpy(dtype=np.float64)[has_event],
+    }, index=history.index[has_event])
+
+    return bars, events
+
+
+def download_raw_history(symbol, start_date, end_date, interval='1mo'):
+    """
+    取得元（momentum_core の set_history_provider）から未調整バーと配当・分割イベントを取得
+
+    Returns:
+        tuple: (バー DataFrame, イベント DataFrame) または None
+    """
+
+    # momentum_core.engine がこのモジュールを import するため実行時に読み込む
+    from momentum_core.data import HISTORY_INTERVAL, fetch_raw_history
+
+    if interval != HISTORY_INTERVAL:
+        raise ValueError(f"未対応のバー間隔: {interval}")
+    history = fetch_raw_history(symbol, start_date, end_date)
+    if history is None:
+        return None
+    return split_history(history)
+
+
+def _temp_path(path):
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def _merge_coverage(old, new):
+    """取得済み期間を結合（重ならない場合は新しい期間のみ）"""
+    if new is None:
+        return old
+    if old is None or new[0] > old[1] or old[0] > new[1]:
+        return new
+    return min(old[0], new[0]), max(old[1], new[1])
+
+
+def save_symbol(symbol, bars, events, interval='1mo', store_dir=None, coverage=None):
+    """
+    バーとイベントをストアに保存（既存データとマージ、同一日付は新しい値を優先）
+
+    マージ後のバーをデータ品質検査し、欠損値・0以下の価格を含む行を除外して
+    品質レポートを一緒に保存する。
+    両ファイルを一時ファイルに書いてから、イベント → バーの順に置き換える。
+
+    Args:
+        symbol (str): 銘柄
+        bars (pd.DataFrame): バー
+        events (pd.DataFrame): イベント
+        interval (str): バー間隔
+        store_dir (str): 保存先ディレクトリ
+        coverage (tuple): 取得を要求した期間 (開始日, 終了日)（既存の期間と結合して保存）
+
+    Returns:
+        dict: データ品質レポート
+    """
+
+    bars_path, events_path = _paths(symbol, interval, store_dir)
+    os.makedirs(os.path.dirname(bars_path) or '.', exist_ok=True)
+
+    if coverage is not None:
+        coverage = (pd.Timestamp(coverage[0]), pd.Timestamp(coverage[1]))
+    existing = load_symbol(symbol, interval, store_dir)
+    if existing is not None:
+        old_bars, old_events = existing
+        # 取り直した日付は新しい値に置き換える（重複として報告しない）
+        bars = pd.concat([old_bars[~old_bars.index.isin(bars.index)], bars])
+        events = pd.concat([old_events[~old_events.index.isin(events.index)], events])
+        coverage = _merge_coverage(stored_coverage(symbol, interval, store_dir), coverage)
+
+    bars, report = clean_bars(bars, interval, symbol)
+    events, _ = normalize_index(events)
+    bars.index.name = 'Date'
+    events.index.name = 'Date'
+
+    bars_table = pa.Table.from_pandas(bars)
+    if coverage is not None:
+        bars_table = bars_table.replace_schema_metadata({
+            **(bars_table.schema.metadata or {}),
+            COVERAGE_KEY: json.dumps([str(coverage[0].date()), str(coverage[1].date())]),
+        })
+
+    bars_temp, events_temp = _temp_path(bars_path), _temp_path(events_path)
+    pq.write_table(bars_table, bars_temp, compression='zstd')
+    events.to_parquet(events_temp, compression='zstd')
+    os.replace(events_temp, events_path)
+    os.replace(bars_temp, bars_path)
+    write_quality_report(report, store_dir or STORE_DIR)
+    for warning in report['warnings']:
+        print(f"   ⚠️ {symbol}: {warning}")
+    return report
+
+
+def stored_coverage(symbol, interval='1mo', store_dir=None):
+    """
+    取得済みの期間（バーファイルのメタデータ）
+
+    Returns:
+        tuple: (開始日, 終了日) または None（未保存・期間の記録なし）
+    """
+
+    bars_path, _ = _paths(symbol, interval, store_dir)
+    if not os.path.exists(bars_path):
+        return None
+    metadata = pq.read_schema(bars_path).metadata or {}
+    if COVERAGE_KEY not in metadata:
+        return None
+    start, end = json.loads(metadata[COVERAGE_KEY])
+    return pd.Timestamp(start), pd.Timestamp(end)
+
+
+def load_symbol(symbol, interval='1mo', store_dir=None):
+    """
+    ストアからバーとイベントを読み込む
+
+    Returns:
+        tuple: (バー DataFrame, イベント DataFrame) または None（未保存）
+    """
+
+    bars_path, events_path = _paths(symbol, interval, store_dir)
+    if not os.path.exists(bars_path):
+        return None
+    bars = pd.read_parquet(bars_path)
+    if os.path.exists(events_path):
+        events = pd.read_parquet(events_path)
+    else:
+        events = pd.DataFrame({'dividend': [], 'split': []}, index=pd.DatetimeIndex([], name='Date'))
+    return bars, events
+
+
+def data_version(symbol, interval='1mo', store_dir=None):
+    """保存データのバージョン（ファイル更新時刻とサイズ）、未保存なら None"""
+    bars_path, events_path = _paths(symbol, interval, store_dir)
+    if not os.path.exists(bars_path):
+        return None
+    versions = []
+    for path in (bars_path, events_path):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            versions.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(versions)
+
+
+def _partial_bar_stale(bars, bars_path, end_date):
+    """
+    最終バーが保存時点で未確定（保存した月以降のバー）で、保存から TTL を過ぎているか
+    （refresh_partial_bars より前の保存も期限切れとする）
+
+    期間の終了日が最終バーより後の場合のみ取り直しの対象にする。
+    """
+
+    saved_at = os.path.getmtime(bars_path)
+    saved_month = pd.Timestamp.fromtimestamp(saved_at).to_period('M')
+    last_bar = bars.index[-1]
+    expired = time.time() - saved_at > PARTIAL_BAR_TTL_SECONDS or saved_at < _REFRESH_REQUESTED_AT
+    return (last_bar.to_period('M') >= saved_month
+            and expired
+            and pd.Timestamp(end_date) > last_bar)
+
+
+def _covers(coverage, start_date, end_date):
+    """取得済みの期間に要求期間の月次バーがすべて含まれるか"""
+    start_month = pd.Timestamp(start_date).to_period('M')
+    end_month = (pd.Timestamp(end_date) - pd.Timedelta(days=1)).to_period('M')
+    return (coverage[0].to_period('M') <= start_month
+            and (coverage[1] - pd.Timedelta(days=1)).to_period('M') >= end_month)
+
+
+def ensure_symbol(symbol, start_date, end_date, interval='1mo', store_dir=None):
+    """
+    ストアに期間のデータが無ければ取得して保存（未確定だった最終バーは期限切れ後に取り直す）
+
+    取得済みの期間で判定するため、上場前など取得元にバーが無い期間を含む要求でも
+    2回目以降は取得しない。
+
+    Returns:
+        bool: データが利用可能かどうか
+    """
+
+    existing = load_symbol(symbol, interval, store_dir)
+    fetch_start, fetch_end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    if existing is not None:
+        bars = existing[0]
+        coverage = stored_coverage(symbol, interval, store_dir)
+        if coverage is None and len(bars):
+            # 期間の記録が無い保存データはバーの範囲で判定
+            coverage = (bars.index[0], bars.index[-1] + pd.DateOffset(months=1))
+        if coverage is not None and _covers(coverage, start_date, end_date):
+            if not len(bars) or not _partial_bar_stale(bars, _paths(symbol, interval, store_dir)[0], end_date):
+                return True
+            # 未確定だった最終バーから取り直す（保存時に同じ日付は新しい値で上書き）
+            fetch_start = bars.index[-1]
+        elif coverage is not None:
+            # 取得済みの期間と連続するように取得（期間の記録が途切れないように）
+            fetch_start = min(fetch_start, coverage[0])
+            fetch_end = max(fetch_end, coverage[1])
+
+    print(f"   {symbol} 未調整データ・配当分割イベントを取得中...")
+    downloaded = download_raw_history(symbol, fetch_start, fetch_end, interval)
+    if downloaded is None:
+        return existing is not None
+    save_symbol(symbol, downloaded[0], downloaded[1], interval, store_dir, coverage=(fetch_start, fetch_end))
+    return True
+
+
+def _event_positions(bar_index, event_index):
+    """各イベントが属するバーの位置（バー日付 <= イベント日付 の最後のバー）"""
+    return np.searchsorted(bar_index.asi8, event_index.as_unit(bar_index.unit).asi8, side='right') - 1
+
+
+def adjustment_factors(bars, events, mode='total', include_event_bar=False):
+    """
+    調整係数を計算（各バーの価格に掛ける係数）
+
+    'total' は配当落ち日以前の価格を (1 - 配当 / 前バー終値) の累積積で縮小する。
+    'raw' は以降の分割比率の累積積を掛けて分割調整を戻す。
+
+    月次バーの始値はバー内のイベントより前に付いた価格のため、始値には
+    include_event_bar=True（イベントのあるバー自体も調整）の係数を使う。
+    終値はイベント後の価格のため、イベントより前のバーだけを調整する。
+
+    Args:
+        bars (pd.DataFrame): バー
+        events (pd.DataFrame): イベント
+        mode (str): 'price', 'total' または 'raw'
+        include_event_bar (bool): イベントのあるバー自体も調整するかどうか
+
+    Returns:
+        np.ndarray: 係数（バー数）
+    """
+
+    if mode not in RETURN_MODES:
+        raise ValueError(f"未対応の調整方式: {mode}")
+
+    n = len(bars)
+    factors = np.ones(n)
+    if mode == 'price' or events.empty or n == 0:
+        return factors
+
+    positions = _event_positions(bars.index, events.index)
+    valid = positions >= 0
+
+    if mode == 'total':
+        dividends = np.zeros(n)
+        np.add.at(dividends, positions[valid], events['dividend'].to_numpy()[valid])
+        close = bars['Close'].to_numpy()
+        previous_close = np.concatenate(([np.nan], close[:-1]))
+        multiplier = np.where(dividends > 0, 1 - dividends / previous_close, 1.0)
+        multiplier = np.where(np.isfinite(multiplier), multiplier, 1.0)
+    else:
+        ratios = np.ones(n)
+        split = events['split'].to_numpy()
+        has_split = valid & (split > 0)
+        np.multiply.at(ratios, positions[has_split], split[has_split])
+        multiplier = ratios
+
+    # 各バーより後（include_event_bar の場合はそのバー以降）のイベントの累積積（後方調整）
+    suffix = np.cumprod(multiplier[::-1])[::-1]
+    if include_event_bar:
+        return suffix
+    factors[:-1] = suffix[1:]
+    return factors
+
+
+def get_adjusted_bars(symbol, mode='total', interval='1mo', start_date=None, end_date=None, store_dir=None):
+    """
+    調整済みバーを取得（ストアのデータから計算、データバージョンごとにメモ化）
+
+    ネットワークアクセスは行わない。方式を切り替えても保存データの再取得は不要。
+
+    Args:
+        symbol (str): 銘柄
+        mode (str): 'price', 'total' または 'raw'
+        interval (str): バー間隔
+        start_date (datetime): 開始日（None の場合は先頭から）
+        end_date (datetime): 終了日（None の場合は末尾まで、終了日は含まない）
+        store_dir (str): ストアディレクトリ
+
+    Returns:
+        pd.DataFrame: 調整済みバー または None（未保存）
+    """
+
+    version = data_version(symbol, interval, store_dir)
+    if version is None:
+        return None
+
+    key = (symbol, interval, mode, store_dir or STORE_DIR, version)
+    adjusted = _ADJUSTED_CACHE.get(key)
+    if adjusted is None:
+        bars, events = load_symbol(symbol, interval, store_dir)
+        adjusted = bars.copy()
+        factors = adjustment_factors(bars, events, mode)
+        adjusted[PRICE_COLUMNS] = bars[PRICE_COLUMNS].to_numpy() * factors[:, None]
+        # 始値はバー内の配当落ち・分割より前の価格
+        adjusted['Open'] = bars['Open'].to_numpy() * adjustment_factors(bars, events, mode, include_event_bar=True)
+        _ADJUSTED_CACHE.put(key, adjusted)
+
+    if start_date is not None or end_date is not None:
+        return slice_range(adjusted, start_date, end_date)
+    return adjusted
+
+
+def clear_adjusted_cache():
+    """調整済みバーのメモ化をクリア"""
+    _ADJUSTED_CACHE.clear()
+
+
+def refresh_partial_bars():
+    """保存済みの未確定バーを次の ensure_symbol で取り直す（確定済みのバーは再取得しない）"""
+    global _REFRESH_REQUESTED_AT
+    _REFRESH_REQUESTED_AT = time.time()
+    clear_adjusted_cache()
@@ -0,0 +1,240 @@
+"""
+プロファイリングモード
+環境変数 MOMENTUM_PROFILE=1 またはクエリパラメータ ?profile=1 で有効化し、
+1リクエスト（1回の呼び出し）ごとに以下をプロファイル保存先へ出力する
+
+    {時刻}_{名前}.pstats      cProfile の結果（snakeviz / pstats で閲覧）
+    {時刻}_{名前}.collapsed   サンプリングによるスタック集計（flamegraph.pl / speedscope 用）
+
+古いファイルは MOMENTUM_PROFILE_KEEP 件（既定50件）を超えた分から削除する。
+cProfile はプロセスで同時に1つしか有効にできない（Python 3.12 以降はエラー）ため、
+他のリクエストをプロファイル中の呼び出しはプロファイルせずに実行する。
+無効時は呼び出しをそのまま実行し、フラグ確認以外の処理は行わない。
+"""
+
+import cProfile
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+PROFILE_ENV = 'MOMENTUM_PROFILE'
+PROFILE_DIR = os.environ.get('MOMENTUM_PROFILE_DIR', '.profiles')
+PROFILE_KEEP = int(os.environ.get('MOMENTUM_PROFILE_KEEP', '50'))
+PROFILE_QUERY_PARAM = 'profile'
+SAMPLE_INTERVAL = 0.005  # サンプリング間隔（秒）
+
+_TRUE_VALUES = ('1', 'true', 'yes', 'on')
+_ENV_ENABLED = os.environ.get(PROFILE_ENV, '').lower() in _TRUE_VALUES
+_ACTIVE = threading.local()
+_SESSION_LOCK = threading.Lock()  # プロセス全体で1セッションのみ
+
+
+def profiling_enabled(query_params=None):
+    """
+    プロファイリングが有効かどうか
+
+    Args:
+        query_params (Mapping): クエリパラメータ（st.query_params など、None の場合は環境変数のみ）
+
+    Returns:
+        bool: 有効なら True
+    """
+
+    if _ENV_ENABLED:
+        return True
+    if query_params is None:
+        return False
+    value = query_params.get(PROFILE_QUERY_PARAM)
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else None
+    return str(value).lower() in _TRUE_VALUES
+
+
+class StackSampler:
+    """
+    対象スレッドのスタックを一定間隔で取得して集計するサンプリングプロファイラ
+
+    集計結果は collapsed 形式（"関数;関数;関数 サンプル数"）で出力する。
+    """
+
+    def __init__(self, thread_id=None, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+
+    def write_collapsed(self, path):
+        """collapsed 形式で書き出す"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def rotate_profiles(profile_dir=None, keep=None):
+    """
+    古いプロファイルを削除（拡張子ごとに新しい keep 件を残す）
+
+    Returns:
+        int: 削除したファイル数
+    """
+
+    profile_dir = profile_dir or PROFILE_DIR
+    keep = PROFILE_KEEP if keep is None else keep
+    if not os.path.isdir(profile_dir):
+        return 0
+
+    removed = 0
+    for extension in ('.pstats', '.collapsed'):
+        files = sorted(
+            (entry for entry in os.scandir(profile_dir) if entry.name.endswith(extension)),
+            key=lambda entry: entry.stat().st_mtime_ns,
+            reverse=True
+        )
+        for entry in files[keep:]:
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+@contextmanager
+def _skipped_session():
+    """記録しないセッションの間、入れ子の呼び出しも記録しない"""
+    _ACTIVE.session = True
+    try:
+        yield
+    finally:
+        _ACTIVE.session = False
+
+
+@contextmanager
+def profile_session(name, enabled=True, profile_dir=None):
+    """
+    ブロックの実行をプロファイルしてファイルに保存
+
+    入れ子で呼ばれた場合は外側のセッションだけが記録する。
+    他のスレッドがプロファイル中、または他のプロファイラが有効な場合は記録せずに実行する。
+
+    Args:
+        name (str): プロファイル名（ファイル名に使用）
+        enabled (bool): False の場合は何もしない
+        profile_dir (str): 保存先ディレクトリ
+
+    Yields:
+        dict: {'pstats': パス, 'collapsed': パス}（終了後に設定）
+    """
+
+    artifacts = {}
+    if not enabled or getattr(_ACTIVE, 'session', False):
+        yield artifacts
+        return
+    if not _SESSION_LOCK.acquire(blocking=False):
+        print(f"⏭️ 他のリクエストをプロファイル中のため記録しません: {name}")
+        with _skipped_session():
+            yield artifacts
+        return
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        # 他のプロファイラ（デバッガ・カバレッジ計測など）が有効
+        _SESSION_LOCK.release()
+        print(f"⏭️ プロファイラを開始できないため記録しません: {name} ({e})")
+        with _skipped_session():
+            yield artifacts
+        return
+
+    profile_dir = profile_dir or PROFILE_DIR
+    _ACTIVE.session = True
+    sampler = StackSampler()
+    started = time.perf_counter()
+    sampler.start()
+    try:
+        yield artifacts
+    finally:
+        profiler.disable()
+        sampler.stop()
+        _ACTIVE.session = False
+        _SESSION_LOCK.release()
+
+        os.makedirs(profile_dir, exist_ok=True)
+        stem = os.path.join(profile_dir, f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{name}")
+        artifacts['pstats'] = stem + '.pstats'
+        artifacts['collapsed'] = stem + '.collapsed'
+        artifacts['elapsed'] = time.perf_counter() - started
+        profiler.dump_stats(artifacts['pstats'])
+        sampler.write_collapsed(artifacts['collapsed'])
+        rotate_profiles(profile_dir)
+        print(f"🔬 プロファイル保存: {artifacts['pstats']} ({artifacts['elapsed']:.2f}秒)")
+
+
+def profiled(name=None):
+    """
+    環境変数でプロファイリングが有効なときだけ関数呼び出しを記録するデコレータ
+
+    無効時は元の関数をそのまま呼び出す。
+    """
+
+    def decorator(func):
+        if not _ENV_ENABLED:
+            return func
+
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profile_session(label):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def run_profiled(func, name, query_params=None):
+    """
+    環境変数またはクエリパラメータで有効なときにプロファイルしながら func() を実行
+
+    Args:
+        func (callable): 実行する関数（引数なし）
+        name (str): プロファイル名
+        query_params (Mapping): クエリパラメータ
+
+    Returns:
+        func() の戻り値
+    """
+
+    if not profiling_enabled(query_params):
+        return func()
+    with profile_session(name):
+        return func()
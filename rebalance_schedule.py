@@ -0,0 +1,326 @@
+"""
+リバランススケジュール
+NYSEの取引日テーブル（祝日・臨時休場・短縮取引日）を年範囲ごとに事前計算し、
+月次・四半期（初日/最終取引日）・N取引日ごとのリバランス位置を整数インデックス配列で返す
+（全バックテストエンジンで共有し、カレンダー範囲ごとにキャッシュ）
+
+価格バー（月次バーの日付は月初の暦日）へは、各バーの価格が付く取引日（バーの日付以降の
+最初の取引日）で対応付ける。リバランス日以降に最初に付く価格のバーでリバランスするため、
+データ開始時点で途中の四半期・データ末尾で終わっていない期間にはリバランスを置かない。
+始値の月次バーでは期間の最終取引日のリバランスは翌期間の最初のバーで約定するため、
+初日と最終取引日のスケジュールの違いは系列の先頭・末尾のみ（日次バーでは日付自体が異なる）。
+
+3ヶ月切り替え戦略のエンジン（momentum_core・ストリーミング・戦略比較・シグナル履歴・
+頑健性検証）は bar_rebalance_positions の Nバーごとの位置、比率ベースの
+ポートフォリオエンジンは bar_schedule_positions のカレンダー基準の位置を使う。
+"""
+
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+FREQUENCIES = ('monthly_first', 'monthly_last', 'quarterly_first', 'quarterly_last', 'every_n')
+
+# 規則外の臨時休場日
+NYSE_SPECIAL_CLOSURES = {
+    date(2001, 9, 11), date(2001, 9, 12), date(2001, 9, 13), date(2001, 9, 14),  # 同時多発テロ
+    date(2004, 6, 11),   # レーガン元大統領国葬
+    date(2007, 1, 2),    # フォード元大統領国葬
+    date(2012, 10, 29), date(2012, 10, 30),  # ハリケーン・サンディ
+    date(2018, 12, 5),   # ブッシュ（父）元大統領国葬
+    date(2025, 1, 9),    # カーター元大統領国葬
+}
+
+
+def _nth_weekday(year, month, weekday, n):
+    """指定月の第n週の曜日（n=-1 は最終週）"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + (month == 12), month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year):
+    """復活祭の日付（グレゴリオ暦、匿名グレゴリオ算法）"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _observed(day):
+    """土曜→前日金曜、日曜→翌日月曜の振替"""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def nyse_holidays(year):
+    """
+    NYSEの休場日（規則に基づく祝日 + 臨時休場）
+
+    Args:
+        year (int): 年
+
+    Returns:
+        set: 休場日の date の集合
+    """
+
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),       # キング牧師記念日
+        _nth_weekday(year, 2, 0, 3),       # 大統領の日
+        _easter(year) - timedelta(days=2),  # 聖金曜日
+        _nth_weekday(year, 5, 0, -1),      # メモリアルデー
+        _observed(date(year, 7, 4)),       # 独立記念日
+        _nth_weekday(year, 9, 0, 1),       # レイバーデー
+        _nth_weekday(year, 11, 3, 4),      # 感謝祭
+        _observed(date(year, 12, 25)),     # クリスマス
+    }
+
+    # 元日（土曜の場合は前年12/31に振替えない＝NYSE規則）
+    new_year = date(year, 1, 1)
+    if new_year.weekday() == 6:
+        holidays.add(new_year + timedelta(days=1))
+    elif new_year.weekday() != 5:
+        holidays.add(new_year)
+
+    # ジューンティーンス（2022年から）
+    if year >= 2022:
+        holidays.add(_observed(date(year, 6, 19)))
+
+    holidays.update(d for d in NYSE_SPECIAL_CLOSURES if d.year == year)
+    return holidays
+
+
+def nyse_early_closes(year):
+    """
+    NYSEの短縮取引日（13時終了）
+
+    Args:
+        year (int): 年
+
+    Returns:
+        set: 短縮取引日の date の集合
+    """
+
+    holidays = nyse_holidays(year)
+    candidates = [
+        date(year, 7, 3),                                     # 独立記念日前日
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),     # 感謝祭翌日
+        date(year, 12, 24),                                   # クリスマスイブ
+    ]
+    return {d for d in candidates if d.weekday() < 5 and d not in holidays}
+
+
+@lru_cache(maxsize=32)
+def trading_day_table(start_year, end_year):
+    """
+    取引日テーブルを事前計算（年範囲ごとにキャッシュ）
+
+    Args:
+        start_year (int): 開始年
+        end_year (int): 終了年（含む）
+
+    Returns:
+        dict: {'days': 取引日（datetime64[D]、昇順）, 'early_close': 短縮取引日フラグ}
+    """
+
+    all_days = np.arange(
+        np.datetime64(f'{start_year}-01-01'), np.datetime64(f'{end_year + 1}-01-01'), dtype='datetime64[D]'
+    )
+    weekday = (all_days.astype(np.int64) + 3) % 7  # 1970-01-01 は木曜（=3）
+
+    holidays = set()
+    early = set()
+    for year in range(start_year, end_year + 1):
+        holidays.update(nyse_holidays(year))
+        early.update(nyse_early_closes(year))
+
+    holiday_array = np.array(sorted(holidays), dtype='datetime64[D]')
+    early_array = np.array(sorted(early), dtype='datetime64[D]')
+
+    days = all_days[(weekday < 5) & ~np.isin(all_days, holiday_array)]
+    days.setflags(write=False)
+    early_close = np.isin(days, early_array)
+    early_close.setflags(write=False)
+    return {'days': days, 'early_close': early_close}
+
+
+def trading_days(start_date, end_date):
+    """
+    期間内のNYSE取引日
+
+    Args:
+        start_date (datetime): 開始日（含む）
+        end_date (datetime): 終了日（含む）
+
+    Returns:
+        np.ndarray: 取引日（datetime64[D]）
+    """
+
+    start = np.datetime64(pd.Timestamp(start_date).date(), 'D')
+    end = np.datetime64(pd.Timestamp(end_date).date(), 'D')
+    table = trading_day_table(int(str(start)[:4]), int(str(end)[:4]))
+    days = table['days']
+    return days[np.searchsorted(days, start):np.searchsorted(days, end, side='right')]
+
+
+def schedule_indices(dates, frequency='quarterly_first', n=3, offset=0):
+    """
+    日付配列に対するリバランス位置を一括計算
+
+    Args:
+        dates (array-like): 昇順の日付（取引日テーブル、または日付そのものを期間の区切りとする場合のバーの日付）
+        frequency (str): 'monthly_first', 'monthly_last', 'quarterly_first',
+            'quarterly_last', 'every_n'
+        n (int): 'every_n' の間隔（行数）
+        offset (int): 'every_n' の開始位置
+
+    Returns:
+        np.ndarray: リバランス位置（int64、昇順）
+    """
+
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"未対応のリバランス頻度: {frequency}")
+
+    days = np.asarray(dates, dtype='datetime64[D]')
+    count = len(days)
+    if count == 0:
+        return np.empty(0, dtype=np.int64)
+
+    if frequency == 'every_n':
+        return np.arange(offset, count, n, dtype=np.int64)
+
+    months = days.astype('datetime64[M]').astype(np.int64)
+    keys = months if frequency.startswith('monthly') else months // 3
+
+    boundary = np.empty(count, dtype=bool)
+    if frequency.endswith('first'):
+        boundary[0] = True
+        boundary[1:] = keys[1:] != keys[:-1]
+    else:
+        boundary[-1] = True
+        boundary[:-1] = keys[:-1] != keys[1:]
+
+    return np.flatnonzero(boundary)
+
+
+@lru_cache(maxsize=128)
+def _cached_schedule(start, end, frequency, n, offset):
+    days = trading_days(start, end)
+    positions = schedule_indices(days, frequency, n, offset)
+    positions.setflags(write=False)
+    return days, positions
+
+
+def get_rebalance_schedule(start_date, end_date, frequency='quarterly_first', n=3, offset=0):
+    """
+    NYSE取引日ベースのリバランススケジュール（カレンダー範囲ごとにキャッシュ）
+
+    Args:
+        start_date (datetime): 開始日
+        end_date (datetime): 終了日
+        frequency (str): schedule_indices と同じ
+        n (int): 'every_n' の間隔（取引日数）
+        offset (int): 'every_n' の開始位置
+
+    Returns:
+        tuple: (取引日配列, リバランス位置配列)。リバランス日は days[positions]
+    """
+
+    start = pd.Timestamp(start_date).date()
+    end = pd.Timestamp(end_date).date()
+    return _cached_schedule(start, end, frequency, n, offset)
+
+
+def bar_trading_days(bar_dates):
+    """
+    各バーの価格が付く取引日（バーの日付以降の最初のNYSE取引日）
+
+    Args:
+        bar_dates (array-like): 昇順のバーの日付
+
+    Returns:
+        np.ndarray: 取引日（datetime64[D]）
+    """
+
+    dates = np.asarray(bar_dates, dtype='datetime64[D]')
+    if len(dates) == 0:
+        return dates
+    first_year = int(str(dates[0])[:4])
+    last_year = int(str(dates[-1])[:4]) + 1  # 年末のバーの取引日は翌年になり得る
+    days = trading_day_table(first_year, last_year)['days']
+    return days[np.minimum(np.searchsorted(days, dates), len(days) - 1)]
+
+
+def bar_schedule_positions(bar_dates, frequency='quarterly_first', n=3, offset=0):
+    """
+    バーの日付配列に対するカレンダー基準のリバランス位置
+
+    NYSE取引日のスケジュール（get_rebalance_schedule、期間全体を含む四半期単位の範囲）の
+    各リバランス日を、その日以降に最初に価格が付くバーに対応付ける。
+    データ開始より前・最終バーより後のリバランス日は含めない。
+    'every_n' は offset 行目から n バーごと。
+
+    Args:
+        bar_dates (array-like): 昇順のバーの日付
+        frequency (str): schedule_indices と同じ
+        n (int): 'every_n' の間隔（バー数）
+        offset (int): 'every_n' の開始位置
+
+    Returns:
+        np.ndarray: リバランス位置（int64、昇順）
+    """
+
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"未対応のリバランス頻度: {frequency}")
+
+    dates = np.asarray(bar_dates, dtype='datetime64[D]')
+    if frequency == 'every_n' or len(dates) == 0:
+        return schedule_indices(dates, frequency, n, offset)
+
+    # 先頭・末尾の期間を含む四半期単位の範囲（期間の初日・最終取引日が範囲の端で切れないように）
+    first_month = dates[0].astype('datetime64[M]')
+    last_month = dates[-1].astype('datetime64[M]')
+    range_start = first_month - first_month.astype(np.int64) % 3
+    range_end = last_month - last_month.astype(np.int64) % 3 + 3
+    days, positions = get_rebalance_schedule(
+        range_start.astype('datetime64[D]').astype(object),
+        (range_end.astype('datetime64[D]') - 1).astype(object),
+        frequency,
+    )
+    rebalance_days = days[positions]
+
+    price_days = bar_trading_days(dates)
+    rows = np.searchsorted(price_days, rebalance_days)
+    valid = (rebalance_days >= price_days[0]) & (rows < len(dates))
+    return np.unique(rows[valid]).astype(np.int64)
+
+
+def bar_rebalance_positions(bar_count, interval=3, first=1, hold=2):
+    """
+    月次バー行列でのリバランス位置（判定に前月行、保有終了に hold 行先が必要）
+
+    Args:
+        bar_count (int): バー数
+        interval (int): リバランス間隔（バー数）
+        first (int): 最初のリバランス位置
+        hold (int): 保有バー数
+
+    Returns:
+        np.ndarray: リバランス位置（int64）
+    """
+
+    return np.arange(first, max(bar_count - hold, first), interval, dtype=np.int64)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+ロバストネス検証（ブロック・ブートストラップ / モンテカルロ）
+過去の月次リターンから多数の仮想価格パスを生成し、
+TQQQ/GLD 切替戦略の CAGR・最大ドローダウンの信頼区間を求める
+
+全パスを NumPy 配列演算でまとめて計算し、パスをチャンクに分けてプロセスプールで並列実行する。
+乱数はシード付き（SeedSequence でチャンクごとに独立したストリームを生成）で再現可能。
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from rebalance_schedule import bar_rebalance_positions
+
+SIMULATION_SYMBOLS = ('IEF', 'TQQQ', 'GLD')
+METHODS = ('block_bootstrap', 'monte_carlo')
+DEFAULT_LEVELS = (0.05, 0.5, 0.95)
+REBALANCE_INTERVAL = 3
+HOLD_BARS = 2  # compute_trade_log と同じく i から i+2 の月初まで保有
+
+
+def monthly_returns(price_matrix, symbols=SIMULATION_SYMBOLS):
+    """
+    整列済み価格行列から月次リターン行列を作成
+
+    Args:
+        price_matrix (pd.DataFrame): 日付 × 銘柄の始値行列
+        symbols (tuple): 使用する銘柄（列順）
+
+    Returns:
+        np.ndarray: (月数 - 1, 銘柄数) の単純リターン
+    """
+
+    prices = price_matrix[list(symbols)].to_numpy(dtype=np.float64)
+    return prices[1:] / prices[:-1] - 1
+
+
+def block_bootstrap_returns(returns, n_paths, horizon, block_size, rng):
+    """
+    循環ブロック・ブートストラップで月次リターンのパスを生成
+
+    連続した block_size ヶ月のブロック単位で復元抽出し、
+    銘柄間の相関と短期の自己相関を保つ。
+
+    Args:
+        returns (np.ndarray): (月数, 銘柄数) の過去リターン
+        n_paths (int): パス数
+        horizon (int): 1パスの月数
+        block_size (int): ブロック長（月）
+        rng (np.random.Generator): 乱数生成器
+
+    Returns:
+        np.ndarray: (パス数, horizon, 銘柄数) のリターン
+    """
+
+    n_months = len(returns)
+    n_blocks = -(-horizon // block_size)
+    starts = rng.integers(0, n_months, size=(n_paths, n_blocks))
+    index = (starts[:, :, None] + np.arange(block_size)) % n_months
+    index = index.reshape(n_paths, -1)[:, :horizon]
+    return returns[index]
+
+
+def monte_carlo_returns(returns, n_paths, horizon, rng):
+    """
+    対数リターンの多変量正規分布から月次リターンのパスを生成
+
+    Args:
+        returns (np.ndarray): (月数, 銘柄数) の過去リターン
+        n_paths (int): パス数
+        horizon (int): 1パスの月数
+        rng (np.random.Generator): 乱数生成器
+
+    Returns:
+        np.ndarray: (パス数, horizon, 銘柄数) のリターン
+    """
+
+    log_returns = np.log1p(returns)
+    mean = log_returns.mean(axis=0)
+    cov = np.cov(log_returns, rowvar=False)
+    draws = rng.multivariate_normal(mean, cov, size=(n_paths, horizon), method='cholesky')
+    return np.expm1(draws)
+
+
+def simulate_strategy(path_returns):
+    """
+    リターンのパスに対して3ヶ月リバランス戦略を一括実行
+
+    compute_trade_log と同じ規則（前月比IEFリターン > 0 なら TQQQ、それ以外は GLD）。
+
+    Args:
+        path_returns (np.ndarray): (パス数, 月数, 銘柄数) のリターン（列順は SIMULATION_SYMBOLS）
+
+    Returns:
+        np.ndarray: (パス数, トレード数) のトレードリターン（小数）
+    """
+
+    n_bars = path_returns.shape[1] + 1
+    positions = bar_rebalance_positions(n_bars, interval=REBALANCE_INTERVAL, first=1)
+
+    # バー位置 i の価格から i+2 までの保有リターン = 月次リターン i, i+1 の積
+    ief_signal = path_returns[:, positions - 1, 0]
+    tqqq_hold = np.prod(1 + path_returns[:, positions[:, None] + np.arange(HOLD_BARS), 1], axis=2) - 1
+    gld_hold = np.prod(1 + path_returns[:, positions[:, None] + np.arange(HOLD_BARS), 2], axis=2) - 1
+    return np.where(ief_signal > 0, tqqq_hold, gld_hold)
+
+
+def path_statistics(trade_returns, years):
+    """
+    パスごとの CAGR・最大ドローダウン・総リターン
+
+    Args:
+        trade_returns (np.ndarray): (パス数, トレード数) のトレードリターン（小数）
+        years (float): 1パスの年数
+
+    Returns:
+        dict: {'cagr', 'max_drawdown', 'total_return'}（各 (パス数,) の % 配列）
+    """
+
+    equity = np.cumprod(1 + trade_returns, axis=1)
+    peak = np.maximum.accumulate(np.maximum(equity, 1.0), axis=1)
+    final = equity[:, -1]
+    return {
+        'cagr': (np.power(np.maximum(final, 0), 1 / years) - 1) * 100,
+        'max_drawdown': np.minimum((equity / peak - 1).min(axis=1), 0) * 100,
+        'total_return': (final - 1) * 100,
+    }
+
+
+def _simulate_chunk(returns, method, n_paths, horizon, block_size, seed_sequence):
+    """1チャンク分のパスを生成して統計を計算（プロセスプールのワーカー）"""
+    rng = np.random.default_rng(seed_sequence)
+    if method == 'block_bootstrap':
+        paths = block_bootstrap_returns(returns, n_paths, horizon, block_size, rng)
+    else:
+        paths = monte_carlo_returns(returns, n_paths, horizon, rng)
+    return path_statistics(simulate_strategy(paths), horizon / 12)
+
+
+def confidence_intervals(values, levels=DEFAULT_LEVELS):
+    """
+    分位点による信頼区間
+
+    Returns:
+        dict: {分位点: 値}
+    """
+
+    quantiles = np.quantile(values, levels)
+    return {float(level): float(q) for level, q in zip(levels, quantiles)}
+
+
+def run_robustness(price_matrix, method='block_bootstrap', n_paths=10000, horizon=None, block_size=6,
+                   seed=42, n_jobs=None, chunk_paths=2500, levels=DEFAULT_LEVELS):
+    """
+    ブートストラップ / モンテカルロで戦略の CAGR・最大ドローダウンの分布を推定
+
+    Args:
+        price_matrix (pd.DataFrame): 日付 × 銘柄（IEF, TQQQ, GLD）の始値行列
+        method (str): 'block_bootstrap' または 'monte_carlo'
+        n_paths (int): パス数
+        horizon (int): 1パスの月数（None の場合は過去データと同じ長さ）
+        block_size (int): ブートストラップのブロック長（月）
+        seed (int): 乱数シード（同じシード・チャンク分割なら同じ結果）
+        n_jobs (int): ワーカープロセス数（1 の場合は同一プロセスで実行、None は CPU 数）
+        chunk_paths (int): 1チャンクのパス数
+        levels (tuple): 信頼区間の分位点
+
+    Returns:
+        dict: {'cagr', 'max_drawdown', 'total_return'（各パスの % 配列）,
+               'summary'（指標 × 分位点の DataFrame）, 'historical'（過去パスの値）,
+               'elapsed'（秒）}
+    """
+
+    if method not in METHODS:
+        raise ValueError(f"未対応の手法: {method}")
+
+    started = time.perf_counter()
+    returns = monthly_returns(price_matrix)
+    if len(returns) < REBALANCE_INTERVAL + HOLD_BARS:
+        raise ValueError(f"データ期間が不足しています: {len(returns)}ヶ月")
+    horizon = horizon or len(returns)
+
+    chunk_sizes = [min(chunk_paths, n_paths - start) for start in range(0, n_paths, chunk_paths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    tasks = [(returns, method, size, horizon, block_size, s) for size, s in zip(chunk_sizes, seeds)]
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if n_jobs == 1 or len(tasks) == 1:
+        results = [_simulate_chunk(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks))) as executor:
+            results = list(executor.map(_simulate_chunk, *zip(*tasks)))
+
+    stats = {key: np.concatenate([r[key] for r in results]) for key in results[0]}
+
+    historical = path_statistics(simulate_strategy(returns[None, :, :]), len(returns) / 12)
+    summary = pd.DataFrame(
+        {key: confidence_intervals(values, levels) for key, values in stats.items()}
+    ).T
+    summary['historical'] = [float(historical[key][0]) for key in summary.index]
+
+    return {
+        **stats,
+        'summary': summary,
+        'historical': {key: float(values[0]) for key, values in historical.items()},
+        'elapsed': time.perf_counter() - started,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    from datetime import datetime
+
+    from momentum_core import build_price_matrix, get_monthly_data_for_backtest
+
+    parser = argparse.ArgumentParser(description="TQQQ/GLD 切替戦略のロバストネス検証")
+    parser.add_argument('--start', default='2011-01-01')
+    parser.add_argument('--method', choices=METHODS, default='block_bootstrap')
+    parser.add_argument('--paths', type=int, default=10000)
+    parser.add_argument('--block-size', type=int, default=6)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--jobs', type=int, default=None)
+    args = parser.parse_args()
+
+    data = get_monthly_data_for_backtest(datetime.strptime(args.start, '%Y-%m-%d'), datetime.now())
+    if data is None:
+        raise SystemExit("❌ データ取得に失敗しました")
+
+    result = run_robustness(
+        build_price_matrix(data), method=args.method, n_paths=args.paths,
+        block_size=args.block_size, seed=args.seed, n_jobs=args.jobs
+    )
+    print(f"\n🎲 {args.method}: {args.paths:,}パス ({result['elapsed']:.2f}秒)")
+    print(result['summary'].round(2).to_string())
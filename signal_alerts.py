@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+シグナル変更アラート（常駐プロセス）
+設定した全戦略の保有銘柄を定期的に判定し、銘柄が変わった戦略を通知先（sink）に送る
+
+1回の判定（tick）では全戦略の銘柄の和集合を1回だけ取得し、シグナルが同じ戦略をまとめて
+配列演算で判定する（数千設定でも1回の行列演算）。データバージョンが前回と同じなら判定自体を省略する。
+
+通知先:
+    stdout                                  標準出力
+    file:PATH                               JSON Lines で追記
+    webhook:URL                             JSON を POST（Slack 互換の text も付与）
+    email:HOST:PORT:FROM:TO[,TO...]         SMTP でメール送信
+
+使い方:
+    python signal_alerts.py --sink stdout --sink file:.alerts/alerts.jsonl --every 300
+    python signal_alerts.py --grid --once                  # 数千設定のグリッドを1回だけ判定
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import smtplib
+import time
+import urllib.request
+from datetime import datetime
+from email.message import EmailMessage
+
+import numpy as np
+import pandas as pd
+
+from cache_utils import hash_frame
+from signal_history import HISTORY_START, NO_HOLDING, strategy_id
+from signals import SIGNAL_REGISTRY, get_signal, signal_params, signal_threshold
+from strategy_compare import DEFAULT_STRATEGIES, STRATEGY_DEFAULTS, load_strategy_prices, normalize_strategy
+
+ALERT_DIR = os.environ.get('MOMENTUM_ALERT_DIR', '.alerts')
+TICK_SECONDS = 300
+
+
+# ---- 判定 ----
+
+def compile_strategies(strategies):
+    """
+    戦略定義を配列演算用にまとめる（判定のたびに繰り返さない前処理）
+
+    Returns:
+        dict: {'ids', 'names'（配列）, 'groups'（シグナルのキー → グループ番号）, 'group_of',
+               'intervals', 'on_code', 'off_code'（各戦略の配列）, 'symbols'（銘柄コード表）, 'strategies'}
+    """
+
+    specs = [normalize_strategy(strategy) for strategy in strategies]
+    groups = {}
+    symbols = {}
+    group_of = np.empty(len(specs), dtype=np.int64)
+    on_code = np.empty(len(specs), dtype=np.int64)
+    off_code = np.empty(len(specs), dtype=np.int64)
+    for i, spec in enumerate(specs):
+        params = tuple(sorted(signal_params(spec['signal'], **spec['signal_params']).items()))
+        group_of[i] = groups.setdefault((spec['signal'], params, spec['signal_symbol']), len(groups))
+        on_code[i] = symbols.setdefault(spec['risk_on'], len(symbols))
+        off_code[i] = symbols.setdefault(spec['risk_off'], len(symbols))
+
+    return {
+        'ids': np.array([strategy_id(spec) for spec in specs], dtype=object),
+        'names': np.array([spec['name'] for spec in specs], dtype=object),
+        'groups': groups,
+        'group_of': group_of,
+        'intervals': np.array([spec['interval'] for spec in specs], dtype=np.int64),
+        'on_code': on_code,
+        'off_code': off_code,
+        'symbols': np.array(list(symbols), dtype=object),
+        'strategies': specs,
+    }
+
+
+def evaluate_latest(price_matrix, compiled, data_version=None):
+    """
+    全戦略の現在の保有銘柄を一括判定
+
+    signal_history と同じ規則（バー位置 1 から interval ごとにリバランスし、
+    その時点のシグナルが閾値を超えていれば risk_on、それ以外は risk_off）で、
+    最後のリバランス時点の選択を現在の保有とする。
+
+    Args:
+        price_matrix (pd.DataFrame): 日付 × 銘柄の整列済み価格行列
+        compiled (dict): compile_strategies の結果
+        data_version: シグナルキャッシュ用のデータバージョン
+
+    Returns:
+        dict: {'held'（銘柄コード、保有なしは NO_HOLDING）, 'signal', 'rebalance_date'（各戦略の配列）}
+    """
+
+    n = len(price_matrix)
+    if data_version is None:
+        data_version = hash_frame(price_matrix)
+
+    # シグナルのグループ × バーの行列（同じシグナル・パラメータ・銘柄の戦略は1回だけ計算）
+    scores = np.empty((len(compiled['groups']), n))
+    thresholds = np.empty(len(compiled['groups']))
+    for (name, params, symbol), g in compiled['groups'].items():
+        scores[g] = get_signal(price_matrix, name, data_version=data_version, **dict(params))[symbol].to_numpy(
+            dtype=np.float64)
+        thresholds[g] = signal_threshold(name)
+
+    intervals = compiled['intervals']
+    last_rebalance = 1 + ((n - 2) // intervals) * intervals if n >= 2 else np.full(len(intervals), -1)
+    valid = last_rebalance >= 1
+    position = np.where(valid, last_rebalance, 0)
+
+    signal = scores[compiled['group_of'], position]
+    risk_on = signal > thresholds[compiled['group_of']]
+    held = np.where(valid, np.where(risk_on, compiled['on_code'], compiled['off_code']), NO_HOLDING)
+
+    dates = price_matrix.index.to_numpy()
+    return {
+        'held': held,
+        'signal': np.where(valid, signal, np.nan),
+        'rebalance_date': np.where(valid, dates[position], np.datetime64('NaT')),
+    }
+
+
+def detect_changes(compiled, previous_held, current):
+    """
+    前回から保有銘柄が変わった戦略の通知イベント
+
+    Args:
+        compiled (dict): compile_strategies の結果
+        previous_held (np.ndarray): 前回の保有銘柄コード（戦略順）
+        current (dict): evaluate_latest の結果
+
+    Returns:
+        list: [{'strategy', 'strategy_id', 'previous', 'current', 'signal', 'rebalance_date'}]
+    """
+
+    symbols = np.append(compiled['symbols'], None)  # NO_HOLDING (-1) は末尾の None
+    changed = np.flatnonzero(current['held'] != previous_held)
+    return [{
+        'strategy': compiled['names'][i],
+        'strategy_id': compiled['ids'][i],
+        'previous': symbols[previous_held[i]],
+        'current': symbols[current['held'][i]],
+        'signal': float(current['signal'][i]),
+        'rebalance_date': pd.Timestamp(current['rebalance_date'][i]).strftime('%Y-%m-%d'),
+    } for i in changed]
+
+
+# ---- 通知先 ----
+
+def format_event(event):
+    """通知イベントの1行表示"""
+    return (f"🔄 {event['strategy']}: {event['previous'] or 'なし'} → {event['current']} "
+            f"({event['rebalance_date']}, シグナル {event['signal']:+.2f})")
+
+
+def stdout_sink():
+    """標準出力に表示"""
+    def send(events):
+        for event in events:
+            print(format_event(event))
+    return send
+
+
+def file_sink(path):
+    """JSON Lines で追記（ローカルでの確認・他ツール連携用）"""
+    def send(events):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            for event in events:
+                f.write(json.dumps({'sent_at': datetime.now().isoformat(timespec='seconds'), **event},
+                                   ensure_ascii=False) + '\n')
+    return send
+
+
+def webhook_sink(url, timeout=10):
+    """JSON を POST（'text' は Slack の Incoming Webhook でそのまま表示される）"""
+    def send(events):
+        body = json.dumps({
+            'text': '\n'.join(format_event(event) for event in events),
+            'events': events,
+        }, ensure_ascii=False).encode('utf-8')
+        request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+    return send
+
+
+def email_sink(host, port, sender, recipients, username=None, password=None, use_tls=False):
+    """SMTP でメール送信（変更のあった戦略を1通にまとめる）"""
+    def send(events):
+        message = EmailMessage()
+        message['Subject'] = f"📈 ETF Momentum: {len(events)}戦略の推奨銘柄が変わりました"
+        message['From'] = sender
+        message['To'] = ', '.join(recipients)
+        message.set_content('\n'.join(format_event(event) for event in events))
+        with smtplib.SMTP(host, int(port), timeout=30) as smtp:
+            if use_tls:
+                smtp.starttls()
+            if username:
+                smtp.login(username, password)
+            smtp.send_message(message)
+    return send
+
+
+def memory_sink(store):
+    """リストに追加（テスト用）"""
+    return store.extend
+
+
+def parse_sink(spec):
+    """
+    通知先の指定文字列から通知関数を作成
+
+    Args:
+        spec (str): 'stdout' / 'file:PATH' / 'webhook:URL' / 'email:HOST:PORT:FROM:TO[,TO...]'
+    """
+
+    kind, _, target = spec.partition(':')
+    if kind == 'stdout':
+        return stdout_sink()
+    if kind == 'file' and target:
+        return file_sink(target)
+    if kind == 'webhook' and target:
+        return webhook_sink(target)
+    if kind == 'email' and target.count(':') == 3:
+        host, port, sender, recipients = target.split(':')
+        return email_sink(host, port, sender, recipients.split(','))
+    raise ValueError(f"通知先の指定が不正です: {spec}")
+
+
+# ---- 常駐プロセス ----
+
+class SignalMonitor:
+    """
+    全戦略の保有銘柄を監視し、変更を通知先に送る
+
+    状態（データバージョン・戦略ごとの保有銘柄）は state_dir に保存し、
+    再起動しても同じ変更を二重に通知しない。初回は現在の保有を記録するだけで通知しない。
+
+    Args:
+        strategies (list): 戦略定義
+        sinks (list): 通知関数（イベントのリストを受け取る）
+        state_dir (str): 状態の保存先
+        start_date (datetime): 価格データの開始日
+    """
+
+    def __init__(self, strategies, sinks, state_dir=None, start_date=HISTORY_START):
+        self.compiled = compile_strategies(strategies)
+        self.strategies = self.compiled['strategies']
+        self.sinks = list(sinks)
+        self.start_date = start_date
+        self.state_path = os.path.join(state_dir or ALERT_DIR, f"state_{self._config_digest()}.json")
+        self.data_version = None
+        self.held = None
+        self._load_state()
+
+    def _config_digest(self):
+        """戦略設定の組み合わせの識別子（設定ごとに状態ファイルを分ける）"""
+        return hashlib.sha1('\n'.join(self.compiled['ids']).encode('utf-8')).hexdigest()[:12]
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return
+        with open(self.state_path, encoding='utf-8') as f:
+            state = json.load(f)
+        codes = {symbol: i for i, symbol in enumerate(self.compiled['symbols'])}
+        self.data_version = state['data_version']
+        self.held = np.array([codes.get(symbol, NO_HOLDING) for symbol in state['held']], dtype=np.int64)
+
+    def _save_state(self):
+        symbols = np.append(self.compiled['symbols'], None)
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        temp_path = f"{self.state_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'data_version': self.data_version, 'held': symbols[self.held].tolist()}, f)
+        os.replace(temp_path, self.state_path)
+
+    def tick(self, price_matrix=None):
+        """
+        1回の判定
+
+        Args:
+            price_matrix (pd.DataFrame): 価格行列（None の場合は取得、共通キャッシュを使用）
+
+        Returns:
+            list: 送信した通知イベント（変更なし・データ更新なしは空）
+        """
+
+        if price_matrix is None:
+            price_matrix = load_strategy_prices(self.strategies, self.start_date, datetime.now())
+            if price_matrix is None:
+                print("⚠️ 価格データを取得できませんでした")
+                return []
+
+        data_version = hash_frame(price_matrix)
+        if data_version == self.data_version:
+            return []
+
+        current = evaluate_latest(price_matrix, self.compiled, data_version)
+        events = [] if self.held is None else detect_changes(self.compiled, self.held, current)
+        self.data_version = data_version
+        self.held = current['held']
+        self._save_state()
+
+        if events:
+            for sink in self.sinks:
+                try:
+                    sink(events)
+                except Exception as e:
+                    print(f"❌ 通知に失敗しました: {e}")
+        return events
+
+    def run(self, every=TICK_SECONDS, max_ticks=None):
+        """一定間隔で判定を繰り返す（Ctrl+C で終了）"""
+        print(f"👀 {len(self.strategies):,}戦略を監視中（{every}秒ごと）")
+        ticks = 0
+        try:
+            while max_ticks is None or ticks < max_ticks:
+                started = time.perf_counter()
+                events = self.tick()
+                ticks += 1
+                if events:
+                    print(f"📣 {len(events)}件の変更を通知 ({time.perf_counter() - started:.3f}秒)")
+                if max_ticks is None or ticks < max_ticks:
+                    time.sleep(every)
+        except KeyboardInterrupt:
+            print("\n👋 監視を終了しました")
+
+
+def strategy_grid(signals=None, signal_symbols=('IEF', 'TQQQ', 'GLD'), intervals=(1, 2, 3, 4, 6),
+                  pairs=(('TQQQ', 'GLD'), ('TQQQ', 'IEF'))):
+    """
+    パラメータの組み合わせから戦略定義を生成（大量設定の監視・負荷確認用）
+
+    Args:
+        signals (dict): {シグナル名: [パラメータ dict, ...]}（None の場合は各シグナルの既定範囲）
+        signal_symbols (tuple): シグナルを判定する銘柄
+        intervals (tuple): リバランス間隔（保有バー数は既定値と間隔の小さい方）
+        pairs (tuple): (risk_on, risk_off) の組み合わせ
+
+    Returns:
+        list: 戦略定義
+    """
+
+    if signals is None:
+        signals = {
+            'momentum': [{'lookback': n} for n in range(1, 13)],
+            'sma_crossover': [{'fast': f, 'slow': s} for f in range(2, 7) for s in range(8, 16, 2)],
+            'rsi': [{'period': p} for p in (6, 10, 14)],
+            'vol_scaled_momentum': [{'lookback': n, 'vol_window': 6} for n in (1, 3, 6)],
+        }
+    strategies = []
+    for (name, param_list), symbol, interval, (risk_on, risk_off) in itertools.product(
+            signals.items(), signal_symbols, intervals, pairs):
+        if name not in SIGNAL_REGISTRY:
+            raise ValueError(f"未登録のシグナル: {name}")
+        for params in param_list:
+            label = ','.join(f"{k}={v}" for k, v in params.items())
+            strategies.append({
+                'name': f"{name}({label}) {symbol} {risk_on}/{risk_off} {interval}M",
+                'signal': name, 'signal_params': params, 'signal_symbol': symbol,
+                'risk_on': risk_on, 'risk_off': risk_off, 'interval': interval,
+                'hold': min(STRATEGY_DEFAULTS['hold'], interval),
+            })
+    return strategies
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="シグナル変更アラート")
+    parser.add_argument('--sink', action='append', default=[], help="通知先（複数指定可、既定 stdout）")
+    parser.add_argument('--strategies', help="戦略定義の JSON ファイル（戦略 dict のリスト）")
+    parser.add_argument('--grid', action='store_true', help="パラメータグリッドの全戦略を監視")
+    parser.add_argument('--every', type=int, default=TICK_SECONDS, help="判定間隔（秒）")
+    parser.add_argument('--once', action='store_true', help="1回だけ判定して終了")
+    args = parser.parse_args()
+
+    if args.strategies:
+        with open(args.strategies, encoding='utf-8') as f:
+            strategies = json.load(f)
+    elif args.grid:
+        strategies = strategy_grid()
+    else:
+        strategies = DEFAULT_STRATEGIES
+
+    monitor = SignalMonitor(strategies, [parse_sink(spec) for spec in args.sink or ['stdout']])
+    monitor.run(every=args.every, max_ticks=1 if args.once else None)
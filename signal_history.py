@@ -0,0 +1,281 @@
+"""
+シグナル・銘柄選択履歴
+戦略設定ごとに、月次バーの日付・シグナル値・選択銘柄・保有銘柄・売買アクションを
+日付昇順の列配列として保存し、「指定日時点の推奨」を二分探索で即座に返す
+
+履歴は画面の表示期間に関係なく HISTORY_START からの全期間の価格行列（history_prices）で作るため、
+同じ戦略設定なら誰がいつ更新してもリバランス月と判定結果は同じになる。
+
+保存形式（store_dir 以下）:
+    {設定ID}.parquet  列: date, signal, selected, held, is_rebalance, switched
+                      メタデータ: 戦略設定（JSON）、銘柄コード表、データバージョン
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from alignment_utils import locate_range
+from cache_utils import BoundedCache, hash_frame
+from rebalance_schedule import bar_rebalance_positions
+from signals import get_signal, signal_threshold
+from strategy_compare import DEFAULT_STRATEGIES, load_strategy_prices, normalize_strategy
+
+HISTORY_DIR = os.environ.get('MOMENTUM_HISTORY_DIR', '.signal_history')
+HISTORY_COLUMNS = ('date', 'signal', 'selected', 'held', 'is_rebalance', 'switched')
+NO_HOLDING = -1
+HISTORY_START = datetime(2010, 3, 1)  # TQQQ の上場月（全戦略の履歴の起点）
+
+# 設定ID → (データバージョン, 履歴)
+_HISTORY_CACHE_MAX_ENTRIES = 64
+_HISTORY_CACHE = BoundedCache('signal_history', max_entries=_HISTORY_CACHE_MAX_ENTRIES)
+
+
+def strategy_id(strategy):
+    """戦略設定の識別子（既定値補完後の設定の内容ハッシュ）"""
+    spec = normalize_strategy(strategy)
+    spec.pop('name', None)
+    payload = json.dumps(spec, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def build_signal_history(price_matrix, strategy):
+    """
+    価格行列から1戦略の履歴を作成
+
+    各月次バーについて、その時点のシグナル値と（その日にリバランスした場合の）選択銘柄、
+    実際に保有している銘柄を配列演算でまとめて計算する。
+
+    Args:
+        price_matrix (pd.DataFrame): 日付 × 銘柄の整列済み価格行列
+        strategy (dict): 戦略定義（strategy_compare と同じ形式）
+
+    Returns:
+        dict: {'date', 'signal', 'selected', 'held', 'is_rebalance', 'switched'（各配列）,
+               'symbols'（コード → 銘柄）, 'strategy'（戦略設定）}
+    """
+
+    strategy = normalize_strategy(strategy)
+    n = len(price_matrix)
+
+    signal = get_signal(
+        price_matrix, strategy['signal'], **strategy['signal_params']
+    )[strategy['signal_symbol']].to_numpy(dtype=np.float64)
+
+    # 0: risk_on, 1: risk_off（NaN は risk_off）
+    selected = np.where(signal > signal_threshold(strategy['signal']), 0, 1).astype(np.int8)
+
+    # 保有終了を待たずに判定できる全リバランス位置
+    rebalance_pos = bar_rebalance_positions(n, interval=strategy['interval'], first=1, hold=0)
+    is_rebalance = np.zeros(n, dtype=bool)
+    is_rebalance[rebalance_pos] = True
+
+    # 直近のリバランスで選択した銘柄を保有（最初のリバランス前は保有なし）
+    last_rebalance = np.maximum.accumulate(np.where(is_rebalance, np.arange(n), -1))
+    held = np.where(last_rebalance >= 0, selected[np.maximum(last_rebalance, 0)], NO_HOLDING).astype(np.int8)
+
+    previous_held = np.concatenate(([NO_HOLDING], held[:-1])).astype(np.int8)
+    switched = is_rebalance & (held != previous_held)
+
+    return {
+        'date': price_matrix.index.to_numpy().astype('datetime64[ns]'),
+        'signal': signal,
+        'selected': selected,
+        'held': held,
+        'is_rebalance': is_rebalance,
+        'switched': switched,
+        'symbols': (strategy['risk_on'], strategy['risk_off']),
+        'strategy': strategy,
+    }
+
+
+def _record(history, i):
+    """履歴の i 行目を辞書で返す"""
+    symbols = history['symbols']
+    held = int(history['held'][i])
+    return {
+        'date': pd.Timestamp(history['date'][i]),
+        'signal': float(history['signal'][i]),
+        'selected_etf': symbols[history['selected'][i]],
+        'held_etf': symbols[held] if held != NO_HOLDING else None,
+        'is_rebalance': bool(history['is_rebalance'][i]),
+        'switched': bool(history['switched'][i]),
+    }
+
+
+def asof(history, when):
+    """
+    指定日時点の履歴（指定日以前で最後の月次バー）を二分探索で取得
+
+    Args:
+        history (dict): build_signal_history の結果
+        when (datetime): 指定日
+
+    Returns:
+        dict: {'date', 'signal', 'selected_etf', 'held_etf', 'is_rebalance', 'switched'}
+              または None（履歴より前）
+    """
+
+    i = np.searchsorted(history['date'], np.datetime64(pd.Timestamp(when), 'ns'), side='right') - 1
+    if i < 0:
+        return None
+    return _record(history, i)
+
+
+def slice_history(history, start=None, end=None):
+    """
+    期間 [start, end] の履歴を配列のスライス（コピーなし）で返す
+
+    Returns:
+        dict: build_signal_history と同じ形式
+    """
+
+    lo, hi = locate_range(history['date'], start, end, closed='both')
+    sliced = {column: history[column][lo:hi] for column in HISTORY_COLUMNS}
+    sliced['symbols'] = history['symbols']
+    sliced['strategy'] = history['strategy']
+    return sliced
+
+
+def history_to_frame(history):
+    """履歴を表示用の DataFrame に変換"""
+    symbols = np.array(history['symbols'] + ('',), dtype=object)
+    return pd.DataFrame({
+        'date': pd.DatetimeIndex(history['date']),
+        'signal': history['signal'],
+        'selected_etf': symbols[history['selected']],
+        'held_etf': symbols[history['held']],  # NO_HOLDING (-1) は末尾の ''
+        'is_rebalance': history['is_rebalance'],
+        'switched': history['switched'],
+    })
+
+
+def _history_path(config_id, store_dir=None):
+    return os.path.join(store_dir or HISTORY_DIR, f"{config_id}.parquet")
+
+
+def save_history(history, data_version, store_dir=None):
+    """
+    履歴を Parquet に保存（戦略設定・銘柄・データバージョンはメタデータ）
+
+    Returns:
+        str: 保存先パス
+    """
+
+    config_id = strategy_id(history['strategy'])
+    path = _history_path(config_id, store_dir)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    table = pa.table({column: history[column] for column in HISTORY_COLUMNS})
+    table = table.replace_schema_metadata({
+        'strategy': json.dumps(history['strategy'], ensure_ascii=False),
+        'symbols': json.dumps(list(history['symbols'])),
+        'data_version': str(data_version),
+    })
+    # 一時ファイルに書いてから置き換え（同時に読み込む他のセッションが書きかけを読まないように）
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    pq.write_table(table, temp_path, compression='zstd')
+    os.replace(temp_path, path)
+    return path
+
+
+def load_history(strategy, store_dir=None):
+    """
+    保存済みの履歴を読み込む
+
+    Returns:
+        tuple: (履歴, データバージョン) または None（未保存）
+    """
+
+    path = _history_path(strategy_id(strategy), store_dir)
+    if not os.path.exists(path):
+        return None
+
+    # 1つのファイルハンドルで読む（読み込み中に save_history が置き換えても同じ内容を読む）
+    with open(path, 'rb') as f:
+        table = pq.read_table(f)
+    metadata = table.schema.metadata or {}
+    history = {column: table.column(column).to_numpy() for column in HISTORY_COLUMNS}
+    history['date'] = history['date'].astype('datetime64[ns]')
+    history['symbols'] = tuple(json.loads(metadata[b'symbols']))
+    history['strategy'] = json.loads(metadata[b'strategy'])
+    return history, metadata.get(b'data_version', b'').decode('utf-8')
+
+
+def history_prices(strategy, end_date=None):
+    """
+    履歴用の価格行列（戦略の銘柄のみ、HISTORY_START から end_date まで、既定の価格方式）
+
+    Returns:
+        pd.DataFrame: 日付 × 銘柄の整列済み価格行列 または None（取得失敗）
+    """
+
+    return load_strategy_prices([strategy], HISTORY_START, end_date or datetime.now())
+
+
+def get_signal_history(strategy, price_matrix=None, data_version=None, store_dir=None):
+    """
+    戦略の履歴を取得（メモリ → 保存ファイル → 再計算の順）
+
+    価格行列を渡した場合はデータバージョンが一致しなければ再計算して保存する。
+    渡さない場合は保存済みの履歴をそのまま返す（ネットワークアクセスなし）。
+    価格行列は history_prices の結果（全期間）を渡すこと。表示期間の価格行列を渡すと
+    保存済みの全期間の履歴がその期間の履歴で置き換わる。
+
+    Args:
+        strategy (dict): 戦略定義
+        price_matrix (pd.DataFrame): history_prices の価格行列（None の場合は保存済みのみ）
+        data_version (str): データバージョン（None の場合は価格行列の内容ハッシュ）
+        store_dir (str): 保存先ディレクトリ
+
+    Returns:
+        dict: build_signal_history と同じ形式 または None
+    """
+
+    config_id = strategy_id(strategy)
+    if price_matrix is not None and data_version is None:
+        data_version = hash_frame(price_matrix)
+
+    cached = _HISTORY_CACHE.get(config_id)
+    if cached is not None and (data_version is None or cached[0] == data_version):
+        return cached[1]
+
+    loaded = load_history(strategy, store_dir)
+    if loaded is not None and (data_version is None or loaded[1] == data_version):
+        history, data_version = loaded
+    elif price_matrix is not None:
+        history = build_signal_history(price_matrix, strategy)
+        save_history(history, data_version, store_dir)
+    else:
+        return None
+
+    _HISTORY_CACHE.put(config_id, (data_version, history))
+    return history
+
+
+def update_tracked_histories(strategies=None, end_date=None, store_dir=None):
+    """
+    追跡中の全戦略の履歴を全期間の価格行列で更新（取得に失敗した戦略は保存済みの履歴）
+
+    Returns:
+        dict: {戦略名: 履歴}
+    """
+
+    return {
+        normalize_strategy(strategy)['name']: get_signal_history(
+            strategy, history_prices(strategy, end_date), store_dir=store_dir
+        )
+        for strategy in (strategies or DEFAULT_STRATEGIES)
+    }
+
+
+def clear_history_cache():
+    """履歴のメモリキャッシュをクリア（保存ファイルは残す）"""
+    _HISTORY_CACHE.clear()
@@ -0,0 +1,189 @@
+"""
+シグナルレジストリ
+整列済み価格行列（日付 × 銘柄）全体に対して各シグナルを一括計算する
+（シグナル名・パラメータ・データバージョンごとにメモ化）
+
+登録済みシグナル:
+    momentum              nヶ月モメンタム（%）
+    sma_crossover         短期SMA / 長期SMA - 1（%）
+    rsi                   RSI（Wilder平滑化、0〜100）
+    dual_momentum         無リスク資産代替銘柄に対する超過モメンタム（%）
+    vol_scaled_momentum   モメンタム / 期間リターンの標準偏差
+"""
+
+import numpy as np
+import pandas as pd
+
+from cache_utils import BoundedCache, hash_frame
+
+# シグナル名 → {'func': 計算関数, 'defaults': 既定パラメータ, 'threshold': 強気判定の閾値, 'label': 表示名}
+SIGNAL_REGISTRY = {}
+
+# (シグナル名, パラメータ, データバージョン) → シグナル行列
+_SIGNAL_CACHE_MAX_ENTRIES = 128
+_SIGNAL_CACHE = BoundedCache('signals', max_entries=_SIGNAL_CACHE_MAX_ENTRIES)
+
+
+def register_signal(name, threshold=0.0, label=None, **defaults):
+    """
+    シグナル計算関数をレジストリに登録するデコレータ
+
+    計算関数は (prices, **params) を受け取り、prices と同じ形の DataFrame を返す。
+
+    Args:
+        name (str): シグナル名
+        threshold (float): この値を超えたら強気と判定する閾値
+        label (str): 表示名
+        **defaults: 既定パラメータ
+    """
+
+    def decorator(func):
+        SIGNAL_REGISTRY[name] = {
+            'func': func,
+            'defaults': defaults,
+            'threshold': threshold,
+            'label': label or name,
+        }
+        return func
+
+    return decorator
+
+
+def _momentum(prices, lookback):
+    """lookback 期間前からのリターン（%）"""
+    past = prices.shift(lookback)
+    return (prices - past) / past * 100
+
+
+@register_signal('momentum', label='モメンタム', lookback=1)
+def momentum_signal(prices, lookback=1):
+    """nヶ月モメンタム（lookback=1 は従来のIEF前月比と同じ値）"""
+    return _momentum(prices, lookback)
+
+
+@register_signal('sma_crossover', label='SMAクロス', fast=3, slow=10)
+def sma_crossover_signal(prices, fast=3, slow=10):
+    """短期SMAの長期SMAに対する乖離率（%）"""
+    fast_sma = prices.rolling(fast, min_periods=fast).mean()
+    slow_sma = prices.rolling(slow, min_periods=slow).mean()
+    return (fast_sma / slow_sma - 1) * 100
+
+
+@register_signal('rsi', threshold=50.0, label='RSI', period=14)
+def rsi_signal(prices, period=14):
+    """RSI（Wilder平滑化）"""
+    change = prices.diff()
+    gain = change.clip(lower=0).ewm(alpha=1 / period, min_periods=period, adjust=False).mean()
+    loss = (-change.clip(upper=0)).ewm(alpha=1 / period, min_periods=period, adjust=False).mean()
+    rsi = 100 - 100 / (1 + gain / loss)
+    # 下落が無い期間は 100
+    return rsi.where(loss != 0, 100.0).where(gain.notna())
+
+
+@register_signal('dual_momentum', label='デュアルモメンタム', lookback=12, benchmark='IEF')
+def dual_momentum_signal(prices, lookback=12, benchmark='IEF'):
+    """各銘柄のモメンタムから基準銘柄のモメンタムを引いた超過モメンタム（%）"""
+    mom = _momentum(prices, lookback)
+    if benchmark not in mom.columns:
+        raise ValueError(f"基準銘柄 {benchmark} が価格行列にありません")
+    return mom.sub(mom[benchmark], axis=0)
+
+
+@register_signal('vol_scaled_momentum', label='ボラティリティ調整モメンタム', lookback=3, vol_window=6)
+def vol_scaled_momentum_signal(prices, lookback=3, vol_window=6):
+    """モメンタムを期間リターンの標準偏差で割った値"""
+    period_return = prices.pct_change(fill_method=None) * 100
+    volatility = period_return.rolling(vol_window, min_periods=vol_window).std()
+    return _momentum(prices, lookback) / volatility.replace(0, np.nan)
+
+
+def signal_params(name, **params):
+    """既定値を補完したパラメータ（未知のパラメータは ValueError）"""
+    if name not in SIGNAL_REGISTRY:
+        raise ValueError(f"未登録のシグナル: {name}")
+    defaults = SIGNAL_REGISTRY[name]['defaults']
+    unknown = set(params) - set(defaults)
+    if unknown:
+        raise ValueError(f"{name} の未対応パラメータ: {sorted(unknown)}")
+    return {**defaults, **params}
+
+
+def compute_signal(prices, name, **params):
+    """
+    シグナルを計算（メモ化なし）
+
+    Args:
+        prices (pd.DataFrame): 日付 × 銘柄の整列済み価格行列
+        name (str): シグナル名
+        **params: シグナルのパラメータ
+
+    Returns:
+        pd.DataFrame: 日付 × 銘柄のシグナル値（計算に必要な期間が無い行は NaN）
+    """
+
+    params = signal_params(name, **params)
+    return SIGNAL_REGISTRY[name]['func'](prices.astype(np.float64), **params)
+
+
+def get_signal(prices, name, data_version=None, **params):
+    """
+    シグナルを取得（シグナル名・パラメータ・データバージョンごとにメモ化）
+
+    Args:
+        prices (pd.DataFrame): 日付 × 銘柄の整列済み価格行列
+        name (str): シグナル名
+        data_version: データバージョン（None の場合は価格行列の内容ハッシュ）
+        **params: シグナルのパラメータ
+
+    Returns:
+        pd.DataFrame: 日付 × 銘柄のシグナル値（共有されるため変更しないこと）
+    """
+
+    params = signal_params(name, **params)
+    if data_version is None:
+        data_version = hash_frame(prices)
+    key = (name, tuple(sorted(params.items())), data_version)
+
+    cached = _SIGNAL_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    result = SIGNAL_REGISTRY[name]['func'](prices.astype(np.float64), **params)
+    _SIGNAL_CACHE.put(key, result)
+    return result
+
+
+def get_signals(prices, specs, data_version=None):
+    """
+    複数シグナルをまとめて取得（データバージョンの計算は1回のみ）
+
+    Args:
+        prices (pd.DataFrame): 日付 × 銘柄の整列済み価格行列
+        specs (dict): {キー: (シグナル名, パラメータ dict)}
+        data_version: データバージョン（None の場合は価格行列の内容ハッシュ）
+
+    Returns:
+        dict: {キー: シグナル DataFrame}
+    """
+
+    if data_version is None:
+        data_version = hash_frame(prices)
+    return {
+        key: get_signal(prices, name, data_version=data_version, **(params or {}))
+        for key, (name, params) in specs.items()
+    }
+
+
+def signal_threshold(name):
+    """シグナルの強気判定閾値"""
+    return SIGNAL_REGISTRY[name]['threshold']
+
+
+def list_signals():
+    """登録済みシグナルの一覧 {名前: 表示名}"""
+    return {name: entry['label'] for name, entry in SIGNAL_REGISTRY.items()}
+
+
+def clear_signal_cache():
+    """シグナルのメモ化をクリア"""
+    _SIGNAL_CACHE.clear()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+モバイル向けスナップショット
+最新シグナル・直近のトレード・統計サマリーだけを小さな JSON にまとめる。
+iPhone（Pythonista）側は pandas / yfinance を使わず、このファイルを読んで表示するだけにする。
+
+配布方法:
+    GET /snapshot（api_server.py、ETag による条件付きGET）
+    python snapshot.py --out ~/iCloud/momentum_snapshot.json   共有フォルダへの書き出し
+
+内容はデータが変わらない限り同じバイト列になる（生成時刻を含めない）ため、
+ETag・ファイルの更新判定にそのまま使える。
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from momentum_core import latest_signal, run_backtest
+from trade_log import decode_symbols, format_actions, summarize_trade_log, switch_mask
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_START = datetime(2020, 1, 1)  # app.py の既定の開始日
+RECENT_TRADES = 8
+TRADE_COLUMNS = ('start', 'end', 'etf', 'action', 'return_pct')
+DEFAULT_SNAPSHOT_PATH = os.environ.get('MOMENTUM_SNAPSHOT_PATH', os.path.join('.snapshot', 'momentum_snapshot.json'))
+
+DATE_FORMAT = '%Y-%m-%d'
+
+
+def _day(values):
+    """int64 ナノ秒の日付配列を 'YYYY-MM-DD' 文字列の配列に変換"""
+    return values.astype('datetime64[ns]').astype('datetime64[D]').astype(str)
+
+
+def _round(summary, digits=2):
+    return {key: round(value, digits) if isinstance(value, float) else value for key, value in summary.items()}
+
+
+def build_snapshot(start_date=SNAPSHOT_START, end_date=None, recent_trades=RECENT_TRADES):
+    """
+    スナップショットを作成
+
+    Args:
+        start_date: バックテスト開始日
+        end_date: 終了日（None の場合は本日）
+        recent_trades (int): 含める直近トレード数
+
+    Returns:
+        dict: JSON 化できるスナップショット（データ不足時は RuntimeError）
+    """
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    end_date = end_date or today
+
+    signal = latest_signal(end_date + timedelta(days=1), lookback_days=91)
+    if signal is None:
+        raise RuntimeError("IEFデータが不足しています")
+    result = run_backtest(start_date, end_date)
+    if result is None:
+        raise RuntimeError("バックテストのデータ取得に失敗しました")
+
+    log = result.trade_log
+    recent = log[-recent_trades:] if recent_trades else log[:0]
+    trades = [
+        [start, end, etf, action, round(float(ret), 2)]
+        for start, end, etf, action, ret in zip(
+            _day(recent['hold_start']), _day(recent['hold_end']),
+            decode_symbols(recent['etf']), format_actions(recent), recent['return_pct'])
+    ]
+    # 現在の保有銘柄に切り替えたリバランス日
+    switches = np.flatnonzero(switch_mask(log))
+    holding_since = _day(log['hold_start'][switches[-1:]])
+
+    return {
+        'v': SNAPSHOT_VERSION,
+        'as_of': result.price_matrix.index[-1].strftime(DATE_FORMAT),
+        'period': [result.price_matrix.index[0].strftime(DATE_FORMAT), end_date.strftime(DATE_FORMAT)],
+        'signal': {
+            'etf': signal.recommended_etf,
+            'ief_return': round(signal.ief_return, 2),
+            'start': signal.period_start.strftime(DATE_FORMAT),
+            'end': signal.period_end.strftime(DATE_FORMAT),
+        },
+        'holding': {
+            'etf': str(decode_symbols(log['etf'][-1:])[0]) if len(log) else None,
+            'since': str(holding_since[0]) if len(holding_since) else None,
+        },
+        'summary': _round(summarize_trade_log(log)),
+        'trade_columns': list(TRADE_COLUMNS),
+        'trades': trades,
+    }
+
+
+def encode_snapshot(snapshot):
+    """スナップショットを最小の JSON バイト列に変換"""
+    return json.dumps(snapshot, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def snapshot_etag(body):
+    """JSON バイト列の ETag"""
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+def write_snapshot(path=None, snapshot=None):
+    """
+    スナップショットを共有ファイルに書き出す（内容が同じなら書き換えない）
+
+    Returns:
+        tuple: (保存先パス, 書き換えたかどうか)
+    """
+
+    path = path or DEFAULT_SNAPSHOT_PATH
+    body = encode_snapshot(snapshot if snapshot is not None else build_snapshot())
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == body:
+                return path, False
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # 一時ファイルに書いてから置き換え（同期中のクライアントが書きかけを読まないように）
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(body)
+    os.replace(temp_path, path)
+    return path, True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="モバイル向けスナップショットの作成")
+    parser.add_argument('--out', default=None, help=f"出力先（既定: {DEFAULT_SNAPSHOT_PATH}）")
+    parser.add_argument('--start', default=SNAPSHOT_START.strftime(DATE_FORMAT), help="バックテスト開始日 (YYYY-MM-DD)")
+    parser.add_argument('--trades', type=int, default=RECENT_TRADES, help="含める直近トレード数")
+    parser.add_argument('--print', action='store_true', help="ファイルに書かず標準出力に表示")
+    args = parser.parse_args()
+
+    start_date = datetime.strptime(args.start, DATE_FORMAT)
+    # データ取得の進捗表示は標準エラーへ（--print の JSON と混ざらないように）
+    with contextlib.redirect_stdout(sys.stderr):
+        snapshot = build_snapshot(start_date, recent_trades=args.trades)
+    if args.print:
+        print(json.dumps(snapshot, ensure_ascii=False, indent=1))
+        return
+
+    path, changed = write_snapshot(args.out, snapshot)
+    size = os.path.getsize(path)
+    print(f"{'✅ 更新' if changed else '⏸️ 変更なし'}: {path} ({size:,} バイト)")
+
+
+if __name__ == "__main__":
+    main()
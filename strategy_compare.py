@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+複数戦略の一括比較
+N個の戦略定義で使う銘柄の和集合を1回だけ取得・整列し、
+全戦略を同じ価格行列・共有シグナルで評価して統計表と累積リターン曲線を返す
+
+戦略定義（dict）:
+    name           表示名
+    signal         シグナル名（signals.SIGNAL_REGISTRY、既定 'momentum'）
+    signal_params  シグナルのパラメータ
+    signal_symbol  シグナルを判定する銘柄（既定 'IEF'）
+    risk_on        シグナルが閾値を超えたときの保有銘柄（既定 'TQQQ'）
+    risk_off       それ以外の保有銘柄（既定 'GLD'）
+    interval       リバランス間隔（バー数、既定 3）
+    hold           保有バー数（既定 2 = compute_trade_log と同じ、interval 以下）
+"""
+
+import numpy as np
+import pandas as pd
+
+from alignment_utils import alignment_to_frame, build_alignment
+from cache_utils import hash_frame
+from momentum_core import get_monthly_data_for_backtest
+from rebalance_schedule import bar_rebalance_positions
+from signals import get_signal, signal_params, signal_threshold
+
+STRATEGY_DEFAULTS = {
+    'signal': 'momentum',
+    'signal_params': {},
+    'signal_symbol': 'IEF',
+    'risk_on': 'TQQQ',
+    'risk_off': 'GLD',
+    'interval': 3,
+    'hold': 2,
+}
+
+# 既定の比較対象（従来戦略とシグナル違いのバリエーション）
+DEFAULT_STRATEGIES = [
+    {'name': 'IEF 1ヶ月モメンタム'},
+    {'name': 'IEF 3ヶ月モメンタム', 'signal_params': {'lookback': 3}},
+    {'name': 'IEF SMAクロス', 'signal': 'sma_crossover'},
+    {'name': 'IEF RSI', 'signal': 'rsi', 'signal_params': {'period': 6}},
+    {'name': 'TQQQ デュアルモメンタム', 'signal': 'dual_momentum', 'signal_symbol': 'TQQQ'},
+    {'name': 'TQQQ ボラ調整モメンタム', 'signal': 'vol_scaled_momentum', 'signal_symbol': 'TQQQ'},
+]
+
+
+def normalize_strategy(strategy):
+    """既定値を補完した戦略定義（未知のキー・保有期間が重なる設定は ValueError）"""
+    unknown = set(strategy) - set(STRATEGY_DEFAULTS) - {'name'}
+    if unknown:
+        raise ValueError(f"未対応の戦略パラメータ: {sorted(unknown)}")
+    normalized = {**STRATEGY_DEFAULTS, **strategy}
+    # 保有期間が次のリバランスと重なるとリターンを二重に複利計算してしまう
+    if not 1 <= normalized['hold'] <= normalized['interval']:
+        raise ValueError(f"hold は 1 以上 interval 以下にしてください: "
+                         f"hold={normalized['hold']}, interval={normalized['interval']}")
+    normalized.setdefault('name', f"{normalized['signal']}_{normalized['signal_symbol']}")
+    return normalized
+
+
+def strategy_symbols(strategies):
+    """全戦略で使う銘柄の和集合（出現順）"""
+    symbols = []
+    for strategy in map(normalize_strategy, strategies):
+        for key in ('signal_symbol', 'risk_on', 'risk_off'):
+            if strategy[key] not in symbols:
+                symbols.append(strategy[key])
+        benchmark = signal_params(strategy['signal'], **strategy['signal_params']).get('benchmark')
+        if benchmark and benchmark not in symbols:
+            symbols.append(benchmark)
+    return symbols
+
+
+def load_strategy_prices(strategies, start_date, end_date, return_mode=None, field='Open'):
+    """
+    全戦略の銘柄の和集合を1回取得して整列した価格行列を作成
+
+    Returns:
+        pd.DataFrame: 日付 × 銘柄の価格行列 または None（取得失敗）
+    """
+
+    data = get_monthly_data_for_backtest(
+        start_date, end_date, return_mode=return_mode, symbols=strategy_symbols(strategies)
+    )
+    if data is None:
+        return None
+    return alignment_to_frame(build_alignment(data, field))
+
+
+def evaluate_strategy(price_matrix, strategy, data_version=None):
+    """
+    1戦略のトレードを配列演算で計算
+
+    Args:
+        price_matrix (pd.DataFrame): 日付 × 銘柄の整列済み価格行列
+        strategy (dict): 戦略定義
+        data_version: シグナルキャッシュ用のデータバージョン
+
+    Returns:
+        dict: {'hold_start', 'hold_end'（日付配列）, 'return_pct', 'risk_on'（bool 配列）}
+    """
+
+    strategy = normalize_strategy(strategy)
+    n = len(price_matrix)
+    hold = strategy['hold']
+    positions = bar_rebalance_positions(n, interval=strategy['interval'], first=1, hold=hold)
+    end_positions = positions + hold
+
+    scores = get_signal(
+        price_matrix, strategy['signal'], data_version=data_version, **strategy['signal_params']
+    )[strategy['signal_symbol']].to_numpy()
+    risk_on = scores[positions] > signal_threshold(strategy['signal'])
+
+    on_prices = price_matrix[strategy['risk_on']].to_numpy(dtype=np.float64)
+    off_prices = price_matrix[strategy['risk_off']].to_numpy(dtype=np.float64)
+    start_price = np.where(risk_on, on_prices[positions], off_prices[positions])
+    end_price = np.where(risk_on, on_prices[end_positions], off_prices[end_positions])
+
+    dates = price_matrix.index.to_numpy()
+    return {
+        'hold_start': dates[positions],
+        'hold_end': dates[end_positions],
+        'return_pct': (end_price - start_price) / start_price * 100,
+        'risk_on': risk_on,
+    }
+
+
+def _strategy_stats(result):
+    """戦略の統計（%）"""
+    returns = result['return_pct']
+    if len(returns) == 0:
+        return {'trades': 0}
+
+    equity = np.cumprod(1 + returns / 100)
+    peak = np.maximum.accumulate(np.maximum(equity, 1.0))
+    days = (result['hold_end'][-1] - result['hold_start'][0]) / np.timedelta64(1, 'D')
+    years = max(float(days) / 365.25, 1e-9)
+    switches = int(np.count_nonzero(result['risk_on'][1:] != result['risk_on'][:-1]))
+
+    return {
+        'trades': int(len(returns)),
+        'total_return': float((equity[-1] - 1) * 100),
+        'cagr': float((max(equity[-1], 0) ** (1 / years) - 1) * 100),
+        'avg_return': float(returns.mean()),
+        'win_rate': float((returns > 0).mean() * 100),
+        'max_drawdown': float(min((equity / peak - 1).min(), 0) * 100),
+        'switches': switches,
+    }
+
+
+def evaluate_strategies(price_matrix, strategies=None):
+    """
+    複数戦略を同じ価格行列で一括評価
+
+    データバージョンは1回だけ計算し、同じシグナル・パラメータの戦略間でシグナル行列を共有する。
+
+    Args:
+        price_matrix (pd.DataFrame): 日付 × 銘柄の整列済み価格行列
+        strategies (list): 戦略定義のリスト（None の場合は DEFAULT_STRATEGIES）
+
+    Returns:
+        dict: {'stats': 戦略 × 指標の DataFrame,
+               'curves': 日付 × 戦略の累積リターン（倍率、初日=1.0、保有終了日で更新）}
+    """
+
+    strategies = [normalize_strategy(s) for s in (strategies or DEFAULT_STRATEGIES)]
+    names = [s['name'] for s in strategies]
+    if len(set(names)) != len(names):
+        raise ValueError("戦略名が重複しています")
+
+    data_version = hash_frame(price_matrix)
+    stats = {}
+    curves = {}
+    for strategy in strategies:
+        result = evaluate_strategy(price_matrix, strategy, data_version=data_version)
+        stats[strategy['name']] = _strategy_stats(result)
+        if len(result['return_pct']):
+            curves[strategy['name']] = pd.Series(
+                np.concatenate(([1.0], np.cumprod(1 + result['return_pct'] / 100))),
+                index=pd.DatetimeIndex(np.concatenate((result['hold_start'][:1], result['hold_end'])))
+            )
+
+    curve_frame = pd.DataFrame(curves).sort_index().ffill() if curves else pd.DataFrame()
+    return {
+        'stats': pd.DataFrame.from_dict(stats, orient='index'),
+        'curves': curve_frame,
+    }
+
+
+def compare_strategies(strategies, start_date, end_date, return_mode=None):
+    """
+    戦略定義のリストを1回のデータ取得で比較
+
+    Args:
+        strategies (list): 戦略定義のリスト
+        start_date (datetime): 開始日
+        end_date (datetime): 終了日
+        return_mode (str): get_monthly_data_for_backtest と同じ
+
+    Returns:
+        dict: evaluate_strategies の結果に 'price_matrix' を加えたもの または None
+    """
+
+    price_matrix = load_strategy_prices(strategies, start_date, end_date, return_mode)
+    if price_matrix is None or len(price_matrix) < 4:
+        print("❌ 比較に必要なデータが不足しています")
+        return None
+
+    result = evaluate_strategies(price_matrix, strategies)
+    result['price_matrix'] = price_matrix
+    return result
+
+
+if __name__ == "__main__":
+    from datetime import datetime
+
+    print("🧪 複数戦略比較")
+    comparison = compare_strategies(DEFAULT_STRATEGIES, datetime(2011, 1, 1), datetime.now())
+    if comparison is not None:
+        print(comparison['stats'].round(2).to_string())
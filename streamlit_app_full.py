@@ -1,13 +1,15 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import time
 import plotly.express as px
 import plotly.graph_objects as go
 import warnings
 
+from momentum_core import latest_signal, run_backtest
+from export_utils import prepare_export_frame, to_parquet_bytes
+from chart_utils import build_performance_figure_json, figure_from_json
+
 # 警告を抑制
 warnings.filterwarnings('ignore')
 
@@ -22,192 +24,47 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-@st.cache_data(ttl=1800)  # 30分キャッシュ
-def get_monthly_data(symbol, start_date, end_date):
-    """ETFの月次データを取得"""
-    try:
-        # リトライ機能付きでデータ取得
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                ticker = yf.Ticker(symbol)
-                data = ticker.history(
-                    start=start_date, 
-                    end=end_date, 
-                    interval="1mo",
-                    timeout=30,
-                    auto_adjust=True,
-                    prepost=False
-                )
-                
-                if data.empty:
-                    if attempt < max_retries - 1:
-                        time.sleep(2)
-                        continue
-                    return None
-                    
-                # タイムゾーン正規化
-                if data.index.tz is not None:
-                    data.index = data.index.tz_localize(None)
-                    
-                return data
-                
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    time.sleep(2)
-                    continue
-                else:
-                    st.error(f"❌ {symbol} データ取得エラー: {str(e)}")
-                    return None
-        
-    except Exception as e:
-        st.error(f"❌ {symbol} 予期しないエラー: {str(e)}")
-        return None
-
 def calculate_momentum_signal():
     """現在のモメンタムシグナルを計算"""
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=90)
+    signal = latest_signal(datetime.now(), lookback_days=90)
     
-    ief_data = get_monthly_data("IEF", start_date, end_date)
-    
-    if ief_data is None or len(ief_data) < 2:
+    if signal is None:
         return None, None, None
     
-    # 最新の1ヶ月リターン
-    latest_return = ((ief_data['Open'].iloc[-1] - ief_data['Open'].iloc[-2]) / ief_data['Open'].iloc[-2]) * 100
-    recommended_etf = "TQQQ" if latest_return > 0 else "GLD"
-    period = f"{ief_data.index[-2].strftime('%Y/%m/%d')} ～ {ief_data.index[-1].strftime('%Y/%m/%d')}"
-    
-    return recommended_etf, latest_return, period
+    return signal.recommended_etf, signal.ief_return, signal.period_label()
 
 def perform_backtest(start_date, end_date):
-    """バックテストを実行"""
+    """バックテストを実行（他の画面と同じ共通エンジンで計算）"""
     # プログレスバー
     progress_bar = st.progress(0)
     status_text = st.empty()
     
-    # データ取得
-    status_text.text("📊 IEFデータ取得中...")
-    ief_data = get_monthly_data("IEF", start_date, end_date)
-    progress_bar.progress(25)
-    
-    if ief_data is None:
-        st.error("IEFデータの取得に失敗しました")
-        return None
-    
-    time.sleep(1)
-    status_text.text("📊 TQQQデータ取得中...")
-    tqqq_data = get_monthly_data("TQQQ", start_date, end_date)
-    progress_bar.progress(50)
-    
-    if tqqq_data is None:
-        st.error("TQQQデータの取得に失敗しました")
-        return None
-    
-    time.sleep(1)
-    status_text.text("📊 GLDデータ取得中...")
-    gld_data = get_monthly_data("GLD", start_date, end_date)
-    progress_bar.progress(75)
+    status_text.text("📊 IEF・TQQQ・GLDデータ取得・バックテスト計算中...")
+    result = run_backtest(start_date, end_date)
+    progress_bar.progress(100)
     
-    if gld_data is None:
-        st.error("GLDデータの取得に失敗しました")
+    if result is None:
+        progress_bar.empty()
+        status_text.empty()
+        st.error("データの取得に失敗しました")
         return None
     
-    status_text.text("📊 バックテスト計算中...")
-    
-    # バックテスト計算
-    results = []
-    current_date = pd.to_datetime(start_date).normalize()
-    end_date_pd = pd.to_datetime(end_date).normalize()
-    
-    while current_date < end_date_pd:
-        next_date = current_date + pd.DateOffset(months=3)
-        if next_date > end_date_pd:
-            next_date = end_date_pd
-        
-        # 期間内のデータを取得
-        period_ief = ief_data[(ief_data.index >= current_date) & (ief_data.index < next_date)]
-        
-        if len(period_ief) >= 2:
-            # IEFリターンで判定
-            ief_return = ((period_ief['Open'].iloc[1] - period_ief['Open'].iloc[0]) / period_ief['Open'].iloc[0]) * 100
-            selected_etf = "TQQQ" if ief_return > 0 else "GLD"
-            
-            # 対応するETFデータ
-            if selected_etf == "TQQQ":
-                etf_data = tqqq_data[(tqqq_data.index >= current_date) & (tqqq_data.index < next_date)]
-            else:
-                etf_data = gld_data[(gld_data.index >= current_date) & (gld_data.index < next_date)]
-            
-            if len(etf_data) >= 2:
-                start_price = etf_data['Open'].iloc[0]
-                end_price = etf_data['Open'].iloc[-1]
-                returns = ((end_price - start_price) / start_price) * 100
-                
-                results.append({
-                    'date': current_date,
-                    'period': current_date.strftime('%Y-%m'),
-                    'etf': selected_etf,
-                    'start_price': start_price,
-                    'end_price': end_price,
-                    'return_pct': returns,
-                    'ief_signal': ief_return
-                })
-        
-        current_date = next_date
-    
-    progress_bar.progress(100)
-    status_text.text("✅ 完了!")
-    time.sleep(1)
     progress_bar.empty()
     status_text.empty()
     
-    return pd.DataFrame(results)
+    # チャート・表示用の列（保有開始日と保有銘柄）
+    backtest_df = result.to_frame()
+    backtest_df['date'] = backtest_df['hold_start_date']
+    backtest_df['etf'] = backtest_df['selected_etf']
+    return backtest_df
 
 def create_performance_chart(backtest_df):
-    """パフォーマンスチャートを作成"""
+    """パフォーマンスチャートを作成（間引き・WebGL描画、入力は変更しない）"""
     if backtest_df.empty:
         return None
     
-    # 累積リターンを計算
-    backtest_df['cumulative_return'] = (1 + backtest_df['return_pct'] / 100).cumprod()
-    
-    fig = go.Figure()
-    
-    # 累積リターンライン
-    fig.add_trace(go.Scatter(
-        x=backtest_df['date'],
-        y=backtest_df['cumulative_return'],
-        mode='lines+markers',
-        name='累積リターン',
-        line=dict(color='#1f77b4', width=3),
-        marker=dict(size=8)
-    ))
-    
-    # ETF切り替えポイントの色分け
-    colors = {'TQQQ': '#ff7f0e', 'GLD': '#2ca02c'}
-    for etf in ['TQQQ', 'GLD']:
-        etf_data = backtest_df[backtest_df['etf'] == etf]
-        if not etf_data.empty:
-            fig.add_trace(go.Scatter(
-                x=etf_data['date'],
-                y=etf_data['cumulative_return'],
-                mode='markers',
-                name=f'{etf} 保有期間',
-                marker=dict(color=colors[etf], size=12, symbol='square'),
-                showlegend=True
-            ))
-    
-    fig.update_layout(
-        title='📈 累積パフォーマンス',
-        xaxis_title='期間',
-        yaxis_title='累積リターン（倍率）',
-        hovermode='x unified',
-        height=500
-    )
-    
-    return fig
+    fig_json = build_performance_figure_json(backtest_df, date_col='date', etf_col='etf')
+    return figure_from_json(fig_json)
 
 def main():
     # ヘッダー
@@ -335,6 +192,12 @@ def main():
                 file_name=f"momentum_backtest_{start_date}_{end_date}.csv",
                 mime="text/csv"
             )
+            st.download_button(
+                label="📦 Parquet形式でダウンロード",
+                data=to_parquet_bytes(prepare_export_frame(backtest_df)),
+                file_name=f"momentum_backtest_{start_date}_{end_date}.parquet",
+                mime="application/vnd.apache.parquet"
+            )
         else:
             st.error("バックテストの実行に失敗しました")
     
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+バックテストエンジンのテスト
+run_backtest（配列演算）の結果が従来の calculate_real_backtest の1期間ずつのループと一致することを確認
+"""
+
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from backtest_yfinance import calculate_real_backtest
+from momentum_core import get_monthly_data_for_backtest, run_backtest
+
+
+def reference_backtest(start_date, end_date):
+    """従来の calculate_real_backtest のループ（3ヶ月ごとのリバランス、始値で売買）"""
+    data = get_monthly_data_for_backtest(start_date, end_date)
+    ief_data, tqqq_data, gld_data = data['IEF'], data['TQQQ'], data['GLD']
+    common_dates = ief_data.index.intersection(tqqq_data.index).intersection(gld_data.index)
+
+    results = []
+    current_position = None
+    i = 1
+    while i < len(common_dates) - 2:
+        rebalance_date = common_dates[i]
+        ief_current = ief_data.loc[rebalance_date, 'Open']
+        ief_previous = ief_data.loc[common_dates[i - 1], 'Open']
+        ief_return = ((ief_current - ief_previous) / ief_previous) * 100
+
+        selected_etf = 'TQQQ' if ief_return > 0 else 'GLD'
+        hold_end_date = common_dates[i + 2]
+
+        if current_position == selected_etf:
+            action = "継続保有"
+        else:
+            action = f"{current_position or '初回'} → {selected_etf}"
+            current_position = selected_etf
+
+        prices = tqqq_data if selected_etf == 'TQQQ' else gld_data
+        start_price = prices.loc[rebalance_date, 'Open']
+        end_price = prices.loc[hold_end_date, 'Open']
+
+        results.append({
+            'period': rebalance_date.strftime('%Y/%m'),
+            'rebalance_date': rebalance_date.strftime('%Y/%m/%d'),
+            'ief_signal': ief_return,
+            'selected_etf': selected_etf,
+            'action': action,
+            'start_price': start_price,
+            'end_price': end_price,
+            'return_pct': ((end_price - start_price) / start_price) * 100,
+            'hold_start_date': rebalance_date,
+            'hold_end_date': hold_end_date,
+        })
+        i += 3
+
+    return pd.DataFrame(results)
+
+
+def _assert_matches_reference(df, expected):
+    assert len(df) == len(expected) > 0
+    for column in ('period', 'rebalance_date', 'selected_etf', 'action'):
+        assert df[column].tolist() == expected[column].tolist(), column
+    for column in ('ief_signal', 'start_price', 'end_price', 'return_pct'):
+        assert df[column].to_numpy() == pytest.approx(expected[column].to_numpy(), rel=1e-12), column
+    for column in ('hold_start_date', 'hold_end_date'):
+        actual = pd.DatetimeIndex(df[column]).tz_localize(None)
+        assert actual.equals(pd.DatetimeIndex(expected[column]).tz_localize(None)), column
+
+
+@pytest.mark.parametrize('start_date, end_date', [
+    (datetime(2011, 1, 1), datetime(2024, 1, 1)),
+    (datetime(2015, 6, 15), datetime(2016, 2, 1)),
+    (datetime(2020, 1, 1), datetime(2020, 5, 1)),  # 最小期間（リバランス1回）
+])
+def test_run_backtest_matches_reference(fixture_provider, start_date, end_date):
+    result = run_backtest(start_date, end_date)
+    assert result is not None
+    _assert_matches_reference(result.to_frame(), reference_backtest(start_date, end_date))
+
+
+def test_calculate_real_backtest_matches_reference(fixture_provider):
+    start_date, end_date = datetime(2012, 3, 1), datetime(2023, 9, 1)
+    df = calculate_real_backtest(start_date, end_date)
+    assert df is not None
+    _assert_matches_reference(df, reference_backtest(start_date, end_date))
+
+
+def test_run_backtest_too_short(fixture_provider):
+    assert run_backtest(datetime(2020, 1, 1), datetime(2020, 3, 1)) is None
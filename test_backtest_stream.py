@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+ストリーミング型バックテストのテスト
+チャンク単位で計算したトレードログが一括計算（compute_trade_log）と一致することを確認
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from backtest_stream import (consume_trade_log_stream, iter_fetched_price_chunks, iter_price_chunks,
+                             iter_trade_log_chunks)
+from momentum_core import compute_trade_log, run_backtest
+
+START = datetime(2011, 1, 1)
+END = datetime(2024, 1, 1)
+
+
+def _concat(chunks):
+    logs = list(chunks)
+    assert all(len(log) for log in logs)
+    return np.concatenate(logs)
+
+
+def _assert_same_log(streamed, batch):
+    assert streamed.dtype == batch.dtype
+    assert len(streamed) == len(batch)
+    for name in batch.dtype.names:
+        if np.issubdtype(batch.dtype[name], np.floating):
+            np.testing.assert_allclose(streamed[name], batch[name], rtol=1e-12, err_msg=name)
+        else:
+            np.testing.assert_array_equal(streamed[name], batch[name], err_msg=name)
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 2, 3, 5, 7, 120, 1000])
+def test_stream_matches_batch(fixture_provider, chunk_rows):
+    result = run_backtest(START, END)
+    assert result is not None and result.trades > 0
+
+    streamed = _concat(iter_trade_log_chunks(iter_price_chunks(result.price_matrix, chunk_rows)))
+    _assert_same_log(streamed, compute_trade_log(result.price_matrix))
+
+
+def test_fetched_stream_matches_batch(fixture_provider):
+    result = run_backtest(START, END)
+
+    streamed = _concat(iter_trade_log_chunks(iter_fetched_price_chunks(START, END, months_per_chunk=17)))
+    _assert_same_log(streamed, result.trade_log)
+
+
+def test_running_stats_match_batch(fixture_provider):
+    result = run_backtest(START, END)
+    returns = result.trade_log['return_pct']
+
+    stats = consume_trade_log_stream(iter_trade_log_chunks(iter_price_chunks(result.price_matrix, 10)))
+    assert stats['trades'] == len(returns)
+    assert stats['total_return'] == pytest.approx((np.prod(1 + returns / 100) - 1) * 100)
+    assert stats['win_rate'] == pytest.approx((returns > 0).mean() * 100)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+ポートフォリオエンジンのテスト
+行列演算の結果が株数ベースの逐次計算（1行ずつ売買）と一致することを確認
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from portfolio_engine import fixed_weights, rebalance_rows, simulate_portfolio, sweep_fixed_weights
+from strategy_compare import load_strategy_prices
+
+WEIGHTS = {'TQQQ': 0.5, 'IEF': 0.3, 'GLD': 0.1}  # 残り10%は現金
+
+
+@pytest.fixture
+def prices(fixture_provider):
+    price_matrix = load_strategy_prices([{}], datetime(2012, 1, 1), datetime(2024, 1, 1))
+    assert price_matrix is not None and len(price_matrix) > 100
+    return price_matrix
+
+
+def share_loop(prices, target, rows, cost_bps):
+    """株数と現金を1行ずつ更新する素朴な実装（最初のリバランス行の資産 = 1.0）"""
+    price_values = prices.to_numpy(dtype=np.float64)
+    target_values = np.nan_to_num(target.to_numpy(dtype=np.float64))
+    rebalance = set(int(r) for r in rows)
+
+    shares = np.zeros(prices.shape[1])
+    cash = 1.0
+    equity = []
+    for t in range(rows[0], len(prices)):
+        value = cash + shares @ price_values[t]
+        if t in rebalance:
+            target_shares = value * target_values[t] / price_values[t]
+            value -= np.abs(target_shares - shares) @ price_values[t] * cost_bps / 10000
+            shares = value * target_values[t] / price_values[t]
+            cash = value - shares @ price_values[t]
+        equity.append(value)
+    return np.array(equity)
+
+
+@pytest.mark.parametrize('rebalance', [None, 'every_n', 'monthly_first', 'quarterly_first', 'quarterly_last'])
+@pytest.mark.parametrize('cost_bps', [0.0, 25.0])
+def test_simulate_matches_share_loop(prices, rebalance, cost_bps):
+    target = fixed_weights(prices, WEIGHTS)
+    result = simulate_portfolio(prices, target, rebalance=rebalance, interval=4, cost_bps=cost_bps)
+
+    rows = rebalance_rows(prices, target, rebalance, interval=4)
+    expected = share_loop(prices, target, rows, cost_bps)
+    np.testing.assert_allclose(result['equity'].to_numpy(), expected, rtol=1e-10)
+    assert result['equity'].index[0] == prices.index[rows[0]]
+
+
+def test_cost_on_last_row_rebalance(prices):
+    # 最終行のリバランスのコストも最終行の equity から控除される
+    target = fixed_weights(prices, WEIGHTS)
+    target.iloc[:-1] = np.nan
+    target.iloc[len(prices) // 2] = [0.2] * prices.shape[1]
+
+    result = simulate_portfolio(prices, target, cost_bps=25.0)
+    rows = rebalance_rows(prices, target)
+    assert rows[-1] == len(prices) - 1
+    np.testing.assert_allclose(result['equity'].to_numpy(), share_loop(prices, target, rows, 25.0), rtol=1e-10)
+
+
+@pytest.mark.parametrize('rebalance', ['every_n', 'monthly_last', 'quarterly_first'])
+def test_sweep_matches_simulate(prices, rebalance):
+    weight_sets = np.array([[0.2, 0.6, 0.2], [0.5, 0.5, 0.0], [0.3, 0.3, 0.3]])
+    sweep = sweep_fixed_weights(prices, weight_sets, rebalance=rebalance, interval=3)
+
+    for row, weights in zip(sweep.itertuples(), weight_sets):
+        equity = simulate_portfolio(prices, weights[None, :].repeat(len(prices), axis=0),
+                                    rebalance=rebalance, interval=3)['equity']
+        assert row.total_return == pytest.approx((equity.iloc[-1] - 1) * 100, rel=1e-10)
+        assert row.max_drawdown == pytest.approx((equity / equity.cummax() - 1).min() * 100, rel=1e-10)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+シグナル変更アラートのテスト
+全戦略の一括判定（evaluate_latest）と通知が signal_history の1戦略ずつの履歴と一致することを確認
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from signal_alerts import SignalMonitor, compile_strategies, evaluate_latest, memory_sink, strategy_grid
+from signal_history import HISTORY_START, NO_HOLDING, build_signal_history
+from strategy_compare import DEFAULT_STRATEGIES, load_strategy_prices
+
+STRATEGIES = DEFAULT_STRATEGIES + strategy_grid(
+    signals={
+        'momentum': [{'lookback': 1}, {'lookback': 6}],
+        'sma_crossover': [{'fast': 3, 'slow': 10}],
+        'rsi': [{'period': 6}],
+    },
+    signal_symbols=('IEF', 'GLD'),
+    intervals=(1, 2, 3, 4, 6),
+)
+
+
+@pytest.fixture
+def prices(fixture_provider):
+    price_matrix = load_strategy_prices(STRATEGIES, HISTORY_START, datetime(2024, 1, 1))
+    assert price_matrix is not None and len(price_matrix) > 100
+    return price_matrix
+
+
+def latest_from_history(price_matrix, strategy):
+    """1戦略の履歴の最終行から（保有銘柄, 最後のリバランス日, その日のシグナル）"""
+    history = build_signal_history(price_matrix, strategy)
+    rebalances = np.flatnonzero(history['is_rebalance'])
+    if len(rebalances) == 0:
+        return None, None, None
+    held = int(history['held'][-1])
+    last = rebalances[-1]
+    return (history['symbols'][held] if held != NO_HOLDING else None,
+            pd.Timestamp(history['date'][last]), history['signal'][last])
+
+
+@pytest.mark.parametrize('trim', [0, 1, 2, 3, 4, 5])
+def test_evaluate_latest_matches_history(prices, trim):
+    # 末尾を削ってリバランスの位相を変える（全間隔で最終行がリバランス行・非リバランス行になる）
+    price_matrix = prices.iloc[:len(prices) - trim]
+    compiled = compile_strategies(STRATEGIES)
+    current = evaluate_latest(price_matrix, compiled)
+
+    symbols = np.append(compiled['symbols'], None)
+    for i, strategy in enumerate(STRATEGIES):
+        held, rebalance_date, signal = latest_from_history(price_matrix, strategy)
+        assert symbols[current['held'][i]] == held, compiled['names'][i]
+        assert pd.Timestamp(current['rebalance_date'][i]) == rebalance_date
+        np.testing.assert_equal(current['signal'][i], signal)
+
+
+def test_evaluate_latest_before_first_rebalance(prices):
+    compiled = compile_strategies(STRATEGIES)
+    current = evaluate_latest(prices.iloc[:1], compiled)
+    assert (current['held'] == NO_HOLDING).all()
+    assert latest_from_history(prices.iloc[:1], STRATEGIES[0]) == (None, None, None)
+
+
+def test_monitor_events_match_history(prices, tmp_path):
+    events = []
+    monitor = SignalMonitor(STRATEGIES, [memory_sink(events)], state_dir=str(tmp_path))
+
+    for n in range(len(prices) - 12, len(prices) + 1):
+        previous = [latest_from_history(prices.iloc[:n - 1], strategy)[0] for strategy in STRATEGIES]
+        current = [latest_from_history(prices.iloc[:n], strategy)[0] for strategy in STRATEGIES]
+        events.clear()
+        monitor.tick(prices.iloc[:n])
+        if n == len(prices) - 12:
+            assert events == []  # 初回は状態の記録のみ
+            continue
+
+        # 同じ設定の戦略が名前違いで複数あるため、名前で対応付ける
+        changed = {event['strategy']: event for event in events}
+        expected = [i for i in range(len(STRATEGIES)) if previous[i] != current[i]]
+        assert len(events) == len(expected)
+        assert sorted(changed) == sorted(monitor.compiled['names'][expected])
+        for i in expected:
+            event = changed[monitor.compiled['names'][i]]
+            assert (event['previous'], event['current']) == (previous[i], current[i])
+
+    # 状態を保存したファイルから再開しても同じデータでは通知しない
+    events.clear()
+    restarted = SignalMonitor(STRATEGIES, [memory_sink(events)], state_dir=str(tmp_path))
+    assert restarted.tick(prices) == []
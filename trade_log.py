@@ -0,0 +1,168 @@
+"""
+コンパクトなトレードログ
+トレード結果を型付きNumPyレコード配列で保持し、文字列整形は表示時にのみ行う
+"""
+
+import numpy as np
+import pandas as pd
+
+# 銘柄コード（カテゴリ値）
+ETF_SYMBOLS = ('TQQQ', 'GLD', 'IEF')
+ETF_CODES = {symbol: code for code, symbol in enumerate(ETF_SYMBOLS)}
+NO_POSITION = -1  # 初回（前ポジションなし）
+
+HOLD_ACTION = "継続保有"
+
+# 1トレード = 1レコード（日付は int64 ナノ秒）
+TRADE_LOG_DTYPE = np.dtype([
+    ('hold_start', 'i8'),     # リバランス日 = 保有開始日
+    ('hold_end', 'i8'),       # 保有終了日
+    ('ief_signal', 'f8'),     # IEF 1ヶ月リターン（%）
+    ('etf', 'i1'),            # 保有銘柄コード
+    ('prev_etf', 'i1'),       # 直前の保有銘柄コード（初回は NO_POSITION）
+    ('start_price', 'f8'),
+    ('end_price', 'f8'),
+    ('return_pct', 'f8'),
+])
+
+
+def encode_symbols(symbols):
+    """銘柄名の配列を銘柄コード配列（int8）に変換"""
+    symbols = np.asarray(symbols)
+    codes = np.full(len(symbols), NO_POSITION, dtype=np.int8)
+    for symbol, code in ETF_CODES.items():
+        codes[symbols == symbol] = code
+    return codes
+
+
+def decode_symbols(codes):
+    """銘柄コード配列を銘柄名の配列に変換"""
+    lookup = np.array(ETF_SYMBOLS + (None,), dtype=object)
+    return lookup[np.asarray(codes, dtype=np.int64)]
+
+
+def build_trade_log(hold_start, hold_end, ief_signal, etf_codes, start_price, end_price,
+                    prev_etf=NO_POSITION):
+    """
+    配列からトレードログを作成
+
+    Args:
+        hold_start (array-like): 保有開始日（datetime64 または int64 ナノ秒）
+        hold_end (array-like): 保有終了日
+        ief_signal (array-like): IEF 1ヶ月リターン（%）
+        etf_codes (array-like): 保有銘柄コード
+        start_price (array-like): 開始価格
+        end_price (array-like): 終了価格
+        prev_etf (int): 最初のトレードより前の保有銘柄コード（分割計算の継続用）
+
+    Returns:
+        np.ndarray: TRADE_LOG_DTYPE のレコード配列
+    """
+
+    etf_codes = np.asarray(etf_codes, dtype=np.int8)
+    log = np.empty(len(etf_codes), dtype=TRADE_LOG_DTYPE)
+
+    log['hold_start'] = np.asarray(hold_start, dtype='datetime64[ns]').view(np.int64)
+    log['hold_end'] = np.asarray(hold_end, dtype='datetime64[ns]').view(np.int64)
+    log['ief_signal'] = ief_signal
+    log['etf'] = etf_codes
+    log['prev_etf'][:1] = prev_etf
+    log['prev_etf'][1:] = etf_codes[:-1]
+    log['start_price'] = start_price
+    log['end_price'] = end_price
+    log['return_pct'] = (log['end_price'] - log['start_price']) / log['start_price'] * 100
+
+    return log
+
+
+def switch_mask(log):
+    """売買が発生したトレードのマスク（初回を含む）"""
+    return log['etf'] != log['prev_etf']
+
+
+def format_actions(log):
+    """売買アクション文字列を作成（表示用）"""
+    symbols = decode_symbols(log['etf'])
+    previous = decode_symbols(log['prev_etf'])
+    previous = np.where(log['prev_etf'] == NO_POSITION, '初回', previous)
+    actions = np.char.add(np.char.add(previous.astype(str), ' → '), symbols.astype(str))
+    return np.where(switch_mask(log), actions, HOLD_ACTION)
+
+
+def trade_log_to_frame(log):
+    """
+    トレードログを従来形式のバックテスト結果DataFrameに変換（表示時に使用）
+
+    Args:
+        log (np.ndarray): TRADE_LOG_DTYPE のレコード配列
+
+    Returns:
+        pd.DataFrame: calculate_real_backtest 互換の列を持つDataFrame
+    """
+
+    hold_start = pd.DatetimeIndex(log['hold_start'].astype('datetime64[ns]'))
+    hold_end = pd.DatetimeIndex(log['hold_end'].astype('datetime64[ns]'))
+
+    return pd.DataFrame({
+        'period': hold_start.strftime('%Y/%m'),
+        'rebalance_date': hold_start.strftime('%Y/%m/%d'),
+        'ief_signal': log['ief_signal'],
+        'selected_etf': decode_symbols(log['etf']),
+        'action': format_actions(log),
+        'start_price': log['start_price'],
+        'end_price': log['end_price'],
+        'return_pct': log['return_pct'],
+        'hold_start_date': hold_start,
+        'hold_end_date': hold_end,
+        'start_date': hold_start,  # 互換性のため
+        'end_date': hold_end       # 互換性のため
+    })
+
+
+def trade_log_nbytes(log):
+    """トレードログのメモリ使用量（バイト）"""
+    return log.nbytes
+
+
+def summarize_trade_log(log):
+    """トレードログの統計サマリー（JSON 化できる値）"""
+    returns = log['return_pct']
+    if len(returns) == 0:
+        return {'trades': 0}
+    return {
+        'trades': int(len(returns)),
+        'total_return': float((np.prod(1 + returns / 100) - 1) * 100),
+        'avg_return': float(returns.mean()),
+        'win_rate': float((returns > 0).mean() * 100),
+        'max_gain': float(returns.max()),
+        'max_loss': float(returns.min()),
+    }
+
+
+def iter_trade_records(log):
+    """
+    トレードログを JSON 化しやすい辞書として1件ずつ返す（表示・出力時に使用）
+
+    Args:
+        log (np.ndarray): TRADE_LOG_DTYPE のレコード配列
+
+    Yields:
+        dict: 1トレード分の値（日付は ISO 形式文字列）
+    """
+
+    hold_start = log['hold_start'].astype('datetime64[ns]').astype('datetime64[D]').astype(str)
+    hold_end = log['hold_end'].astype('datetime64[ns]').astype('datetime64[D]').astype(str)
+    symbols = decode_symbols(log['etf'])
+    actions = format_actions(log)
+
+    for i in range(len(log)):
+        yield {
+            'hold_start_date': hold_start[i],
+            'hold_end_date': hold_end[i],
+            'ief_signal': float(log['ief_signal'][i]),
+            'selected_etf': symbols[i],
+            'action': str(actions[i]),
+            'start_price': float(log['start_price'][i]),
+            'end_price': float(log['end_price'][i]),
+            'return_pct': float(log['return_pct'][i]),
+        }
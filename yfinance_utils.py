@@ -3,21 +3,23 @@ yfinance統合のためのユーティリティ関数
 段階的にyfinanceデータ取得機能を実装
 """
 
-import yfinance as yf
 import pandas as pd
 import streamlit as st
-import time
 from datetime import datetime, timedelta
 import warnings
 
+from momentum_core import get_monthly_history, latest_signal
+
 # 警告を抑制
 warnings.filterwarnings('ignore')
 
-@st.cache_data(ttl=1800, show_spinner=False)  # 30分キャッシュ、期間変更に対応
 def get_etf_data(symbol, start_date, end_date, max_retries=3):
     """
     ETFの月次データを取得（yfinance使用）
     
+    取得とキャッシュは momentum_core の共通キャッシュ（30分）で行い、
+    ここでは進行状況の表示だけを担当する。
+    
     Args:
         symbol (str): ETFシンボル（IEF, TQQQ, GLD）
         start_date (datetime): 開始日
@@ -32,62 +34,21 @@ def get_etf_data(symbol, start_date, end_date, max_retries=3):
     progress_placeholder = st.empty()
     status_placeholder = st.empty()
     
-    for attempt in range(max_retries):
-        try:
-            progress_placeholder.info(f"📊 {symbol} データ取得中... (試行 {attempt + 1}/{max_retries})")
-            
-            # yfinance Ticker作成
-            ticker = yf.Ticker(symbol)
-            
-            # 日付を文字列に変換
-            start_str = start_date.strftime('%Y-%m-%d')
-            end_str = end_date.strftime('%Y-%m-%d')
-            
-            # 月次データ取得
-            data = ticker.history(
-                start=start_str,
-                end=end_str,
-                interval="1mo",
-                auto_adjust=True,
-                prepost=False,
-                timeout=30
-            )
-            
-            if data.empty:
-                if attempt < max_retries - 1:
-                    status_placeholder.warning(f"⚠️ {symbol}: データが空です。再試行中...")
-                    time.sleep(2)
-                    continue
-                else:
-                    status_placeholder.error(f"❌ {symbol}: データを取得できませんでした")
-                    progress_placeholder.empty()
-                    return None
-            
-            # タイムゾーン正規化
-            if data.index.tz is not None:
-                data.index = data.index.tz_localize(None)
-            
-            # 成功メッセージ
-            progress_placeholder.success(f"✅ {symbol}: {len(data)}期間のデータを取得")
-            status_placeholder.empty()
-            
-            # 少し待ってからプレースホルダーをクリア
-            time.sleep(1)
-            progress_placeholder.empty()
-            
-            return data
-            
-        except Exception as e:
-            error_msg = str(e)
-            if attempt < max_retries - 1:
-                status_placeholder.warning(f"⚠️ {symbol}: エラー発生、再試行中... ({error_msg[:50]}...)")
-                time.sleep(2 * (attempt + 1))  # 指数バックオフ
-            else:
-                status_placeholder.error(f"❌ {symbol}: 最終エラー - {error_msg}")
-                progress_placeholder.empty()
-                return None
-    
-    return None
+    def on_status(level, message):
+        if level == 'info':
+            progress_placeholder.info(message)
+        elif level == 'warning':
+            status_placeholder.warning(message)
+        elif level == 'error':
+            status_placeholder.error(message)
+    
+    data = get_monthly_history(symbol, start_date, end_date, max_retries, on_status)
+    
+    progress_placeholder.empty()
+    if data is not None:
+        status_placeholder.empty()
+    
+    return data
 
 def test_yfinance_connection():
     """yfinance接続テスト"""
@@ -186,28 +147,16 @@ def calculate_ief_momentum_real(start_date=None, end_date=None):
     
     st.info("📊 最新IEFモメンタムを計算中...")
     
-    # IEFデータ取得
-    ief_data = get_etf_data("IEF", start_date, end_date)
+    # 共通エンジンで最新2期間の1ヶ月リターンを計算
+    signal = latest_signal(end_date, lookback_days=(end_date - start_date).days)
     
-    if ief_data is None or len(ief_data) < 2:
+    if signal is None:
         st.error("❌ IEFデータが不足しています。")
         return None, None, None
     
-    # 最新の2期間で1ヶ月リターン計算
-    latest_price = ief_data['Open'].iloc[-1]
-    previous_price = ief_data['Open'].iloc[-2]
-    
-    ief_return = ((latest_price - previous_price) / previous_price) * 100
-    
-    # 推奨銘柄判定
-    recommended_etf = "TQQQ" if ief_return > 0 else "GLD"
-    
-    # 期間文字列
-    period = f"{ief_data.index[-2].strftime('%Y/%m/%d')} ～ {ief_data.index[-1].strftime('%Y/%m/%d')}"
-    
-    st.success(f"✅ 最新推奨: IEF {ief_return:+.2f}% → {recommended_etf}")
+    st.success(f"✅ 最新推奨: IEF {signal.ief_return:+.2f}% → {signal.recommended_etf}")
     
-    return recommended_etf, ief_return, period
+    return signal.recommended_etf, signal.ief_return, signal.period_label()
 
 def get_etf_info():
     """ETF情報を表示"""